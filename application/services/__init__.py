@@ -1,3 +1,13 @@
-from .fsrs_service import FSRSService
+from .fsrs_service import FSRSService, FSRSBatchResult
+from .distractor_service import DistractorIndex, DistractorService, distractor_service
+from .answer_grader import grade_answer, normalize_answer
 
-__all__ = ["FSRSService"]
+__all__ = [
+    "FSRSService",
+    "FSRSBatchResult",
+    "DistractorIndex",
+    "DistractorService",
+    "distractor_service",
+    "grade_answer",
+    "normalize_answer",
+]
@@ -0,0 +1,174 @@
+"""
+Оценка письменного ответа с допуском опечаток
+
+Ответы нормализуются (NFKC, casefold, ё -> е, без оформляющей пунктуации и лишних
+пробелов; символы вроде "+", "#", "%" и знак числа сохраняются) и сравниваются
+по нормированному расстоянию правок, в том числе без учета порядка слов. Расстояние считается бит-параллельно и с отсечением по порогу.
+"""
+import unicodedata
+from functools import lru_cache
+from typing import Tuple
+
+NORMALIZE_CACHE_SIZE = 65536
+
+# Порог похожести -> оценка качества (0-5)
+QUALITY_THRESHOLDS = (
+    (0.9, 3),   # опечатка
+    (0.75, 2),  # почти правильно
+    (0.5, 1),   # похоже
+)
+EXACT_QUALITY = 4
+PARTIAL_QUALITY = 2
+CORRECT_QUALITY = 3
+MIN_SIMILARITY = QUALITY_THRESHOLDS[-1][0]
+
+# Скобки, кавычки, тире и пробелы только оформляют ответ - заменяются пробелом
+SEPARATOR_CATEGORIES = frozenset(("Pc", "Pd", "Ps", "Pe", "Pi", "Pf", "Zs", "Zl", "Zp"))
+QUOTES = frozenset("\"'")
+# Знаки препинания убираются на границах слов ("3.14" и "e.g" их сохраняют)
+SENTENCE_PUNCTUATION = frozenset(".,;:!?…¡¿·。、،؟")
+
+
+def _fold(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().replace("ё", "е").replace("−", "-").split())
+
+
+def _is_sign(text: str, i: int) -> bool:
+    """Минус перед числом в начале слова ("-5")"""
+    return (
+        text[i] == "-"
+        and (i == 0 or text[i - 1].isspace())
+        and i + 1 < len(text)
+        and text[i + 1].isdigit()
+    )
+
+
+def _inside_word(text: str, i: int) -> bool:
+    return 0 < i < len(text) - 1 and text[i - 1].isalnum() and text[i + 1].isalnum()
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_answer(text: str) -> str:
+    """
+    Привести ответ к каноническому виду; результат кэшируется по строке
+
+    Символы ("+", "#", "%", "$") и знак числа меняют смысл ответа ("C" и "C++",
+    "5" и "-5") и сохраняются; прочая пунктуация заменяется пробелом.
+    """
+    text = _fold(text)
+    chars = []
+    for i, char in enumerate(text):
+        if unicodedata.category(char) in SEPARATOR_CATEGORIES or char in QUOTES:
+            chars.append(char if _is_sign(text, i) else " ")
+        elif char in SENTENCE_PUNCTUATION and not _inside_word(text, i):
+            chars.append(" ")
+        else:
+            chars.append(char)
+    return " ".join("".join(chars).split())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _tokens(normalized: str) -> frozenset:
+    return frozenset(normalized.split())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _sorted_tokens(normalized: str) -> str:
+    return " ".join(sorted(normalized.split()))
+
+
+def banded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Расстояние Левенштейна, если оно не больше max_distance, иначе max_distance + 1
+
+    Перестановка соседних символов считается одной правкой (как у Дамерау -
+    самая частая опечатка). Считается бит-параллельно (Myers/Hyyrö): столбец DP
+    хранится битами int, поэтому на символ уходит O(1) операций над int, а не
+    проход по строке; при разнице длин больше max_distance строки не сравниваются.
+    """
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    limit = max_distance + 1
+    if len(b) - len(a) > max_distance:
+        return limit
+
+    # Общие префикс и суффикс на расстояние не влияют
+    start = 0
+    while start < len(a) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if not a:
+        return len(b) if len(b) <= max_distance else limit
+
+    masks = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    # Маскировать биты выше len(a) не нужно: переносы идут только вверх,
+    # а читается лишь бит последней строки
+    last = 1 << (len(a) - 1)
+    positive, negative = (1 << len(a)) - 1, 0
+    diagonal = previous_match = 0
+    distance = len(a)
+    remaining = len(b)
+    for char in b:
+        match = masks.get(char, 0)
+        transposed = ((~diagonal & match) << 1) & previous_match
+        diagonal = (((match & positive) + positive) ^ positive) | match | negative | transposed
+        horizontal_positive = negative | ~(diagonal | positive)
+        horizontal_negative = diagonal & positive
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        remaining -= 1
+        # Каждый оставшийся символ уменьшает расстояние не больше чем на 1
+        if distance - remaining > max_distance:
+            return limit
+        horizontal_positive = (horizontal_positive << 1) | 1
+        positive = (horizontal_negative << 1) | ~(diagonal | horizontal_positive)
+        negative = horizontal_positive & diagonal
+        previous_match = match
+    return distance if distance <= max_distance else limit
+
+
+def similarity(a: str, b: str) -> float:
+    """1 - нормированное расстояние; ниже MIN_SIMILARITY точное значение не считается"""
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 1.0
+    max_distance = int(longest * (1 - MIN_SIMILARITY))
+    return 1 - banded_levenshtein(a, b, max_distance) / longest
+
+
+def grade_answer(answer: str, correct: str) -> Tuple[bool, int]:
+    """
+    Оценить ответ: (правильность, качество 0-5)
+
+    Совпадение после нормализации или с точностью до порядка слов - 4,
+    похожесть >= 0.9 - 3 (засчитывается), >= 0.75 - 2, >= 0.5 - 1, иначе 0.
+    Ответ, содержащий правильный или содержащийся в нем (от 2 символов), получает не меньше 2.
+    """
+    given = normalize_answer(answer)
+    expected = normalize_answer(correct)
+    if not given or not expected:
+        # От ответа из одной пунктуации ничего не осталось - сравниваем как есть
+        raw = _fold(answer)
+        return (True, EXACT_QUALITY) if raw and raw == _fold(correct) else (False, 0)
+
+    if given == expected or _sorted_tokens(given) == _sorted_tokens(expected):
+        return True, EXACT_QUALITY
+
+    score = similarity(given, expected)
+    # Порядок слов имеет смысл сравнивать, только если у ответов есть общие слова
+    if score < QUALITY_THRESHOLDS[0][0] and not _tokens(given).isdisjoint(_tokens(expected)):
+        score = max(score, similarity(_sorted_tokens(given), _sorted_tokens(expected)))
+    quality = next((quality for threshold, quality in QUALITY_THRESHOLDS if score >= threshold), 0)
+    if quality < PARTIAL_QUALITY and len(given) >= 2 and (given in expected or expected in given):
+        quality = PARTIAL_QUALITY
+    return quality >= CORRECT_QUALITY, quality
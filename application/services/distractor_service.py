@@ -0,0 +1,337 @@
+"""
+Индекс похожих ответов для режима множественного выбора
+
+Для каждой карточки набора хранятся top-K самых похожих ответов (back) других
+карточек по символьным n-граммам. Похожие варианты сложнее отличить от
+правильного, чем случайные, а выдача варианта - это чтение строки массива.
+"""
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+HASH_DIM = 1 << 18
+TOP_K = 10
+BLOCK_SIZE = 1024
+MAX_DF = 0.5
+MIN_CARDS_FOR_DF = 50
+# Добавленные и измененные после построения строки вливаются в матрицу пачками
+PENDING_ROWS = 64
+
+
+def _vectorize(backs: Sequence[str], dropped: Optional[np.ndarray] = None):
+    """Хэшированные символьные n-граммы, нормированные по L2 (строки csr-матрицы)
+
+    dropped - номера неучитываемых n-грамм (слишком частых в наборе).
+    """
+    rows, cols = [], []
+    for i, back in enumerate(backs):
+        text = f" {back.casefold().strip()} "
+        grams = {text[j:j + NGRAM_SIZE] for j in range(max(1, len(text) - NGRAM_SIZE + 1))}
+        cols.extend(hash(gram) & (HASH_DIM - 1) for gram in grams)
+        rows.extend([i] * len(grams))
+
+    rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    if dropped is not None:
+        kept = ~np.isin(cols, dropped)
+        rows, cols = rows[kept], cols[kept]
+    matrix = sparse.csr_matrix(
+        (np.ones(len(cols), dtype=np.float32), (rows, cols)),
+        shape=(len(backs), HASH_DIM),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms).dot(matrix), dtype=np.float32)
+
+
+class DistractorIndex:
+    """
+    Индекс одного набора
+
+    neighbours (n x K, int32) - номера строк похожих карточек, -1 - пусто;
+    scores (n x K, float32) - их косинусная похожесть. Карточки без общих
+    n-грамм похожими не считаются, поэтому строка может быть заполнена не целиком.
+    Массивы строк растут с запасом (удвоением), а векторы новых и измененных
+    карточек копятся в _pending и вливаются в matrix раз в PENDING_ROWS обновлений.
+    """
+
+    def __init__(self, card_ids: List[UUID], backs: List[str], top_k: int = TOP_K):
+        self.top_k = top_k
+        self.backs = list(backs)
+        self.rows: Dict[UUID, int] = {card_id: row for row, card_id in enumerate(card_ids)}
+        self._back_codes: Dict[str, int] = {}
+        self.dropped = self._frequent_grams(backs)
+        self.matrix = _vectorize(backs, self.dropped)
+        self._pending: Dict[int, "sparse.csr_matrix"] = {}
+        self._alive = np.ones(len(backs), dtype=bool)
+        self._codes = np.array([self._code(back) for back in backs], dtype=np.int32)
+        self._neighbours = np.full((len(backs), top_k), -1, dtype=np.int32)
+        self._scores = np.full((len(backs), top_k), -np.inf, dtype=np.float32)
+
+    @staticmethod
+    def _frequent_grams(backs: Sequence[str]) -> Optional[np.ndarray]:
+        """n-граммы, встречающиеся больше чем в MAX_DF ответов, не различают их и только
+        делают матрицу похожести плотной; возвращаются их отсортированные номера"""
+        if len(backs) < MIN_CARDS_FOR_DF:
+            return None
+        document_frequency = np.diff(_vectorize(backs).tocsc().indptr)
+        return np.nonzero(document_frequency > MAX_DF * len(backs))[0].astype(np.int32)
+
+    # Представления заполненной части буферов
+    @property
+    def alive(self) -> np.ndarray:
+        return self._alive[:len(self.backs)]
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:len(self.backs)]
+
+    @property
+    def neighbours(self) -> np.ndarray:
+        return self._neighbours[:len(self.backs)]
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self._scores[:len(self.backs)]
+
+    @classmethod
+    def build(cls, cards: Sequence[Tuple[UUID, str]], top_k: int = TOP_K) -> "DistractorIndex":
+        """Построить индекс: похожесть считается разреженно блоками строк"""
+        index = cls([card_id for card_id, _ in cards], [back for _, back in cards], top_k)
+        count = len(cards)
+        transposed = index.matrix.T.tocsr()
+        for start in range(0, count, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, count)
+            block = (index.matrix[start:stop] @ transposed).tocsr()
+            for offset, row in enumerate(range(start, stop)):
+                lo, hi = block.indptr[offset], block.indptr[offset + 1]
+                cols, values = block.indices[lo:hi], block.data[lo:hi]
+                # Одинаковые ответы (и сама карточка) вариантами быть не могут
+                valid = index.codes[cols] != index.codes[row]
+                index._set_neighbours(row, cols[valid], values[valid])
+        return index
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, card_id: UUID, count: int) -> Optional[List[str]]:
+        """До count различных похожих ответов (случайно из top-K); None - карточки нет в индексе"""
+        row = self.rows.get(card_id)
+        if row is None:
+            return None
+
+        own = self.backs[row]
+        candidates = []
+        for neighbour in self.neighbours[row]:
+            if neighbour < 0 or not self.alive[neighbour]:
+                continue
+            back = self.backs[neighbour]
+            if back != own and back not in candidates:
+                candidates.append(back)
+        return random.sample(candidates, min(count, len(candidates)))
+
+    def update(self, card_id: UUID, back: str) -> None:
+        """Добавить или изменить карточку, пересчитав только затронутые строки"""
+        vector = _vectorize([back], self.dropped)
+        row = self.rows.get(card_id)
+        if row is None:
+            row = self._append_row(card_id, back)
+        else:
+            self.backs[row] = back
+            self.codes[row] = self._code(back)
+        self._pending[row] = vector
+
+        similarity = self._similarity(vector)
+        if len(self._pending) >= PENDING_ROWS:
+            self._merge_pending()
+        similarity[(similarity <= 0) | (self.codes == self.codes[row]) | ~self.alive] = -np.inf
+        candidates = np.nonzero(~np.isneginf(similarity))[0]
+        self._set_neighbours(row, candidates, similarity[candidates])
+
+        # Похожесть симметрична: обновляем строки, где карточка уже есть или должна появиться
+        contains = self.neighbours == row
+        held = contains.any(axis=1)
+        self.scores[contains] = similarity[np.nonzero(contains)[0]]
+        promoted = ~held & (similarity > self.scores[:, -1])
+        promoted[row] = False
+        self.neighbours[promoted, -1] = row
+        self.scores[promoted, -1] = similarity[promoted]
+
+        changed = np.nonzero(held | promoted)[0]
+        if len(changed):
+            order = np.argsort(-self.scores[changed], axis=1)
+            scores = np.take_along_axis(self.scores[changed], order, axis=1)
+            neighbours = np.take_along_axis(self.neighbours[changed], order, axis=1)
+            self.scores[changed] = scores
+            self.neighbours[changed] = np.where(np.isneginf(scores), -1, neighbours)
+
+    def _append_row(self, card_id: UUID, back: str) -> int:
+        row = len(self.backs)
+        if row == len(self._alive):
+            capacity = max(2 * row, 1)
+            self._alive = self._grown(self._alive, capacity, False)
+            self._codes = self._grown(self._codes, capacity, 0)
+            self._neighbours = self._grown(self._neighbours, capacity, -1)
+            self._scores = self._grown(self._scores, capacity, -np.inf)
+        self.rows[card_id] = row
+        self.backs.append(back)
+        self.alive[row] = True
+        self.codes[row] = self._code(back)
+        self.neighbours[row] = -1
+        self.scores[row] = -np.inf
+        return row
+
+    @staticmethod
+    def _grown(array: np.ndarray, capacity: int, fill) -> np.ndarray:
+        grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _similarity(self, vector) -> np.ndarray:
+        """Похожесть вектора со всеми строками: matrix, где строки из _pending важнее"""
+        similarity = np.zeros(len(self.backs), dtype=np.float32)
+        similarity[:self.matrix.shape[0]] = (self.matrix @ vector.T).toarray().ravel()
+        if self._pending:
+            rows = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+            pending = self._stack(list(self._pending.values()))
+            similarity[rows] = (pending @ vector.T).toarray().ravel()
+        return similarity
+
+    @staticmethod
+    def _stack(vectors: List["sparse.csr_matrix"]) -> "sparse.csr_matrix":
+        """Сложить строки в csr-матрицу из их массивов (sparse.vstack на строках медленнее)"""
+        indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+        np.cumsum([vector.nnz for vector in vectors], out=indptr[1:])
+        return sparse.csr_matrix(
+            (
+                np.concatenate([vector.data for vector in vectors]),
+                np.concatenate([vector.indices for vector in vectors]),
+                indptr,
+            ),
+            shape=(len(vectors), HASH_DIM),
+        )
+
+    def _merge_pending(self) -> None:
+        """Влить накопленные строки в matrix одним копированием"""
+        base = self.matrix.shape[0]
+        rows = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+        combined = sparse.vstack([self.matrix, self._stack(list(self._pending.values()))], format="csr")
+        order = np.arange(len(self.backs))
+        order[rows] = base + np.arange(len(rows))
+        self.matrix = combined[order]
+        self._pending.clear()
+
+    def remove(self, card_id: UUID) -> None:
+        """Исключить карточку; ссылки на нее пропускаются при выдаче"""
+        row = self.rows.pop(card_id, None)
+        if row is not None:
+            self.alive[row] = False
+
+    def _set_neighbours(self, row: int, cols: np.ndarray, values: np.ndarray) -> None:
+        if len(cols) > self.top_k:
+            top = np.argpartition(-values, self.top_k - 1)[:self.top_k]
+            cols, values = cols[top], values[top]
+        order = np.argsort(-values)
+        self.neighbours[row] = -1
+        self.scores[row] = -np.inf
+        self.neighbours[row, :len(order)] = cols[order]
+        self.scores[row, :len(order)] = values[order]
+
+    def _code(self, back: str) -> int:
+        return self._back_codes.setdefault(back, len(self._back_codes))
+
+
+class DistractorService:
+    """Индексы похожих ответов по наборам в памяти процесса, с построением в фоне"""
+
+    def __init__(self, max_decks: int = 256, top_k: int = TOP_K):
+        self.max_decks = max_decks
+        self.top_k = top_k
+        self._indexes: "OrderedDict[UUID, DistractorIndex]" = OrderedDict()
+        self._builds: Dict[UUID, asyncio.Task] = {}
+        self._dirty: Set[UUID] = set()
+
+    @staticmethod
+    def available() -> bool:
+        return sparse is not None
+
+    def has_index(self, deck_id: UUID) -> bool:
+        return deck_id in self._indexes
+
+    def get_distractors(self, deck_id: UUID, card_id: UUID, count: int) -> Optional[List[str]]:
+        """Похожие неправильные ответы; None - индекса набора пока нет"""
+        index = self._indexes.get(deck_id)
+        if index is None:
+            return None
+        self._indexes.move_to_end(deck_id)
+        return index.get(card_id, count)
+
+    async def build(self, deck_id: UUID, load: Callable[[], Awaitable[List[Tuple[UUID, str]]]]) -> None:
+        """Построить индекс набора; load возвращает пары (id, back)"""
+        cards = await load()
+        index = await asyncio.to_thread(DistractorIndex.build, cards, self.top_k)
+        self._indexes[deck_id] = index
+        self._indexes.move_to_end(deck_id)
+        while len(self._indexes) > self.max_decks:
+            self._indexes.popitem(last=False)
+
+    def schedule_build(self, deck_id: UUID, load: Callable[[], Awaitable[List[Tuple[UUID, str]]]]) -> None:
+        """Построить индекс в фоне; если построение уже идет - повторить его после"""
+        if not self.available():
+            return
+        if deck_id in self._builds:
+            self._dirty.add(deck_id)
+            return
+
+        async def run():
+            try:
+                while True:
+                    self._dirty.discard(deck_id)
+                    await self.build(deck_id, load)
+                    if deck_id not in self._dirty:
+                        break
+            except Exception as e:
+                logger.warning(f"Distractor index build failed for deck {deck_id}: {e}")
+            finally:
+                if self._builds.get(deck_id) is asyncio.current_task():
+                    del self._builds[deck_id]
+
+        self._builds[deck_id] = asyncio.create_task(run())
+
+    def update_card(self, deck_id: UUID, card_id: UUID, back: str) -> None:
+        """Учесть новую или измененную карточку без полной перестройки"""
+        if deck_id in self._builds:
+            self._dirty.add(deck_id)
+        index = self._indexes.get(deck_id)
+        if index is not None:
+            index.update(card_id, back)
+
+    def remove_card(self, deck_id: UUID, card_id: UUID) -> None:
+        if deck_id in self._builds:
+            self._dirty.add(deck_id)
+        index = self._indexes.get(deck_id)
+        if index is not None:
+            index.remove(card_id)
+
+    def drop(self, deck_id: UUID) -> None:
+        """Забыть набор (например, удаленный); идущее построение отменяется, чтобы не вернуть индекс"""
+        build = self._builds.pop(deck_id, None)
+        if build is not None:
+            build.cancel()
+        self._dirty.discard(deck_id)
+        self._indexes.pop(deck_id, None)
+
+
+distractor_service = DistractorService()
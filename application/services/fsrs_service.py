@@ -1,7 +1,39 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
 from domain.entities.card import FSRSState
 
 
+@dataclass
+class FSRSBatchResult:
+    """Результат пакетного пересчета: колонки состояний FSRS в виде массивов numpy"""
+    stability: np.ndarray
+    difficulty: np.ndarray
+    ease_factor: np.ndarray
+    interval: np.ndarray
+    review_count: np.ndarray
+    last_review: np.ndarray
+    due_date: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.stability)
+
+    def to_columns(self) -> Dict[str, List]:
+        """Колонки с python-значениями для массовой записи в репозиторий"""
+        return {
+            "stability": self.stability.tolist(),
+            "difficulty": self.difficulty.tolist(),
+            "ease_factor": self.ease_factor.tolist(),
+            "interval": self.interval.tolist(),
+            "review_count": self.review_count.tolist(),
+            "last_review": self.last_review.astype("datetime64[us]").tolist(),
+            "due_date": self.due_date.astype("datetime64[us]").tolist(),
+        }
+
+
 class FSRSService:
     """
     FSRS (Free Spaced Repetition Scheduler) - улучшенный алгоритм интервального повторения
@@ -15,7 +47,9 @@ class FSRSService:
         self.max_stability = 365.0
         self.forgetting_curve = 0.9
     
-    def review_card(self, state: FSRSState, quality: int) -> FSRSState:
+    def review_card(
+        self, state: FSRSState, quality: int, now: Optional[datetime] = None
+    ) -> FSRSState:
         """
         Обработать повторение карточки
         
@@ -28,11 +62,13 @@ class FSRSService:
                 - 3: Отлично (легко)
                 - 4: Очень легко
                 - 5: Слишком легко
+            now: Время повторения (по умолчанию текущее)
             
         Returns:
             Обновленное состояние карточки
         """
-        now = datetime.utcnow()
+        if now is None:
+            now = datetime.utcnow()
         
         # Если карточка новая (первое повторение)
         if state.review_count == 0:
@@ -94,6 +130,89 @@ class FSRSService:
         
         return state
     
+    def review_batch(
+        self,
+        stability: np.ndarray,
+        difficulty: np.ndarray,
+        ease_factor: np.ndarray,
+        review_count: np.ndarray,
+        quality: np.ndarray,
+        now: Optional[datetime] = None,
+    ) -> FSRSBatchResult:
+        """
+        Пакетно обработать повторения для массивов карточек за один проход numpy
+        
+        Результат совпадает с поэлементным вызовом review_card.
+        
+        Args:
+            stability, difficulty, ease_factor, review_count: Колонки текущих состояний
+            quality: Оценки качества ответов (0-5)
+            now: Время повторения (по умолчанию текущее)
+        
+        Returns:
+            Колонки обновленных состояний
+        """
+        if now is None:
+            now = datetime.utcnow()
+
+        stability = np.asarray(stability, dtype=np.float64)
+        difficulty = np.asarray(difficulty, dtype=np.float64)
+        ease_factor = np.asarray(ease_factor, dtype=np.float64)
+        review_count = np.asarray(review_count, dtype=np.int64)
+        quality = np.asarray(quality, dtype=np.int64)
+
+        is_first = review_count == 0
+        is_good = quality >= 3
+
+        # Первое повторение
+        first_stability = np.where(
+            is_good,
+            self.initial_stability * (1 + quality - 3),
+            self.initial_stability * 0.5,
+        )
+        first_difficulty = np.maximum(0.1, np.minimum(1.0, (4 - quality) / 4))
+
+        # Последующие повторения
+        next_stability = np.where(
+            is_good,
+            np.where(
+                review_count == 1,
+                stability * 1.5,
+                stability * (1 + (quality - 3) * 0.3),
+            ),
+            stability * 0.8,
+        )
+        next_stability = np.maximum(self.min_stability, np.minimum(self.max_stability, next_stability))
+        next_difficulty = difficulty - 0.2 + (4 - quality) * 0.1
+        next_difficulty = np.maximum(0.1, np.minimum(1.0, next_difficulty))
+        next_ease = ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        next_ease = np.maximum(1.3, np.minimum(2.5, next_ease))
+
+        new_stability = np.where(is_first, first_stability, next_stability)
+        new_difficulty = np.where(is_first, first_difficulty, next_difficulty)
+        new_ease = np.where(is_first, 2.5, next_ease)
+        new_review_count = np.where(is_first, 1, review_count + 1)
+
+        interval = np.where(
+            is_good,
+            np.maximum(1, np.trunc(new_stability * 2)).astype(np.int64),
+            1,
+        ).astype(np.int64)
+
+        now64 = np.datetime64(now, "us")
+        last_review = np.full(len(quality), now64, dtype="datetime64[us]")
+        due_date = now64 + interval.astype("timedelta64[D]")
+
+        return FSRSBatchResult(
+            stability=new_stability,
+            difficulty=new_difficulty,
+            ease_factor=new_ease,
+            interval=interval,
+            review_count=new_review_count,
+            last_review=last_review,
+            due_date=due_date,
+        )
+
     def _calculate_interval(self, stability: float, quality: int) -> int:
         """Вычислить интервал до следующего повторения (в днях)"""
         if quality >= 3:
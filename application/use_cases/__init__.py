@@ -13,6 +13,7 @@ from .card_use_cases import (
     DeleteCardUseCase,
     GetDueCardsUseCase,
     ReviewCardUseCase,
+    ReviewCardsBatchUseCase,
 )
 from .study_use_cases import (
     StartStudySessionUseCase,
@@ -36,6 +37,7 @@ __all__ = [
     "DeleteCardUseCase",
     "GetDueCardsUseCase",
     "ReviewCardUseCase",
+    "ReviewCardsBatchUseCase",
     "StartStudySessionUseCase",
     "FinishStudySessionUseCase",
     "StudyFlashcardsUseCase",
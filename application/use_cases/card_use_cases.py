@@ -1,4 +1,5 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from domain.entities.card import Card
@@ -34,8 +35,15 @@ class GetDeckCardsUseCase:
     def __init__(self, card_repository: ICardRepository):
         self._card_repository = card_repository
 
-    async def execute(self, deck_id: UUID) -> List[Card]:
-        return await self._card_repository.get_by_deck_id(deck_id)
+    async def execute(
+        self,
+        deck_id: UUID,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, UUID]] = None,
+    ) -> List[Card]:
+        if limit is None:
+            return await self._card_repository.get_by_deck_id(deck_id)
+        return await self._card_repository.get_page_by_deck_id(deck_id, limit, after)
 
 
 class UpdateCardUseCase:
@@ -95,8 +103,73 @@ class ReviewCardUseCase:
         if not card:
             raise ValueError(f"Card with id {card_id} not found")
         
+        return await self.review(card, quality)
+
+    async def review(self, card: Card, quality: int) -> Card:
+        """Отметить уже загруженную карточку как просмотренную (один UPDATE)"""
+        if quality < 0 or quality > 5:
+            raise ValueError("Quality must be between 0 and 5")
+        
         # Обновляем состояние FSRS
         card.fsrs_state = self._fsrs_service.review_card(card.fsrs_state, quality)
-        card.update()
         
-        return await self._card_repository.update(card)
+        reviewed_card = await self._card_repository.update_fsrs_state(card)
+        if not reviewed_card:
+            raise ValueError(f"Card with id {card.id} not found")
+        return reviewed_card
+
+
+class ReviewCardsBatchUseCase:
+    def __init__(self, card_repository: ICardRepository, fsrs_service: FSRSService):
+        self._card_repository = card_repository
+        self._fsrs_service = fsrs_service
+
+    async def execute(
+        self, cards: List[Card], reviews: List[Tuple[UUID, int, Optional[datetime]]]
+    ) -> List[Card]:
+        """
+        Применить пачку повторений (например, накопленных офлайн) одной записью в БД
+        
+        Args:
+            cards: Уже загруженные карточки, к которым относятся повторения
+            reviews: Повторения (card_id, quality, reviewed_at); без reviewed_at
+                используется текущее время
+        
+        Returns:
+            Обновленные карточки
+        """
+        cards_by_id = {card.id: card for card in cards}
+        now = datetime.utcnow()
+
+        for card_id, quality, _ in reviews:
+            if quality < 0 or quality > 5:
+                raise ValueError("Quality must be between 0 and 5")
+            if card_id not in cards_by_id:
+                raise ValueError(f"Card with id {card_id} not found")
+
+        # Переходы FSRS для каждой карточки применяются в хронологическом порядке
+        ordered = sorted(reviews, key=lambda review: review[2] or now)
+        reviewed = {}
+        for card_id, quality, reviewed_at in ordered:
+            card = cards_by_id[card_id]
+            card.fsrs_state = self._fsrs_service.review_card(
+                card.fsrs_state, quality, now=reviewed_at or now
+            )
+            card.update()
+            reviewed[card_id] = card
+
+        reviewed_cards = list(reviewed.values())
+        await self._card_repository.bulk_update_fsrs(
+            [card.id for card in reviewed_cards],
+            {
+                "stability": [card.fsrs_state.stability for card in reviewed_cards],
+                "difficulty": [card.fsrs_state.difficulty for card in reviewed_cards],
+                "ease_factor": [card.fsrs_state.ease_factor for card in reviewed_cards],
+                "interval": [card.fsrs_state.interval for card in reviewed_cards],
+                "review_count": [card.fsrs_state.review_count for card in reviewed_cards],
+                "last_review": [card.fsrs_state.last_review for card in reviewed_cards],
+                "due_date": [card.fsrs_state.due_date for card in reviewed_cards],
+                "updated_at": [card.updated_at for card in reviewed_cards],
+            },
+        )
+        return reviewed_cards
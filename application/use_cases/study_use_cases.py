@@ -1,13 +1,16 @@
 import random
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from domain.entities.card import Card
 from domain.entities.study_session import StudySession, StudyMode
 from domain.repositories.card_repository import ICardRepository
 from domain.repositories.deck_repository import IDeckRepository
+from domain.repositories.due_queue import IDueQueue
 from domain.repositories.study_session_repository import IStudySessionRepository
 from application.use_cases.card_use_cases import ReviewCardUseCase
+from application.services.distractor_service import DistractorService
+from application.services.answer_grader import grade_answer
 
 
 class StartStudySessionUseCase:
@@ -38,10 +41,12 @@ class StudyFlashcardsUseCase:
         card_repository: ICardRepository,
         deck_repository: IDeckRepository,
         review_card_use_case: ReviewCardUseCase,
+        due_queue: Optional[IDueQueue] = None,
     ):
         self._card_repository = card_repository
         self._deck_repository = deck_repository
         self._review_card_use_case = review_card_use_case
+        self._due_queue = due_queue
 
     async def execute(self, deck_id: UUID, limit: int = 20) -> List[Card]:
         # Проверяем существование набора
@@ -49,8 +54,12 @@ class StudyFlashcardsUseCase:
         if not deck:
             raise ValueError(f"Deck with id {deck_id} not found")
         
-        # Получаем карточки для повторения
-        cards = await self._card_repository.get_due_cards(deck_id, limit)
+        # Получаем карточки для повторения (из очереди, если она подключена)
+        cards = None
+        if self._due_queue:
+            cards = await self._due_queue.get_due_cards(deck_id, limit)
+        if cards is None:
+            cards = await self._card_repository.get_due_cards(deck_id, limit)
         if not cards:
             # Если нет карточек для повторения, возвращаем все карточки
             cards = await self._card_repository.get_by_deck_id(deck_id)
@@ -58,16 +67,21 @@ class StudyFlashcardsUseCase:
         return cards[:limit]
 
 
+MAX_DISTRACTOR_POOL = 100
+
+
 class StudyMultipleChoiceUseCase:
     def __init__(
         self,
         card_repository: ICardRepository,
         deck_repository: IDeckRepository,
         review_card_use_case: ReviewCardUseCase,
+        distractor_service: Optional[DistractorService] = None,
     ):
         self._card_repository = card_repository
         self._deck_repository = deck_repository
         self._review_card_use_case = review_card_use_case
+        self._distractor_service = distractor_service
 
     async def execute(self, deck_id: UUID, card_id: UUID) -> Tuple[Card, List[str]]:
         """
@@ -81,20 +95,57 @@ class StudyMultipleChoiceUseCase:
         if not card:
             raise ValueError(f"Card with id {card_id} not found")
         
-        # Получаем все карточки из набора
-        all_cards = await self._card_repository.get_by_deck_id(deck_id)
-        
-        # Формируем варианты ответов (правильный + 3 случайных)
-        other_cards = [c for c in all_cards if c.id != card_id]
-        random.shuffle(other_cards)
-        
-        options = [card.back]  # Правильный ответ
-        options.extend([c.back for c in other_cards[:3]])  # 3 случайных ответа
+        # Формируем варианты ответов: правильный + 3 похожих из индекса набора,
+        # а если индекса еще нет или похожих мало - 3 случайных
+        distractors = None
+        if self._distractor_service:
+            distractors = self._distractor_service.get_distractors(deck_id, card_id, 3)
+        if not distractors or len(distractors) < 3:
+            distractors = await self._card_repository.sample_backs(deck_id, 3, exclude_back=card.back)
         
+        options = [card.back]
+        options.extend(distractors)
         random.shuffle(options)  # Перемешиваем варианты
         
         return card, options
 
+    async def build_session(self, deck_id: UUID, limit: int = 20) -> List[Tuple[Card, List[str]]]:
+        """
+        Собрать тест из limit вопросов с вариантами ответов
+        
+        Вместо запроса на каждый вопрос - один запрос за карточками к повторению
+        и один за общим пулом случайных вариантов (для вопросов, которые не
+        покрывает индекс похожих ответов).
+        """
+        cards = await self._card_repository.get_due_cards(deck_id, limit)
+        if not cards:
+            cards = await self._card_repository.get_page_by_deck_id(deck_id, limit)
+
+        similar = {}
+        if self._distractor_service:
+            for card in cards:
+                distractors = self._distractor_service.get_distractors(deck_id, card.id, 3)
+                if distractors and len(distractors) == 3:
+                    similar[card.id] = distractors
+
+        pool = []
+        uncovered = len(cards) - len(similar)
+        if uncovered:
+            pool = await self._card_repository.sample_backs(
+                deck_id, min(3 * uncovered + 1, MAX_DISTRACTOR_POOL)
+            )
+
+        session = []
+        for card in cards:
+            distractors = similar.get(card.id)
+            if distractors is None:
+                candidates = [back for back in pool if back != card.back]
+                distractors = random.sample(candidates, min(3, len(candidates)))
+            options = [card.back, *distractors]
+            random.shuffle(options)
+            session.append((card, options))
+        return session
+
 
 class StudyWriteUseCase:
     def __init__(
@@ -116,24 +167,22 @@ class StudyWriteUseCase:
         if not card:
             raise ValueError(f"Card with id {card_id} not found")
         
-        # Простая проверка (можно улучшить с помощью fuzzy matching)
-        user_answer_lower = user_answer.strip().lower()
-        correct_answer_lower = card.back.strip().lower()
-        
-        is_correct = user_answer_lower == correct_answer_lower
-        
-        # Оцениваем качество ответа
-        if is_correct:
-            quality = 4  # Отлично
-        else:
-            # Проверяем частичное совпадение
-            if correct_answer_lower in user_answer_lower or user_answer_lower in correct_answer_lower:
-                quality = 2  # Частично правильно
-            else:
-                quality = 0  # Неправильно
+        # Нечеткое сравнение: регистр, ё/е, пунктуация, порядок слов и опечатки
+        is_correct, quality = grade_answer(user_answer, card.back)
         
         return is_correct, quality
 
+    async def submit(self, card: Card, user_answer: str) -> Tuple[bool, int, Card]:
+        """
+        Проверить ответ по уже загруженной карточке и сохранить повторение (один UPDATE)
+        
+        Returns:
+            Tuple[bool, int, Card]: (правильность ответа, оценка качества 0-5, обновленная карточка)
+        """
+        is_correct, quality = grade_answer(user_answer, card.back)
+        reviewed_card = await self._review_card_use_case.review(card, quality)
+        return is_correct, quality, reviewed_card
+
 
 class StudyMatchUseCase:
     def __init__(
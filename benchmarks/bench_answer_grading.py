@@ -0,0 +1,42 @@
+"""
+Бенчмарк оценки письменных ответов
+
+Проверяет, что grade_answer укладывается в бюджет (50 мкс) на типичных
+ответах: точный, с опечаткой, с другим порядком слов и неверный.
+Нормализованные правильные ответы берутся из кэша, как при повторных проверках.
+
+Запуск:
+    python -m benchmarks.bench_answer_grading
+"""
+import sys
+import timeit
+
+from application.services.answer_grader import grade_answer
+
+BUDGET_US = 50
+ROUNDS = 20000
+
+CASES = [
+    ("exact", "Восприятие", "восприятие"),
+    ("typo", "восприятия", "Восприятие"),
+    ("word order", "red delicious apple", "apple, red delicious"),
+    ("phrase typo", "to take into acount", "to take into account"),
+    ("wrong", "собака", "кошка"),
+    ("long wrong", "a completely different sentence here", "the quick brown fox jumps over the lazy dog"),
+]
+
+
+def main() -> int:
+    worst = 0.0
+    for name, answer, correct in CASES:
+        grade_answer(answer, correct)  # прогрев кэша нормализации
+        elapsed = timeit.timeit(lambda: grade_answer(answer, correct), number=ROUNDS) / ROUNDS * 1e6
+        worst = max(worst, elapsed)
+        print(f"{name:>12}: {elapsed:6.1f} us  {grade_answer(answer, correct)}")
+
+    print(f"worst {worst:.1f} us, budget {BUDGET_US} us")
+    return 0 if worst <= BUDGET_US else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
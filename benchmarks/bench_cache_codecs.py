@@ -0,0 +1,92 @@
+"""
+Бенчмарк кодеков кэша на реальных ответах API
+
+Кодирует и декодирует список DeckResponse и страницу CardResponse
+каждым доступным кодеком, печатает время и размер значения.
+json получает model_dump(mode="json") (как раньше в кэше), orjson и msgpack -
+model_dump() с нативными datetime/UUID.
+
+Запуск:
+    python -m benchmarks.bench_cache_codecs 100
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from infrastructure.services.cache_codecs import CODECS
+from presentation.schemas.card_schemas import CardResponse, FSRSStateResponse
+from presentation.schemas.deck_schemas import DeckResponse
+
+ROUNDS = 200
+
+
+def make_decks(count: int) -> list:
+    now = datetime.utcnow()
+    user_id = uuid4()
+    return [
+        DeckResponse(
+            id=uuid4(),
+            user_id=user_id,
+            title=f"Deck {i}",
+            description="Слова и выражения для ежедневной практики",
+            is_public=False,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def make_cards(count: int) -> list:
+    now = datetime.utcnow()
+    deck_id = uuid4()
+    return [
+        CardResponse(
+            id=uuid4(),
+            deck_id=deck_id,
+            front=f"термин {i}",
+            back=f"definition number {i} with a few more words",
+            audio_url=None,
+            fsrs_state=FSRSStateResponse(
+                stability=2.5,
+                difficulty=5.1,
+                ease_factor=2.5,
+                interval=3,
+                review_count=4,
+                last_review=now,
+                due_date=now + timedelta(days=3),
+            ),
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def bench(label: str, models: list) -> None:
+    print(f"{label}: {len(models)} objects")
+    for name, codec_cls in CODECS.items():
+        if not codec_cls.available():
+            print(f"{name:>8}: not installed")
+            continue
+        codec = codec_cls()
+        mode = "json" if name == "json" else "python"
+        payload = [model.model_dump(mode=mode) for model in models]
+        encoded = codec.encode(payload)
+
+        encode_time = timeit.timeit(lambda: codec.encode(payload), number=ROUNDS) / ROUNDS
+        decode_time = timeit.timeit(lambda: codec.decode(encoded), number=ROUNDS) / ROUNDS
+        print(
+            f"{name:>8}: encode {encode_time * 1e6:9.1f} us, "
+            f"decode {decode_time * 1e6:9.1f} us, size {len(encoded):8d} B"
+        )
+
+
+def main(count: int) -> None:
+    bench("DeckResponse", make_decks(count))
+    bench("CardResponse", make_cards(count))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
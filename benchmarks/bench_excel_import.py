@@ -0,0 +1,92 @@
+"""
+Бенчмарк разбора Excel при импорте: полная загрузка книги и потоковое чтение
+
+full - прежний способ: load_workbook в обычном режиме и список всех строк,
+stream - ImportService.iter_excel_rows (read_only) пачками по db_batch_size.
+Каждый способ запускается в отдельном процессе, чтобы пиковый RSS не смешивался.
+Печатает общее время, время до первой пачки (когда строки могли бы уйти в БД)
+и пиковый RSS процесса.
+
+Запуск:
+    python -m benchmarks.bench_excel_import 200000
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+
+from openpyxl import Workbook, load_workbook
+
+from infrastructure.config import settings
+from infrastructure.services.import_service import ImportService
+
+
+def make_workbook(path: str, count: int) -> None:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Term", "Definition"])
+    for i in range(count):
+        sheet.append([f"Term {i}", f"Definition number {i} with a few more words"])
+    workbook.save(path)
+
+
+def parse_full(path: str):
+    with open(path, "rb") as source:
+        workbook = load_workbook(source)
+        rows = []
+        for row in workbook.active.iter_rows(min_row=2, values_only=True):
+            if len(row) >= 2 and row[0] and row[1]:
+                rows.append((str(row[0]).strip(), str(row[1]).strip()))
+    # Вставка начинается только после разбора всей книги
+    yield rows
+
+
+def parse_stream(path: str):
+    with open(path, "rb") as source:
+        rows = ImportService.iter_excel_rows(source)
+        while chunk := list(islice(rows, settings.db_batch_size)):
+            yield chunk
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss - килобайты на Linux, байты на macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run(mode: str, path: str) -> None:
+    parse = {"full": parse_full, "stream": parse_stream}[mode]
+    started = time.perf_counter()
+    first_chunk = None
+    rows = 0
+    for chunk in parse(path):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - started
+        rows += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{mode:>6}: {rows} rows, total {elapsed:6.2f} s, "
+        f"first chunk {first_chunk:6.2f} s, peak RSS {peak_rss_mb():7.1f} MB"
+    )
+
+
+def main(count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.xlsx")
+        make_workbook(path, count)
+        print(f"{count} rows, {os.path.getsize(path) / 1024 / 1024:.1f} MB xlsx")
+        for mode in ("full", "stream"):
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_excel_import", "--run", mode, path],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        run(sys.argv[2], sys.argv[3])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,67 @@
+"""
+Бенчмарк задержки event loop при массовом входе пользователей
+
+Сравнивает синхронную проверку пароля в обработчике (как было) и проверку
+в пуле потоков (verify_password_async) при N одновременных логинах.
+
+Запуск:
+    python -m benchmarks.bench_password_hashing 200
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from infrastructure.security import get_password_hash, verify_password, verify_password_async
+
+TICK = 0.005
+
+
+async def measure_lag(stop: asyncio.Event, lags: list) -> None:
+    """Насколько позже запланированного просыпается корутина со sleep(TICK)"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def sync_login(hashed: str) -> bool:
+    return verify_password("secret", hashed)
+
+
+async def async_login(hashed: str) -> bool:
+    return await verify_password_async("secret", hashed)
+
+
+async def run(login, hashed: str, logins: int) -> None:
+    stop = asyncio.Event()
+    lags = []
+    monitor = asyncio.create_task(measure_lag(stop, lags))
+    await asyncio.sleep(TICK * 2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login(hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await monitor
+    assert all(results)
+
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if len(lags_ms) > 1 else lags_ms[-1]
+    print(
+        f"{login.__name__:>12}: total {elapsed:6.2f} s, "
+        f"loop lag max {lags_ms[-1]:8.1f} ms, p99 {p99:8.1f} ms, "
+        f"median {statistics.median(lags_ms):6.1f} ms"
+    )
+
+
+async def main(logins: int) -> None:
+    hashed = get_password_hash("secret")
+    print(f"{logins} concurrent logins")
+    await run(sync_login, hashed, logins)
+    await run(async_login, hashed, logins)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -2,5 +2,15 @@ from .user import User
 from .deck import Deck
 from .card import Card
 from .study_session import StudySession, StudyMode
+from .import_job import ImportJob, ImportJobStatus, ImportSource
 
-__all__ = ["User", "Deck", "Card", "StudySession", "StudyMode"]
+__all__ = [
+    "User",
+    "Deck",
+    "Card",
+    "StudySession",
+    "StudyMode",
+    "ImportJob",
+    "ImportJobStatus",
+    "ImportSource",
+]
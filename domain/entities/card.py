@@ -1,3 +1,5 @@
+import hashlib
+import unicodedata
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional
@@ -26,6 +28,17 @@ class Card:
     updated_at: datetime
     fsrs_state: FSRSState = field(default_factory=FSRSState)
     audio_url: Optional[str] = None
+    # Хэш нормализованных (front, back): одинаковые карточки в наборе не дублируются
+    content_hash: Optional[str] = None
+
+    @staticmethod
+    def hash_content(front: str, back: str) -> str:
+        """sha256 пары без учета регистра, формы Unicode и лишних пробелов"""
+        parts = (
+            " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+            for text in (front, back)
+        )
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
 
     @classmethod
     def create(cls, deck_id: UUID, front: str, back: str) -> "Card":
@@ -38,6 +51,7 @@ class Card:
             created_at=now,
             updated_at=now,
             fsrs_state=FSRSState(),
+            content_hash=cls.hash_content(front, back),
         )
 
     def update(self, front: Optional[str] = None, back: Optional[str] = None) -> None:
@@ -45,6 +59,7 @@ class Card:
             self.front = front
         if back is not None:
             self.back = back
+        self.content_hash = self.hash_content(self.front, self.back)
         self.updated_at = datetime.utcnow()
 
     def mark_reviewed(self, quality: int) -> None:
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from uuid import UUID, uuid4
+
+
+class ImportJobStatus(str, Enum):
+    PENDING = "pending"  # Ждет воркера
+    RUNNING = "running"  # Разбор и вставка идут
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ImportSource(str, Enum):
+    EXCEL = "excel"
+    WORD = "word"
+
+
+@dataclass
+class ImportJob:
+    id: UUID
+    user_id: UUID
+    deck_id: UUID
+    source: ImportSource
+    filename: str
+    file_path: str
+    status: ImportJobStatus
+    rows_parsed: int  # Пар обработано в закоммиченных пачках - с этого места задание продолжается
+    rows_inserted: int  # Новых карточек вставлено (дубликаты пропускаются)
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime]
+    file_hash: Optional[str] = None  # sha256 загрузки - по нему узнается повторная загрузка
+    attempt: int = 0  # Номер захвата воркером; записи прежнего владельца отклоняются
+
+    @classmethod
+    def create(
+        cls,
+        user_id: UUID,
+        deck_id: UUID,
+        source: ImportSource,
+        filename: str,
+        file_path: str,
+        job_id: Optional[UUID] = None,
+        file_hash: Optional[str] = None,
+    ) -> "ImportJob":
+        now = datetime.utcnow()
+        return cls(
+            id=job_id or uuid4(),
+            user_id=user_id,
+            deck_id=deck_id,
+            source=source,
+            filename=filename,
+            file_path=file_path,
+            status=ImportJobStatus.PENDING,
+            rows_parsed=0,
+            rows_inserted=0,
+            error=None,
+            created_at=now,
+            updated_at=now,
+            finished_at=None,
+            file_hash=file_hash,
+        )
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (ImportJobStatus.COMPLETED, ImportJobStatus.FAILED)
+
+    def complete(self) -> None:
+        self.status = ImportJobStatus.COMPLETED
+        self.updated_at = self.finished_at = datetime.utcnow()
+
+    def fail(self, error: str) -> None:
+        self.status = ImportJobStatus.FAILED
+        self.error = error
+        self.updated_at = self.finished_at = datetime.utcnow()
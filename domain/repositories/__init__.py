@@ -1,11 +1,17 @@
 from .user_repository import IUserRepository
 from .deck_repository import IDeckRepository
-from .card_repository import ICardRepository
+from .card_repository import ICardRepository, DuplicateCardError
 from .study_session_repository import IStudySessionRepository
+from .due_queue import IDueQueue
+from .import_job_repository import IImportJobRepository, ImportJobLostError
 
 __all__ = [
     "IUserRepository",
     "IDeckRepository",
     "ICardRepository",
+    "DuplicateCardError",
     "IStudySessionRepository",
+    "IDueQueue",
+    "IImportJobRepository",
+    "ImportJobLostError",
 ]
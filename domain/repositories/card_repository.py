@@ -1,10 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
 
 from domain.entities.card import Card
 
 
+class DuplicateCardError(ValueError):
+    """В наборе уже есть карточка с тем же содержимым"""
+
+
 class ICardRepository(ABC):
     @abstractmethod
     async def create(self, card: Card) -> Card:
@@ -14,10 +19,44 @@ class ICardRepository(ABC):
     async def get_by_id(self, card_id: UUID) -> Optional[Card]:
         pass
 
+    @abstractmethod
+    async def get_with_owner(self, card_id: UUID) -> Optional[Tuple[Card, UUID]]:
+        pass
+
+    @abstractmethod
+    async def get_many_with_owner(self, card_ids: List[UUID]) -> List[Tuple[Card, UUID]]:
+        pass
+
+    @abstractmethod
+    async def get_by_ids(self, card_ids: List[UUID]) -> List[Card]:
+        pass
+
     @abstractmethod
     async def get_by_deck_id(self, deck_id: UUID) -> List[Card]:
         pass
 
+    @abstractmethod
+    async def sample_backs(self, deck_id: UUID, k: int, exclude_back: Optional[str] = None) -> List[str]:
+        pass
+
+    @abstractmethod
+    async def get_backs(self, deck_id: UUID) -> List[Tuple[UUID, str]]:
+        pass
+
+    @abstractmethod
+    async def get_due_dates(self, deck_id: UUID) -> List[Tuple[UUID, Optional[datetime]]]:
+        pass
+
+    @abstractmethod
+    async def get_page_by_deck_id(
+        self, deck_id: UUID, limit: int, after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[Card]:
+        pass
+
+    @abstractmethod
+    def stream_by_deck_id(self, deck_id: UUID) -> AsyncIterator[Card]:
+        pass
+
     @abstractmethod
     async def get_due_cards(self, deck_id: UUID, limit: Optional[int] = None) -> List[Card]:
         pass
@@ -26,10 +65,18 @@ class ICardRepository(ABC):
     async def update(self, card: Card) -> Card:
         pass
 
+    @abstractmethod
+    async def update_fsrs_state(self, card: Card) -> Optional[Card]:
+        pass
+
     @abstractmethod
     async def delete(self, card_id: UUID) -> bool:
         pass
 
     @abstractmethod
-    async def bulk_create(self, cards: List[Card]) -> List[Card]:
+    async def bulk_create(self, cards: Iterable[Card], chunk_size: Optional[int] = None) -> List[Card]:
+        pass
+
+    @abstractmethod
+    async def bulk_update_fsrs(self, card_ids: List[UUID], columns: Dict[str, List[Any]]) -> int:
         pass
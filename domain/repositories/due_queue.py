@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+from uuid import UUID
+
+from domain.entities.card import Card
+
+
+class IDueQueue(ABC):
+    """Индекс карточек набора, упорядоченный по due_date"""
+
+    @abstractmethod
+    async def get_due_cards(self, deck_id: UUID, limit: Optional[int] = None) -> Optional[List[Card]]:
+        """Карточки к повторению; None - индекс недоступен, нужен запрос к БД"""
+        pass
+
+    @abstractmethod
+    async def update_cards(self, cards: Iterable[Card]) -> None:
+        pass
+
+    @abstractmethod
+    async def remove_cards(self, deck_id: UUID, card_ids: Iterable[UUID]) -> None:
+        pass
+
+    @abstractmethod
+    async def drop(self, deck_id: UUID) -> None:
+        pass
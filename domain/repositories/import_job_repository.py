@@ -0,0 +1,37 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from domain.entities.card import Card
+from domain.entities.import_job import ImportJob
+
+
+class ImportJobLostError(RuntimeError):
+    """Задание забрал другой воркер - этот должен прекратить работу с ним"""
+
+
+class IImportJobRepository(ABC):
+    @abstractmethod
+    async def create(self, job: ImportJob) -> ImportJob:
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, job_id: UUID) -> Optional[ImportJob]:
+        pass
+
+    @abstractmethod
+    async def get_unfinished(self) -> List[ImportJob]:
+        pass
+
+    @abstractmethod
+    async def claim(self, job_id: UUID, stale_before: Optional[datetime] = None) -> Optional[ImportJob]:
+        pass
+
+    @abstractmethod
+    async def update(self, job: ImportJob) -> ImportJob:
+        pass
+
+    @abstractmethod
+    async def save_chunk(self, job: ImportJob, cards: List[Card]) -> ImportJob:
+        pass
@@ -18,17 +18,38 @@ class Settings(BaseSettings):
     secret_key: str = Field(..., env="SECRET_KEY")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    password_hash_workers: int = Field(4, env="PASSWORD_HASH_WORKERS")
+    token_cache_size: int = Field(10000, env="TOKEN_CACHE_SIZE")
+    user_cache_size: int = Field(10000, env="USER_CACHE_SIZE")
+    user_cache_ttl: int = Field(60, env="USER_CACHE_TTL")
 
     google_cloud_api_key: Optional[str] = Field(None, env="GOOGLE_CLOUD_API_KEY")
     tts_language: str = Field("ru", env="TTS_LANGUAGE")
 
+    db_batch_size: int = Field(1000, env="DB_BATCH_SIZE")
+    import_copy_threshold: int = Field(50000, env="IMPORT_COPY_THRESHOLD")
+    import_workers: int = Field(2, env="IMPORT_WORKERS")
+    import_job_stale_seconds: int = Field(60, env="IMPORT_JOB_STALE_SECONDS")
+    import_result_ttl: int = Field(86400, env="IMPORT_RESULT_TTL")
+    import_result_max_cards: int = Field(1000, env="IMPORT_RESULT_MAX_CARDS")
+    celery_broker_url: Optional[str] = Field(None, env="CELERY_BROKER_URL")
+
     redis_url: Optional[str] = Field(None, env="REDIS_URL")
+    cache_local_size: int = Field(10000, env="CACHE_LOCAL_SIZE")
+    cache_local_ttl: int = Field(30, env="CACHE_LOCAL_TTL")
+    cache_codec: str = Field("orjson", env="CACHE_CODEC")
+    due_queue_enabled: bool = Field(False, env="DUE_QUEUE_ENABLED")
+    due_queue_ttl: int = Field(86400, env="DUE_QUEUE_TTL")
+    cache_tag_ttl: int = Field(86400, env="CACHE_TAG_TTL")
+    cache_lock_timeout_ms: int = Field(5000, env="CACHE_LOCK_TIMEOUT_MS")
 
     log_level: str = Field("INFO", env="LOG_LEVEL")
     log_file: Optional[str] = Field("logs/app.log", env="LOG_FILE")
 
     max_upload_size: int = 10485760
     upload_dir: str = Field("uploads", env="UPLOAD_DIR")
+    ocr_workers: int = Field(2, env="OCR_WORKERS")
+    ocr_languages: str = Field("rus+eng", env="OCR_LANGUAGES")
 
     class Config:
         env_file = ".env"
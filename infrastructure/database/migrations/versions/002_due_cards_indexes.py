@@ -0,0 +1,30 @@
+"""Due cards indexes
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_cards_deck_id_due_date', 'cards', ['deck_id', 'due_date'])
+    op.create_index(
+        'ix_cards_deck_id_new',
+        'cards',
+        ['deck_id'],
+        postgresql_where=sa.text('due_date IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cards_deck_id_new', table_name='cards')
+    op.drop_index('ix_cards_deck_id_due_date', table_name='cards')
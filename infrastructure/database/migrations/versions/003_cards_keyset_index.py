@@ -0,0 +1,22 @@
+"""Cards keyset pagination index
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_cards_deck_id_created_at_id', 'cards', ['deck_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cards_deck_id_created_at_id', table_name='cards')
@@ -0,0 +1,47 @@
+"""Background import jobs
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'import_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('deck_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('source', sa.String(20), nullable=False),
+        sa.Column('filename', sa.String(255), nullable=False),
+        sa.Column('file_path', sa.String(500), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('rows_parsed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rows_inserted', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['deck_id'], ['decks.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_import_jobs_user_id', 'import_jobs', ['user_id'])
+    op.create_index('ix_import_jobs_deck_id', 'import_jobs', ['deck_id'])
+    op.create_index('ix_import_jobs_status', 'import_jobs', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_import_jobs_status', table_name='import_jobs')
+    op.drop_index('ix_import_jobs_deck_id', table_name='import_jobs')
+    op.drop_index('ix_import_jobs_user_id', table_name='import_jobs')
+    op.drop_table('import_jobs')
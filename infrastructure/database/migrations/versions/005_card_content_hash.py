@@ -0,0 +1,93 @@
+"""Card content hash for import deduplication
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+import hashlib
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _hash_content(front: str, back: str) -> str:
+    """Копия Card.hash_content на момент миграции: повтор миграции дает те же хэши"""
+    parts = (
+        " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+        for text in (front, back)
+    )
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column('cards', sa.Column('content_hash', sa.String(64), nullable=True))
+    _backfill_content_hash()
+    op.create_index(
+        'ux_cards_deck_id_content_hash', 'cards', ['deck_id', 'content_hash'], unique=True
+    )
+
+    op.add_column('import_jobs', sa.Column('file_hash', sa.String(64), nullable=True))
+
+
+def _backfill_content_hash() -> None:
+    """
+    Посчитать хэши существующих карточек пачками (по ключу created_at, id)
+
+    Уже существующие дубликаты не удаляются: хэш получает самая ранняя карточка,
+    у остальных он остается NULL и уникальный индекс их не затрагивает.
+    """
+    connection = op.get_bind()
+    cards = sa.table(
+        'cards',
+        sa.column('id'),
+        sa.column('deck_id'),
+        sa.column('front'),
+        sa.column('back'),
+        sa.column('created_at'),
+        sa.column('content_hash'),
+    )
+    seen = set()
+    after = None
+    while True:
+        query = (
+            sa.select(cards.c.id, cards.c.deck_id, cards.c.front, cards.c.back, cards.c.created_at)
+            .order_by(cards.c.created_at, cards.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        )
+        if after is not None:
+            query = query.where(sa.tuple_(cards.c.created_at, cards.c.id) > after)
+        rows = connection.execute(query).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            content_hash = _hash_content(row.front, row.back)
+            if (row.deck_id, content_hash) in seen:
+                continue
+            seen.add((row.deck_id, content_hash))
+            updates.append({'card_id': row.id, 'content_hash': content_hash})
+        if updates:
+            connection.execute(
+                cards.update()
+                .where(cards.c.id == sa.bindparam('card_id'))
+                .values(content_hash=sa.bindparam('content_hash')),
+                updates,
+            )
+        after = (rows[-1].created_at, rows[-1].id)
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'file_hash')
+    op.drop_index('ux_cards_deck_id_content_hash', table_name='cards')
+    op.drop_column('cards', 'content_hash')
@@ -2,5 +2,6 @@ from .user_model import UserModel
 from .deck_model import DeckModel
 from .card_model import CardModel
 from .study_session_model import StudySessionModel
+from .import_job_model import ImportJobModel
 
-__all__ = ["UserModel", "DeckModel", "CardModel", "StudySessionModel"]
+__all__ = ["UserModel", "DeckModel", "CardModel", "StudySessionModel", "ImportJobModel"]
@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Integer, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Integer, Text, Index, text
 from infrastructure.database.types import GUID
 from sqlalchemy.orm import relationship
 
@@ -10,12 +10,28 @@ from infrastructure.database.base import Base
 
 class CardModel(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        # Выборка карточек к повторению: due_date упорядочен внутри набора
+        Index("ix_cards_deck_id_due_date", "deck_id", "due_date"),
+        # Новые карточки (еще ни разу не повторялись)
+        Index(
+            "ix_cards_deck_id_new",
+            "deck_id",
+            postgresql_where=text("due_date IS NULL"),
+            sqlite_where=text("due_date IS NULL"),
+        ),
+        # Постраничный вывод набора по ключу (created_at, id)
+        Index("ix_cards_deck_id_created_at_id", "deck_id", "created_at", "id"),
+        # Дедупликация: одна карточка с данным содержимым на набор (NULL не сравниваются)
+        Index("ux_cards_deck_id_content_hash", "deck_id", "content_hash", unique=True),
+    )
 
     id = Column(GUID(), primary_key=True, default=uuid4)
     deck_id = Column(GUID(), ForeignKey("decks.id"), nullable=False, index=True)
     front = Column(Text, nullable=False)  # Термин
     back = Column(Text, nullable=False)   # Определение
     audio_url = Column(String(500), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 нормализованных front/back
     
     # FSRS algorithm fields
     stability = Column(Float, default=0.0, nullable=False)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text
+from infrastructure.database.types import GUID
+
+from infrastructure.database.base import Base
+
+
+class ImportJobModel(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(GUID(), primary_key=True, default=uuid4)
+    user_id = Column(GUID(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    deck_id = Column(GUID(), ForeignKey("decks.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String(20), nullable=False)  # ImportSource enum as string
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=False)  # Сохраненная загрузка - для продолжения после сбоя
+    file_hash = Column(String(64), nullable=True)  # sha256 загрузки
+    status = Column(String(20), nullable=False, index=True)  # ImportJobStatus enum as string
+    rows_parsed = Column(Integer, default=0, nullable=False)
+    rows_inserted = Column(Integer, default=0, nullable=False)
+    attempt = Column(Integer, default=0, nullable=False)  # Номер захвата воркером
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
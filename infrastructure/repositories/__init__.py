@@ -2,10 +2,12 @@ from .user_repository import UserRepository
 from .deck_repository import DeckRepository
 from .card_repository import CardRepository
 from .study_session_repository import StudySessionRepository
+from .import_job_repository import ImportJobRepository
 
 __all__ = [
     "UserRepository",
     "DeckRepository",
     "CardRepository",
     "StudySessionRepository",
+    "ImportJobRepository",
 ]
@@ -1,13 +1,55 @@
+import asyncio
+import random
 from datetime import datetime
-from typing import List, Optional
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sized, Tuple
 from uuid import UUID
 
-from sqlalchemy import select, or_
+from sqlalchemy import select, update, insert, union_all, tuple_, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from domain.entities.card import Card, FSRSState
-from domain.repositories.card_repository import ICardRepository
+from domain.repositories.card_repository import ICardRepository, DuplicateCardError
+from infrastructure.config import settings
 from infrastructure.database.models.card_model import CardModel
+from infrastructure.database.models.deck_model import DeckModel
+
+
+SAMPLE_OVERSHOOT = 3
+CONTENT_HASH_INDEX = "ux_cards_deck_id_content_hash"
+COPY_STAGING_TABLE = "cards_copy_staging"
+
+
+def _insert_ignoring_duplicates(dialect_name: str):
+    """INSERT ... ON CONFLICT (deck_id, content_hash) DO NOTHING там, где диалект это умеет"""
+    table = CardModel.__table__
+    if dialect_name == "postgresql":
+        statement = postgresql_insert(table)
+    elif dialect_name == "sqlite":
+        statement = sqlite_insert(table)
+    else:
+        return insert(table)
+    return statement.on_conflict_do_nothing(index_elements=["deck_id", "content_hash"])
+
+
+async def insert_new_cards(session: AsyncSession, cards: List[Card]) -> List[Card]:
+    """
+    Вставить карточки одним INSERT, пропуская уже имеющиеся в наборе
+
+    Не коммитит - чтобы вставку можно было объединить в транзакцию с другими
+    изменениями. Возвращает вставленные карточки в порядке cards.
+    """
+    if not cards:
+        return []
+    table = CardModel.__table__
+    statement = _insert_ignoring_duplicates(session.get_bind().dialect.name).returning(table.c.id)
+    result = await session.execute(statement, [CardRepository._to_row(card) for card in cards])
+    inserted = set(result.scalars())
+    return [card for card in cards if card.id in inserted]
 
 
 class CardRepository(ICardRepository):
@@ -32,6 +74,7 @@ class CardRepository(ICardRepository):
                 due_date=model.due_date,
             ),
             audio_url=model.audio_url,
+            content_hash=model.content_hash,
         )
 
     def _to_model(self, entity: Card) -> CardModel:
@@ -50,15 +93,52 @@ class CardRepository(ICardRepository):
             last_review=entity.fsrs_state.last_review,
             due_date=entity.fsrs_state.due_date,
             audio_url=entity.audio_url,
+            content_hash=entity.content_hash,
         )
 
+    @staticmethod
+    def _to_row(entity: Card) -> Dict[str, Any]:
+        return {
+            "id": entity.id,
+            "deck_id": entity.deck_id,
+            "front": entity.front,
+            "back": entity.back,
+            "created_at": entity.created_at,
+            "updated_at": entity.updated_at,
+            "stability": entity.fsrs_state.stability,
+            "difficulty": entity.fsrs_state.difficulty,
+            "ease_factor": entity.fsrs_state.ease_factor,
+            "interval": entity.fsrs_state.interval,
+            "review_count": entity.fsrs_state.review_count,
+            "last_review": entity.fsrs_state.last_review,
+            "due_date": entity.fsrs_state.due_date,
+            "audio_url": entity.audio_url,
+            "content_hash": entity.content_hash,
+        }
+
     async def create(self, card: Card) -> Card:
         model = self._to_model(card)
         self._session.add(model)
-        await self._session.commit()
+        await self._commit_unique()
         await self._session.refresh(model)
         return self._to_entity(model)
 
+    async def _commit_unique(self) -> None:
+        """Commit; нарушение уникальности содержимого в наборе - DuplicateCardError"""
+        try:
+            await self._session.commit()
+        except IntegrityError as e:
+            await self._session.rollback()
+            if self._is_duplicate_content(e):
+                raise DuplicateCardError("Card with the same content already exists in this deck")
+            raise
+
+    @staticmethod
+    def _is_duplicate_content(error: IntegrityError) -> bool:
+        # PostgreSQL называет индекс, SQLite - столбцы индекса
+        message = str(error.orig)
+        return CONTENT_HASH_INDEX in message or "cards.deck_id, cards.content_hash" in message
+
     async def get_by_id(self, card_id: UUID) -> Optional[Card]:
         result = await self._session.execute(
             select(CardModel).where(CardModel.id == card_id)
@@ -66,29 +146,170 @@ class CardRepository(ICardRepository):
         model = result.scalar_one_or_none()
         return self._to_entity(model) if model else None
 
-    async def get_by_deck_id(self, deck_id: UUID) -> List[Card]:
+    async def get_with_owner(self, card_id: UUID) -> Optional[Tuple[Card, UUID]]:
+        """Получить карточку и владельца ее набора одним запросом"""
         result = await self._session.execute(
-            select(CardModel).where(CardModel.deck_id == deck_id)
+            select(CardModel, DeckModel.user_id)
+            .join(DeckModel, DeckModel.id == CardModel.deck_id)
+            .where(CardModel.id == card_id)
         )
-        models = result.scalars().all()
-        return [self._to_entity(model) for model in models]
+        row = result.one_or_none()
+        return (self._to_entity(row[0]), row[1]) if row else None
+
+    async def get_many_with_owner(self, card_ids: List[UUID]) -> List[Tuple[Card, UUID]]:
+        """Получить карточки и владельцев их наборов одним запросом"""
+        if not card_ids:
+            return []
+        result = await self._session.execute(
+            select(CardModel, DeckModel.user_id)
+            .join(DeckModel, DeckModel.id == CardModel.deck_id)
+            .where(CardModel.id.in_(card_ids))
+        )
+        return [(self._to_entity(model), user_id) for model, user_id in result.all()]
+
+    async def get_by_ids(self, card_ids: List[UUID]) -> List[Card]:
+        """Получить карточки одним IN-запросом в порядке card_ids (отсутствующие пропускаются)"""
+        if not card_ids:
+            return []
+        result = await self._session.execute(
+            select(CardModel).where(CardModel.id.in_(card_ids))
+        )
+        models = {model.id: model for model in result.scalars()}
+        return [self._to_entity(models[card_id]) for card_id in card_ids if card_id in models]
+
+    async def get_by_deck_id(self, deck_id: UUID) -> List[Card]:
+        result = await self._session.stream_scalars(
+            select(CardModel)
+            .where(CardModel.deck_id == deck_id)
+            .execution_options(yield_per=settings.db_batch_size)
+        )
+        return [self._to_entity(model) async for model in result]
+
+    async def get_page_by_deck_id(
+        self, deck_id: UUID, limit: int, after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[Card]:
+        """Страница карточек набора по ключу (created_at, id), начиная после after"""
+        query = select(CardModel).where(CardModel.deck_id == deck_id)
+        if after is not None:
+            query = query.where(tuple_(CardModel.created_at, CardModel.id) > tuple_(*after))
+        query = (
+            query.order_by(CardModel.created_at, CardModel.id)
+            .limit(limit)
+            .execution_options(yield_per=settings.db_batch_size)
+        )
+        result = await self._session.stream_scalars(query)
+        return [self._to_entity(model) async for model in result]
+
+    async def stream_by_deck_id(self, deck_id: UUID) -> AsyncIterator[Card]:
+        """Потоково отдать карточки набора (серверный курсор, память не растет с размером набора)"""
+        result = await self._session.stream_scalars(
+            select(CardModel)
+            .where(CardModel.deck_id == deck_id)
+            .order_by(CardModel.created_at, CardModel.id)
+            .execution_options(yield_per=settings.db_batch_size)
+        )
+        async for model in result:
+            yield self._to_entity(model)
+
+    async def sample_backs(self, deck_id: UUID, k: int, exclude_back: Optional[str] = None) -> List[str]:
+        """
+        До k случайных различных ответов (back) набора, кроме exclude_back
+
+        Читается только колонка back. На PostgreSQL - случайные номера строк в порядке
+        индекса (deck_id, created_at, id): один проход по индексу без сортировки
+        набора и чтение k строк; на остальных БД - ORDER BY random().
+        """
+        if k <= 0:
+            return []
+
+        if self._session.get_bind().dialect.name == "postgresql":
+            total = await self._session.scalar(
+                select(func.count()).select_from(CardModel).where(CardModel.deck_id == deck_id)
+            )
+            # С запасом: среди выбранных может оказаться сам правильный ответ или дубликаты
+            offsets = random.sample(range(total), min(total, k + SAMPLE_OVERSHOOT))
+            if not offsets:
+                return []
+            # Номера строк считаются одним проходом по индексу (deck_id, created_at, id),
+            # back читается по первичному ключу только у выбранных карточек
+            numbered = (
+                select(
+                    CardModel.id,
+                    func.row_number().over(order_by=(CardModel.created_at, CardModel.id)).label("position"),
+                )
+                .where(CardModel.deck_id == deck_id)
+                .subquery()
+            )
+            picked = (
+                select(numbered.c.id)
+                .where(numbered.c.position.in_([offset + 1 for offset in offsets]))
+                # LIMIT сообщает планировщику, что строк мало, - иначе он читает всю таблицу
+                .limit(len(offsets))
+                .subquery()
+            )
+            statement = select(CardModel.back).join(picked, CardModel.id == picked.c.id)
+        else:
+            statement = (
+                select(CardModel.back)
+                .where(CardModel.deck_id == deck_id)
+                .group_by(CardModel.back)
+                .order_by(func.random())
+                .limit(k + 1)
+            )
+
+        backs = []
+        for back in (await self._session.execute(statement)).scalars():
+            if back != exclude_back and back not in backs:
+                backs.append(back)
+        return backs[:k]
+
+    async def get_backs(self, deck_id: UUID) -> List[Tuple[UUID, str]]:
+        """Пары (id, back) всех карточек набора"""
+        result = await self._session.stream(
+            select(CardModel.id, CardModel.back)
+            .where(CardModel.deck_id == deck_id)
+            .execution_options(yield_per=settings.db_batch_size)
+        )
+        return [(card_id, back) async for card_id, back in result]
+
+    async def get_due_dates(self, deck_id: UUID) -> List[Tuple[UUID, Optional[datetime]]]:
+        """Пары (id, due_date) всех карточек набора - без загрузки содержимого"""
+        result = await self._session.stream(
+            select(CardModel.id, CardModel.due_date)
+            .where(CardModel.deck_id == deck_id)
+            .execution_options(yield_per=settings.db_batch_size)
+        )
+        return [(card_id, due_date) async for card_id, due_date in result]
 
     async def get_due_cards(self, deck_id: UUID, limit: Optional[int] = None) -> List[Card]:
+        """Карточки к повторению: сначала новые, затем по возрастанию due_date
+
+        Запрос собран из двух веток UNION ALL, каждая из которых читается по
+        своему индексу уже в нужном порядке, без сортировки всего набора.
+        """
         now = datetime.utcnow()
-        query = select(CardModel).where(
+        new_cards = select(CardModel).where(
             CardModel.deck_id == deck_id,
-            or_(
-                CardModel.due_date.is_(None),
-                CardModel.due_date <= now,
-            ),
-        ).order_by(CardModel.due_date.asc().nullsfirst())
-        
+            CardModel.due_date.is_(None),
+        )
+        due_cards = select(CardModel).where(
+            CardModel.deck_id == deck_id,
+            CardModel.due_date <= now,
+        ).order_by(CardModel.due_date.asc())
+
         if limit:
-            query = query.limit(limit)
-            
-        result = await self._session.execute(query)
+            new_cards = new_cards.limit(limit)
+            due_cards = due_cards.limit(limit)
+
+        union = union_all(
+            select(new_cards.subquery()),
+            select(due_cards.subquery()),
+        ).subquery()
+        result = await self._session.execute(select(aliased(CardModel, union)))
         models = result.scalars().all()
-        return [self._to_entity(model) for model in models]
+        # Порядок веток UNION ALL не гарантирован SQL, досортировываем не более 2*limit строк
+        models = sorted(models, key=lambda model: (model.due_date is not None, model.due_date or now))
+        return [self._to_entity(model) for model in models[:limit]]
 
     async def update(self, card: Card) -> Card:
         card.update()
@@ -107,10 +328,34 @@ class CardRepository(ICardRepository):
         model.last_review = card.fsrs_state.last_review
         model.due_date = card.fsrs_state.due_date
         model.audio_url = card.audio_url
-        await self._session.commit()
+        model.content_hash = card.content_hash
+        await self._commit_unique()
         await self._session.refresh(model)
         return self._to_entity(model)
 
+    async def update_fsrs_state(self, card: Card) -> Optional[Card]:
+        """Записать состояние FSRS одним UPDATE ... RETURNING"""
+        card.update()
+        result = await self._session.execute(
+            update(CardModel)
+            .where(CardModel.id == card.id)
+            .values(
+                updated_at=card.updated_at,
+                stability=card.fsrs_state.stability,
+                difficulty=card.fsrs_state.difficulty,
+                ease_factor=card.fsrs_state.ease_factor,
+                interval=card.fsrs_state.interval,
+                review_count=card.fsrs_state.review_count,
+                last_review=card.fsrs_state.last_review,
+                due_date=card.fsrs_state.due_date,
+            )
+            .returning(CardModel)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        model = result.scalar_one_or_none()
+        await self._session.commit()
+        return self._to_entity(model) if model else None
+
     async def delete(self, card_id: UUID) -> bool:
         result = await self._session.execute(
             select(CardModel).where(CardModel.id == card_id)
@@ -122,10 +367,88 @@ class CardRepository(ICardRepository):
             return True
         return False
 
-    async def bulk_create(self, cards: List[Card]) -> List[Card]:
-        models = [self._to_model(card) for card in cards]
-        self._session.add_all(models)
+    async def bulk_create(self, cards: Iterable[Card], chunk_size: Optional[int] = None) -> List[Card]:
+        """Массово вставить карточки пачками INSERT ... ON CONFLICT DO NOTHING RETURNING
+
+        Карточки, уже имеющиеся в наборе (тот же content_hash), пропускаются без
+        предварительного чтения; возвращаются только вставленные.
+        Карточки читаются из итератора по мере вставки, поэтому сюда можно
+        передавать генератор, не собирая весь импорт в память заранее. Пачки из
+        итератора вытягиваются в потоке: разбор файла в генераторе занимает CPU
+        и не должен блокировать event loop (генератор не должен обращаться к сессии).
+        На PostgreSQL (asyncpg) списки от import_copy_threshold строк загружаются
+        одним COPY, а поток, переросший порог, - оставшимися пачками через COPY.
+        """
+        chunk_size = chunk_size or settings.db_batch_size
+        supports_copy = self._supports_copy()
+        if supports_copy and isinstance(cards, Sized) and len(cards) >= settings.import_copy_threshold:
+            chunk_size = len(cards)
+
+        created = []
+        seen = 0
+        iterator = iter(cards)
+        while True:
+            if isinstance(cards, Sized):
+                chunk = list(islice(iterator, chunk_size))
+            else:
+                chunk = await asyncio.to_thread(lambda: list(islice(iterator, chunk_size)))
+            if not chunk:
+                break
+            seen += len(chunk)
+            if supports_copy and seen >= settings.import_copy_threshold:
+                created.extend(await self._copy_create(chunk))
+            else:
+                created.extend(await insert_new_cards(self._session, chunk))
+        await self._session.commit()
+        return created
+
+    def _supports_copy(self) -> bool:
+        dialect = self._session.get_bind().dialect
+        return dialect.name == "postgresql" and dialect.driver == "asyncpg"
+
+    async def _copy_create(self, cards: List[Card]) -> List[Card]:
+        """
+        Вставить пачку карточек через COPY (asyncpg copy_records_to_table), без commit
+
+        COPY не умеет ON CONFLICT, поэтому строки копируются во временную таблицу
+        и переносятся в cards одним INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+        Временная таблица живет до конца транзакции и очищается после каждой пачки.
+        """
+        columns = [column.name for column in CardModel.__table__.c]
+        records = []
+        for card in cards:
+            row = self._to_row(card)
+            records.append(tuple(row[name] for name in columns))
+
+        connection = await self._session.connection()
+        await connection.exec_driver_sql(
+            f"CREATE TEMP TABLE IF NOT EXISTS {COPY_STAGING_TABLE} "
+            f"(LIKE {CardModel.__tablename__} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            COPY_STAGING_TABLE, records=records, columns=columns
+        )
+        column_list = ", ".join(f'"{name}"' for name in columns)
+        result = await connection.exec_driver_sql(
+            f"INSERT INTO {CardModel.__tablename__} ({column_list}) "
+            f"SELECT {column_list} FROM {COPY_STAGING_TABLE} "
+            f"ON CONFLICT (deck_id, content_hash) DO NOTHING RETURNING id"
+        )
+        inserted = {row[0] for row in result}
+        await connection.exec_driver_sql(f"TRUNCATE {COPY_STAGING_TABLE}")
+        return [card for card in cards if card.id in inserted]
+
+    async def bulk_update_fsrs(self, card_ids: List[UUID], columns: Dict[str, List[Any]]) -> int:
+        """Массово записать состояния FSRS (executemany UPDATE по первичному ключу)"""
+        now = datetime.utcnow()
+        rows = [
+            {"id": card_id, "updated_at": now, **{name: values[i] for name, values in columns.items()}}
+            for i, card_id in enumerate(card_ids)
+        ]
+        for start in range(0, len(rows), settings.db_batch_size):
+            await self._session.execute(
+                update(CardModel), rows[start:start + settings.db_batch_size]
+            )
         await self._session.commit()
-        for model in models:
-            await self._session.refresh(model)
-        return [self._to_entity(model) for model in models]
+        return len(rows)
@@ -0,0 +1,165 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.entities.card import Card
+from domain.entities.import_job import ImportJob, ImportJobStatus, ImportSource
+from domain.repositories.import_job_repository import IImportJobRepository, ImportJobLostError
+from infrastructure.database.models.import_job_model import ImportJobModel
+from infrastructure.repositories.card_repository import insert_new_cards
+
+
+class ImportJobRepository(IImportJobRepository):
+    def __init__(self, session: AsyncSession):
+        self._session = session
+
+    def _to_entity(self, model: ImportJobModel) -> ImportJob:
+        return ImportJob(
+            id=model.id,
+            user_id=model.user_id,
+            deck_id=model.deck_id,
+            source=ImportSource(model.source),
+            filename=model.filename,
+            file_path=model.file_path,
+            status=ImportJobStatus(model.status),
+            rows_parsed=model.rows_parsed,
+            rows_inserted=model.rows_inserted,
+            error=model.error,
+            created_at=model.created_at,
+            updated_at=model.updated_at,
+            finished_at=model.finished_at,
+            file_hash=model.file_hash,
+            attempt=model.attempt,
+        )
+
+    def _to_model(self, entity: ImportJob) -> ImportJobModel:
+        return ImportJobModel(
+            id=entity.id,
+            user_id=entity.user_id,
+            deck_id=entity.deck_id,
+            source=entity.source.value,
+            filename=entity.filename,
+            file_path=entity.file_path,
+            status=entity.status.value,
+            rows_parsed=entity.rows_parsed,
+            rows_inserted=entity.rows_inserted,
+            error=entity.error,
+            created_at=entity.created_at,
+            updated_at=entity.updated_at,
+            finished_at=entity.finished_at,
+            file_hash=entity.file_hash,
+            attempt=entity.attempt,
+        )
+
+    async def create(self, job: ImportJob) -> ImportJob:
+        model = self._to_model(job)
+        self._session.add(model)
+        await self._session.commit()
+        await self._session.refresh(model)
+        return self._to_entity(model)
+
+    async def get_by_id(self, job_id: UUID) -> Optional[ImportJob]:
+        result = await self._session.execute(
+            select(ImportJobModel).where(ImportJobModel.id == job_id)
+        )
+        model = result.scalar_one_or_none()
+        return self._to_entity(model) if model else None
+
+    async def get_unfinished(self) -> List[ImportJob]:
+        """Задания, прерванные остановкой процесса или еще не начатые"""
+        result = await self._session.execute(
+            select(ImportJobModel)
+            .where(ImportJobModel.status.in_([ImportJobStatus.PENDING.value, ImportJobStatus.RUNNING.value]))
+            .order_by(ImportJobModel.created_at)
+        )
+        return [self._to_entity(model) for model in result.scalars()]
+
+    async def claim(self, job_id: UUID, stale_before: Optional[datetime] = None) -> Optional[ImportJob]:
+        """
+        Атомарно взять задание в работу (одним UPDATE ... RETURNING)
+
+        Берется ожидающее задание, а с stale_before - и выполняющееся, которое
+        не обновлялось с этого момента (его процесс упал). None - задание уже
+        выполняет другой воркер или оно завершено. Каждый захват увеличивает
+        attempt: записи прежнего владельца после этого отклоняются.
+        """
+        claimable = ImportJobModel.status == ImportJobStatus.PENDING.value
+        if stale_before is not None:
+            claimable = or_(
+                claimable,
+                and_(
+                    ImportJobModel.status == ImportJobStatus.RUNNING.value,
+                    ImportJobModel.updated_at < stale_before,
+                ),
+            )
+        result = await self._session.execute(
+            update(ImportJobModel)
+            .where(ImportJobModel.id == job_id, claimable)
+            .values(
+                status=ImportJobStatus.RUNNING.value,
+                attempt=ImportJobModel.attempt + 1,
+                error=None,
+                updated_at=datetime.utcnow(),
+            )
+            .returning(ImportJobModel)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        model = result.scalar_one_or_none()
+        await self._session.commit()
+        return self._to_entity(model) if model else None
+
+    async def update(self, job: ImportJob) -> ImportJob:
+        """Записать состояние задания; ImportJobLostError - его забрал другой воркер"""
+        await self._update_owned(
+            job,
+            status=job.status.value,
+            rows_parsed=job.rows_parsed,
+            rows_inserted=job.rows_inserted,
+            error=job.error,
+            updated_at=job.updated_at,
+            finished_at=job.finished_at,
+        )
+        await self._session.commit()
+        return job
+
+    async def _update_owned(self, job: ImportJob, **values) -> None:
+        """UPDATE задания, только пока им владеет этот захват (attempt не изменился)"""
+        result = await self._session.execute(
+            update(ImportJobModel)
+            .where(ImportJobModel.id == job.id, ImportJobModel.attempt == job.attempt)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await self._session.rollback()
+            raise ImportJobLostError(f"Import job {job.id} was claimed by another worker")
+
+    async def save_chunk(self, job: ImportJob, cards: List[Card]) -> ImportJob:
+        """
+        Вставить пачку карточек и сдвинуть счетчики задания в одной транзакции
+
+        Одна карточка - одна пара файла. Карточки, уже имеющиеся в наборе,
+        пропускаются. После сбоя в БД остаются только целые пачки, а rows_parsed
+        указывает, с какой пары продолжать. Если задание забрал другой воркер,
+        пачка не вставляется (ImportJobLostError).
+        """
+        # Счетчики обновляются первыми: строка задания блокируется до commit,
+        # и захват другим воркером не может вклиниться между проверкой и вставкой
+        rows_parsed = job.rows_parsed + len(cards)
+        updated_at = datetime.utcnow()
+        await self._update_owned(job, rows_parsed=rows_parsed, updated_at=updated_at)
+        inserted = await insert_new_cards(self._session, cards)
+        rows_inserted = job.rows_inserted + len(inserted)
+        await self._session.execute(
+            update(ImportJobModel)
+            .where(ImportJobModel.id == job.id)
+            .values(rows_inserted=rows_inserted)
+            .execution_options(synchronize_session=False)
+        )
+        await self._session.commit()
+        # Счетчики в памяти двигаются только после успешного коммита
+        job.rows_inserted, job.rows_parsed, job.updated_at = rows_inserted, rows_parsed, updated_at
+        return job
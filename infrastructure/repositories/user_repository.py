@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from domain.entities.user import User
 from domain.repositories.user_repository import IUserRepository
 from infrastructure.database.models.user_model import UserModel
+from infrastructure.services.user_cache import user_cache
 
 
 class UserRepository(IUserRepository):
@@ -69,6 +70,7 @@ class UserRepository(IUserRepository):
         model.is_active = user.is_active
         await self._session.commit()
         await self._session.refresh(model)
+        await user_cache.invalidate(user.id)
         return self._to_entity(model)
 
     async def delete(self, user_id: UUID) -> bool:
@@ -79,5 +81,6 @@ class UserRepository(IUserRepository):
         if model:
             await self._session.delete(model)
             await self._session.commit()
+            await user_cache.invalidate(user_id)
             return True
         return False
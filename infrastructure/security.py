@@ -1,12 +1,29 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from infrastructure.config import settings
+from infrastructure.services.lru_cache import LRUCache
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
+# Хеширование паролей занимает десятки миллисекунд CPU; выполняем его в отдельных
+# потоках (hashlib.pbkdf2_hmac отпускает GIL), чтобы не блокировать event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash",
+)
+
+# Уже проверенные токены: повторная проверка подписи не нужна до истечения exp
+_token_cache = LRUCache(
+    maxsize=settings.token_cache_size,
+    ttl=settings.access_token_expire_minutes * 60,
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверить пароль"""
@@ -18,6 +35,18 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверить пароль в пуле потоков, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Хешировать пароль в пуле потоков, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Создать JWT токен"""
     to_encode = data.copy()
@@ -33,8 +62,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def decode_token(token: str) -> dict:
     """Декодировать JWT токен"""
+    payload = _token_cache.get(token)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return dict(payload)
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
     except JWTError:
         raise ValueError("Invalid token")
+
+    if "exp" in payload:
+        _token_cache.set(token, payload, ttl=max(0, payload["exp"] - time.time()))
+    return dict(payload)
@@ -1,5 +1,37 @@
-from .import_service import ImportService
+from .import_service import ImportService, UploadTooLargeError
 from .tts_service import TTSService
-from .cache_service import CacheService, cache_service, get_cache
+from .ocr_service import OCRService, ocr_service, ImageReadError, OCRUnavailableError
+from .cache_codecs import CacheCodec, get_codec
+from .cache_service import CacheService, cache_service, get_cache, deck_tag, user_tag
+from .lru_cache import LRUCache
+from .user_cache import UserCache, user_cache
+from .due_queue import DueQueue, get_due_queue
+from .distractor_index import schedule_distractor_index_build
+from .import_jobs import ImportJobWorker, import_job_worker, dispatch_import_job, run_import_job
 
-__all__ = ["ImportService", "TTSService", "CacheService", "cache_service", "get_cache"]
+__all__ = [
+    "ImportService",
+    "UploadTooLargeError",
+    "TTSService",
+    "OCRService",
+    "ocr_service",
+    "ImageReadError",
+    "OCRUnavailableError",
+    "CacheCodec",
+    "get_codec",
+    "CacheService",
+    "cache_service",
+    "get_cache",
+    "deck_tag",
+    "user_tag",
+    "LRUCache",
+    "UserCache",
+    "user_cache",
+    "DueQueue",
+    "get_due_queue",
+    "schedule_distractor_index_build",
+    "ImportJobWorker",
+    "import_job_worker",
+    "dispatch_import_job",
+    "run_import_job",
+]
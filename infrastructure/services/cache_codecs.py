@@ -0,0 +1,117 @@
+"""
+Кодеки значений для CacheService
+json всегда доступен, orjson и msgpack подключаются, если установлены
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheCodec:
+    """Базовый кодек: значение <-> bytes"""
+
+    name = "base"
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JSONCodec(CacheCodec):
+    """Стандартный json: datetime и UUID превращаются в строки"""
+
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, default=str).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(CacheCodec):
+    """orjson: быстрее json, datetime и UUID сериализуются строками ISO"""
+
+    name = "orjson"
+
+    @classmethod
+    def available(cls) -> bool:
+        return orjson is not None
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(CacheCodec):
+    """msgpack: компактный бинарный формат, datetime и UUID сохраняют типы"""
+
+    name = "msgpack"
+
+    EXT_UUID = 1
+    EXT_DATETIME = 2
+
+    @classmethod
+    def available(cls) -> bool:
+        return msgpack is not None
+
+    def _default(self, value: Any) -> Any:
+        if isinstance(value, UUID):
+            return msgpack.ExtType(self.EXT_UUID, value.bytes)
+        if isinstance(value, datetime):
+            return msgpack.ExtType(self.EXT_DATETIME, value.isoformat().encode())
+        return str(value)
+
+    def _ext_hook(self, code: int, data: bytes) -> Any:
+        if code == self.EXT_UUID:
+            return UUID(bytes=data)
+        if code == self.EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        return msgpack.ExtType(code, data)
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=self._default, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(
+            data,
+            ext_hook=self._ext_hook,
+            raw=False,
+            strict_map_key=False,
+        )
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec, MsgpackCodec)}
+
+
+def get_codec(name: str) -> CacheCodec:
+    """Кодек по имени; если библиотека не установлена - json"""
+    codec_cls = CODECS.get(name)
+    if codec_cls is None:
+        raise ValueError(f"Unknown cache codec: {name}")
+    if not codec_cls.available():
+        logger.warning(f"Cache codec {name} is not installed, falling back to json")
+        return JSONCodec()
+    return codec_cls()
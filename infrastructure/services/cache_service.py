@@ -1,86 +1,460 @@
 """
 Сервис кэширования с использованием Redis
 Демонстрирует использование брокера сообщений (Redis)
+
+Двухуровневый кэш: локальный LRU в процессе (L1) перед Redis (L2).
+Изменения ключей рассылаются через Redis pub/sub, и каждый воркер
+вытесняет их из своего L1.
+
+Ключи можно помечать тегами (deck:{id}, user:{id}); теги хранятся в Redis
+как множества ключей, invalidate_tags удаляет все помеченные ключи.
 """
-import json
-from typing import Optional, Any
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Any, Set
+from uuid import uuid4
 try:
     import redis.asyncio as redis
 except ImportError:
     redis = None
 
 from infrastructure.config import settings
+from infrastructure.services.cache_codecs import CacheCodec, get_codec
+from infrastructure.services.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def deck_tag(deck_id) -> str:
+    """Тег данных, зависящих от карточек набора"""
+    return f"deck:{deck_id}"
+
+
+def user_tag(user_id) -> str:
+    """Тег данных, зависящих от наборов пользователя"""
+    return f"user:{user_id}"
 
 
 class CacheService:
     """Сервис для кэширования данных в Redis"""
-    
-    def __init__(self):
+
+    INVALIDATION_CHANNEL = "cache:invalidate"
+    UNLOCK_SCRIPT = """
+        if redis.call("GET", KEYS[1]) == ARGV[1] then
+            return redis.call("DEL", KEYS[1])
+        end
+        return 0
+    """
+
+    def __init__(self, codec: Optional[CacheCodec] = None):
         self._redis: Optional[redis.Redis] = None
-    
+        self._codec = codec or get_codec(settings.cache_codec)
+        self._local = LRUCache(maxsize=settings.cache_local_size, ttl=settings.cache_local_ttl)
+        self._instance_id = uuid4().hex
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._stats = {
+            "local_hits": 0,
+            "local_misses": 0,
+            "redis_hits": 0,
+            "redis_misses": 0,
+        }
+
+    @property
+    def redis(self):
+        """Клиент Redis для структур данных помимо кэша (None без подключения)"""
+        return self._redis
+
     async def connect(self) -> None:
         """Подключиться к Redis"""
         if settings.redis_url and redis:
             try:
-                self._redis = await redis.from_url(
-                    settings.redis_url,
-                    encoding="utf-8",
-                    decode_responses=True
-                )
+                self._redis = await redis.from_url(settings.redis_url)
+                await self._on_connected()
             except Exception:
                 self._redis = None
-    
+
     async def disconnect(self) -> None:
         """Отключиться от Redis"""
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub:
+            try:
+                await self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
         if self._redis:
             await self._redis.close()
-    
+            self._redis = None
+        self._local.clear()
+
+    async def _on_connected(self) -> None:
+        """Подписаться на рассылку инвалидаций от других воркеров"""
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self.INVALIDATION_CHANNEL)
+        self._listener = asyncio.create_task(self._listen_invalidations())
+
+    async def _listen_invalidations(self) -> None:
+        try:
+            async for message in self._pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = message["data"]
+                if isinstance(data, bytes):
+                    data = data.decode()
+                sender, _, key = data.partition(" ")
+                if sender != self._instance_id:
+                    self._local.delete(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Без рассылки L1 может отдать устаревшие данные - выключаем его
+            logger.warning(f"Cache invalidation listener stopped: {e}")
+            self._local.clear()
+            self._local.maxsize = 0
+
+    async def _publish_invalidation(self, key: str) -> None:
+        await self._redis.publish(self.INVALIDATION_CHANNEL, f"{self._instance_id} {key}")
+
     async def get(self, key: str) -> Optional[Any]:
         """Получить значение из кэша"""
         if not self._redis:
             return None
-        
+
+        value = self._local.get(key)
+        if value is not None:
+            self._stats["local_hits"] += 1
+            return self._codec.decode(value)
+        self._stats["local_misses"] += 1
+
         try:
-            value = await self._redis.get(key)
-            if value:
-                return json.loads(value)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                value, ttl_ms = await pipe.execute()
+        except Exception:
             return None
+        return self._decode_remote(key, value, ttl_ms)
+
+    async def get_many(self, keys: Iterable[str]) -> List[Optional[Any]]:
+        """Получить несколько значений за один запрос к Redis (MGET)"""
+        keys = list(keys)
+        if not self._redis:
+            return [None] * len(keys)
+
+        values: List[Optional[bytes]] = [self._local.get(key) for key in keys]
+        for value in values:
+            self._stats["local_hits" if value is not None else "local_misses"] += 1
+        result = [self._codec.decode(value) if value is not None else None for value in values]
+
+        missing = [i for i, value in enumerate(values) if value is None]
+        if not missing:
+            return result
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.mget([keys[i] for i in missing])
+                for i in missing:
+                    pipe.pttl(keys[i])
+                remote, *ttls = await pipe.execute()
+        except Exception:
+            return result
+        for i, value, ttl_ms in zip(missing, remote, ttls):
+            result[i] = self._decode_remote(keys[i], value, ttl_ms)
+        return result
+
+    def _decode_remote(self, key: str, value: Optional[bytes], ttl_ms: int) -> Optional[Any]:
+        """
+        Декодировать значение из Redis и положить его в L1
+
+        В L1 значение живет не дольше, чем в Redis (ttl_ms - ответ PTTL; -1 - без TTL).
+        """
+        if not value:
+            self._stats["redis_misses"] += 1
+            return None
+        try:
+            decoded = self._codec.decode(value)
         except Exception:
+            # Запись другим кодеком (например, до смены CACHE_CODEC) - считаем промахом
+            self._stats["redis_misses"] += 1
             return None
-    
-    async def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
-        """Установить значение в кэш с TTL"""
+        self._stats["redis_hits"] += 1
+        if ttl_ms == -1:
+            self._local.set(key, value)
+        elif ttl_ms > 0:
+            self._local.set(key, value, ttl=ttl_ms / 1000)
+        return decoded
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = 3600,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """Установить значение в кэш с TTL (и пометить ключ тегами)"""
         if not self._redis:
             return False
-        
+
         try:
-            serialized = json.dumps(value, default=str)
-            await self._redis.setex(key, ttl, serialized)
+            serialized = self._codec.encode(value)
+            tags = list(tags)
+            if tags:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.setex(key, ttl, serialized)
+                    self._queue_tags(pipe, key, tags, ttl)
+                    await pipe.execute()
+            else:
+                await self._redis.setex(key, ttl, serialized)
+            self._local.set(key, serialized, ttl=ttl)
+            await self._publish_invalidation(key)
             return True
         except Exception:
+            self._local.delete(key)
+            return False
+
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: int = 3600,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """Установить несколько значений одним пайплайном"""
+        if not self._redis or not items:
             return False
-    
+
+        try:
+            serialized = {key: self._codec.encode(value) for key, value in items.items()}
+            tags = list(tags)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in serialized.items():
+                    pipe.setex(key, ttl, value)
+                    self._queue_tags(pipe, key, tags, ttl)
+                    pipe.publish(self.INVALIDATION_CHANNEL, f"{self._instance_id} {key}")
+                await pipe.execute()
+            for key, value in serialized.items():
+                self._local.set(key, value, ttl=ttl)
+            return True
+        except Exception:
+            for key in items:
+                self._local.delete(key)
+            return False
+
     async def delete(self, key: str) -> bool:
         """Удалить значение из кэша"""
         if not self._redis:
             return False
-        
+
+        self._local.delete(key)
         try:
             await self._redis.delete(key)
+            await self._publish_invalidation(key)
             return True
         except Exception:
             return False
-    
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Удалить все ключи, помеченные любым из тегов; возвращает число ключей"""
+        if not self._redis or not tags:
+            return 0
+
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        try:
+            # Чтение и удаление множеств атомарно: ключ, помеченный после этого,
+            # попадет в новое множество и не потеряется
+            async with self._redis.pipeline(transaction=True) as pipe:
+                for tag_key in tag_keys:
+                    pipe.smembers(tag_key)
+                pipe.delete(*tag_keys)
+                members = (await pipe.execute())[:-1]
+
+            keys = {
+                key.decode() if isinstance(key, bytes) else key
+                for tag_members in members
+                for key in tag_members
+            }
+            if not keys:
+                return 0
+
+            for key in keys:
+                self._local.delete(key)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys)
+                for key in keys:
+                    pipe.publish(self.INVALIDATION_CHANNEL, f"{self._instance_id} {key}")
+                await pipe.execute()
+            return len(keys)
+        except Exception as e:
+            logger.warning(f"Cache tag invalidation failed for {tags}: {e}")
+            return 0
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"tag:{tag}"
+
+    def _queue_tags(self, pipe, key: str, tags: List[str], ttl: int) -> None:
+        """Добавить ключ в множества тегов; множество живет не меньше самих ключей"""
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            pipe.sadd(tag_key, key)
+            pipe.expire(tag_key, max(ttl, settings.cache_tag_ttl))
+
     async def exists(self, key: str) -> bool:
         """Проверить существование ключа"""
         if not self._redis:
             return False
-        
+
+        if key in self._local:
+            return True
+
         try:
             return bool(await self._redis.exists(key))
         except Exception:
             return False
 
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 3600,
+        stale_ttl: int = 0,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Получить значение из кэша или вычислить его, объединяя одновременные запросы
+
+        В пределах воркера на ключ выполняется одно вычисление (остальные ждут его
+        future), между воркерами - под коротким Redis-локом. Значение старше ttl,
+        но моложе ttl + stale_ttl, отдается сразу, а обновляется в фоне.
+
+        При stale_ttl > 0 compute может выполняться в фоне после ответа на запрос,
+        поэтому он не должен использовать ресурсы запроса (например, его сессию БД).
+        Значение должно сериализоваться кодеком кэша.
+        """
+        if not self._redis:
+            return await compute()
+
+        entry = await self.get(key)
+        if self._is_envelope(entry):
+            if entry["expires_at"] > time.time():
+                return entry["value"]
+            if stale_ttl > 0:
+                self._refresh_in_background(key, compute, ttl, stale_ttl, tags)
+                return entry["value"]
+
+        return await self._compute_once(key, compute, ttl, stale_ttl, tags)
+
+    @staticmethod
+    def _is_envelope(entry: Any) -> bool:
+        """
+        Запись get_or_compute ({"value", "expires_at"})
+
+        Значения, закэшированные под теми же ключами в другом формате (например,
+        до перехода на get_or_compute), считаются промахом.
+        """
+        return (
+            isinstance(entry, dict)
+            and entry.keys() == {"value", "expires_at"}
+            and isinstance(entry["expires_at"], (int, float))
+        )
+
+    async def _compute_once(self, key, compute, ttl, stale_ttl, tags) -> Any:
+        """
+        Single-flight: одновременные вызовы по ключу ждут одно вычисление
+
+        Вычисление идет в отдельной задаче: отмена запроса, который его начал
+        (например, клиент отключился), не отменяет его для остальных ожидающих.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute_locked(key, compute, ttl, stale_ttl, tags))
+            self._inflight[key] = task
+
+            def forget(done: asyncio.Future) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+                if not done.cancelled():
+                    done.exception()  # ошибка доставляется ожидающим, не логируем ее как потерянную
+
+            task.add_done_callback(forget)
+        return await asyncio.shield(task)
+
+    async def _compute_locked(self, key, compute, ttl, stale_ttl, tags) -> Any:
+        """Вычислить значение под Redis-локом, чтобы воркеры не считали его параллельно"""
+        lock_key = f"lock:{key}"
+        token = uuid4().hex.encode()
+        acquired = await self._try_lock(lock_key, token)
+
+        if not acquired:
+            # Значение уже считает другой воркер - ждем его результат, пока жив лок
+            deadline = time.monotonic() + settings.cache_lock_timeout_ms / 1000
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = await self._get_remote(key)
+                if self._is_envelope(entry):
+                    return entry["value"]
+                if not await self.exists(lock_key):
+                    break
+
+        try:
+            value = await compute()
+            await self.set(
+                key,
+                {"value": value, "expires_at": time.time() + ttl},
+                ttl=ttl + stale_ttl,
+                tags=tags,
+            )
+            return value
+        finally:
+            if acquired:
+                await self._unlock(lock_key, token)
+
+    def _refresh_in_background(self, key, compute, ttl, stale_ttl, tags) -> None:
+        """Обновить устаревающее значение в фоне (не более одного обновления на ключ)"""
+        if key in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                await self._compute_once(key, compute, ttl, stale_ttl, tags)
+            except Exception as e:
+                logger.warning(f"Background cache refresh failed for {key}: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _get_remote(self, key: str) -> Optional[Any]:
+        try:
+            value = await self._redis.get(key)
+            return self._codec.decode(value) if value else None
+        except Exception:
+            return None
+
+    async def _try_lock(self, lock_key: str, token: bytes) -> bool:
+        try:
+            return bool(await self._redis.set(
+                lock_key, token, nx=True, px=settings.cache_lock_timeout_ms
+            ))
+        except Exception:
+            # Redis недоступен - координировать нечего, считаем сами
+            return True
+
+    async def _unlock(self, lock_key: str, token: bytes) -> None:
+        """Снять лок, только если он еще наш (атомарно: лок мог истечь и достаться другому)"""
+        try:
+            await self._redis.eval(self.UNLOCK_SCRIPT, 1, lock_key, token)
+        except Exception:
+            pass
+
+    def get_stats(self) -> dict:
+        """Счетчики попаданий и промахов по уровням кэша"""
+        return dict(self._stats, local_size=len(self._local))
+
 cache_service = CacheService()
 
 
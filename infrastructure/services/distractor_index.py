@@ -0,0 +1,19 @@
+"""
+Фоновое построение индекса похожих ответов (distractor_service) из БД
+"""
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from application.services.distractor_service import distractor_service
+from infrastructure.repositories.card_repository import CardRepository
+
+
+def schedule_distractor_index_build(bind: AsyncEngine, deck_id: UUID) -> None:
+    """Запланировать построение индекса набора в фоне; загрузка идет в своей сессии"""
+
+    async def load():
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            return await CardRepository(session).get_backs(deck_id)
+
+    distractor_service.schedule_build(deck_id, load)
@@ -0,0 +1,191 @@
+"""
+Очередь карточек к повторению в Redis
+На каждый набор - ZSET due_queue:{deck_id}: член - id карточки, score - due_date
+в секундах epoch (новые карточки - 0, они идут первыми). Очередь строится из БД
+при первом обращении и дальше обновляется при повторениях, создании и импорте.
+"""
+import logging
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.entities.card import Card
+from domain.repositories.card_repository import ICardRepository
+from domain.repositories.due_queue import IDueQueue
+from infrastructure.config import settings
+from infrastructure.database.database import get_db
+from infrastructure.repositories.card_repository import CardRepository
+from infrastructure.services.cache_service import CacheService, get_cache
+
+logger = logging.getLogger(__name__)
+
+REBUILD_CHUNK_SIZE = 1000
+SCORE_TOLERANCE = 0.001
+
+
+class DueQueue(IDueQueue):
+    """Очередь повторений набора на Redis ZSET"""
+
+    def __init__(self, redis, card_repository: ICardRepository, ttl: Optional[int] = None):
+        self._redis = redis
+        self._card_repository = card_repository
+        self._ttl = ttl or settings.due_queue_ttl
+
+    @staticmethod
+    def _key(deck_id: UUID) -> str:
+        return f"due_queue:{deck_id}"
+
+    @staticmethod
+    def _ready_key(deck_id: UUID) -> str:
+        return f"due_queue:{deck_id}:ready"
+
+    @staticmethod
+    def score(due_date: Optional[datetime]) -> float:
+        """Score карточки: due_date (UTC без пояса) в секундах epoch, новые - 0"""
+        if due_date is None:
+            return 0.0
+        return due_date.replace(tzinfo=timezone.utc).timestamp()
+
+    async def get_due_cards(self, deck_id: UUID, limit: Optional[int] = None) -> Optional[List[Card]]:
+        """Следующие limit карточек к повторению: ZRANGEBYSCORE и один IN-запрос"""
+        try:
+            await self._ensure(deck_id)
+            members = await self._redis.zrangebyscore(
+                self._key(deck_id),
+                "-inf",
+                self.score(datetime.utcnow()),
+                start=0 if limit else None,
+                num=limit,
+            )
+        except Exception as e:
+            logger.warning(f"Due queue unavailable for deck {deck_id}: {e}")
+            return None
+
+        card_ids = [UUID(self._decode(member)) for member in members]
+        cards = await self._card_repository.get_by_ids(card_ids)
+        if len(cards) != len(card_ids):
+            # Карточки удалены в обход очереди - убираем их, чтобы не спотыкаться снова
+            found = {card.id for card in cards}
+            await self.remove_cards(deck_id, [card_id for card_id in card_ids if card_id not in found])
+        return cards
+
+    async def update_cards(self, cards: Iterable[Card]) -> None:
+        """Добавить карточки в очереди их наборов или обновить их score"""
+        by_deck: Dict[UUID, Dict[str, float]] = {}
+        for card in cards:
+            by_deck.setdefault(card.deck_id, {})[str(card.id)] = self.score(card.fsrs_state.due_date)
+        if not by_deck:
+            return
+
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for deck_id, mapping in by_deck.items():
+                    for chunk in self._chunks(mapping):
+                        pipe.zadd(self._key(deck_id), chunk)
+                    pipe.expire(self._key(deck_id), self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            # Очередь разошлась с БД - пусть перестроится при следующем чтении
+            logger.warning(f"Due queue update failed: {e}")
+            await self._reset(by_deck.keys())
+
+    async def remove_cards(self, deck_id: UUID, card_ids: Iterable[UUID]) -> None:
+        """Убрать карточки из очереди набора"""
+        members = [str(card_id) for card_id in card_ids]
+        if not members:
+            return
+        try:
+            await self._redis.zrem(self._key(deck_id), *members)
+        except Exception as e:
+            logger.warning(f"Due queue update failed: {e}")
+            await self._reset([deck_id])
+
+    async def drop(self, deck_id: UUID) -> None:
+        """Удалить очередь набора (например, вместе с набором)"""
+        await self._reset([deck_id])
+
+    async def rebuild(self, deck_id: UUID) -> int:
+        """Перестроить очередь набора из БД; возвращает число карточек"""
+        rows = await self._card_repository.get_due_dates(deck_id)
+        mapping = {str(card_id): self.score(due_date) for card_id, due_date in rows}
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(deck_id))
+            for chunk in self._chunks(mapping):
+                pipe.zadd(self._key(deck_id), chunk)
+            pipe.expire(self._key(deck_id), self._ttl)
+            pipe.set(self._ready_key(deck_id), 1, ex=self._ttl)
+            await pipe.execute()
+        return len(mapping)
+
+    async def reconcile(self, deck_id: UUID) -> Dict[str, int]:
+        """
+        Сверить очередь набора с БД и исправить расхождения
+
+        Возвращает число карточек, которых не было в очереди (missing),
+        лишних (extra) и с устаревшим score (stale).
+        """
+        rows = await self._card_repository.get_due_dates(deck_id)
+        expected = {str(card_id): self.score(due_date) for card_id, due_date in rows}
+        actual = {
+            self._decode(member): score
+            for member, score in await self._redis.zrange(self._key(deck_id), 0, -1, withscores=True)
+        }
+
+        missing = {member: score for member, score in expected.items() if member not in actual}
+        stale = {
+            member: score
+            for member, score in expected.items()
+            if member in actual and abs(actual[member] - score) > SCORE_TOLERANCE
+        }
+        extra = [member for member in actual if member not in expected]
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for chunk in self._chunks({**missing, **stale}):
+                pipe.zadd(self._key(deck_id), chunk)
+            if extra:
+                pipe.zrem(self._key(deck_id), *extra)
+            pipe.expire(self._key(deck_id), self._ttl)
+            pipe.set(self._ready_key(deck_id), 1, ex=self._ttl)
+            await pipe.execute()
+
+        report = {"missing": len(missing), "extra": len(extra), "stale": len(stale)}
+        if any(report.values()):
+            logger.warning(f"Due queue for deck {deck_id} was out of sync: {report}")
+        return report
+
+    async def _ensure(self, deck_id: UUID) -> None:
+        """Ленивая перестройка: очередь без флага готовности считается пустой"""
+        if not await self._redis.exists(self._ready_key(deck_id)):
+            await self.rebuild(deck_id)
+
+    async def _reset(self, deck_ids: Iterable[UUID]) -> None:
+        keys = [key for deck_id in deck_ids for key in (self._ready_key(deck_id), self._key(deck_id))]
+        try:
+            await self._redis.delete(*keys)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _chunks(mapping: Dict[str, float]) -> Iterable[Dict[str, float]]:
+        items = iter(mapping.items())
+        while chunk := dict(islice(items, REBUILD_CHUNK_SIZE)):
+            yield chunk
+
+    @staticmethod
+    def _decode(member) -> str:
+        return member.decode() if isinstance(member, bytes) else member
+
+
+async def get_due_queue(
+    db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+) -> Optional[DueQueue]:
+    """Dependency для очереди повторений (None, если она выключена или нет Redis)"""
+    if not settings.due_queue_enabled or cache.redis is None:
+        return None
+    return DueQueue(cache.redis, CardRepository(db))
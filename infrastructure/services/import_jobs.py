@@ -0,0 +1,221 @@
+"""
+Фоновые задания импорта
+
+Загрузка сохраняется в upload_dir/import_jobs, задание записывается в БД, и клиент
+сразу получает его id. Разбор и вставка пачками идут в воркере: в Celery, если
+задан celery_broker_url, иначе в пуле asyncio-задач этого процесса. Каждая пачка
+коммитится вместе со счетчиками задания, поэтому после сбоя задание продолжается
+с первой незакоммиченной пары. Карточки, уже имеющиеся в наборе, пропускаются.
+
+Воркер Celery:
+    celery -A infrastructure.services.import_jobs:celery_app worker
+"""
+import asyncio
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Optional
+from uuid import UUID
+
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from domain.entities.card import Card
+from domain.entities.import_job import ImportJob, ImportJobStatus, ImportSource
+from domain.repositories.import_job_repository import ImportJobLostError
+from infrastructure.config import settings
+from infrastructure.repositories.card_repository import CardRepository
+from infrastructure.repositories.import_job_repository import ImportJobRepository
+from infrastructure.services.cache_service import cache_service, deck_tag
+from infrastructure.services.distractor_index import schedule_distractor_index_build
+from infrastructure.services.due_queue import DueQueue
+from infrastructure.services.import_service import ImportService
+
+try:
+    from celery import Celery
+except ImportError:
+    Celery = None
+
+logger = logging.getLogger(__name__)
+
+ROW_PARSERS = {
+    ImportSource.EXCEL: ImportService.iter_excel_rows,
+    ImportSource.WORD: ImportService.iter_word_rows,
+}
+
+
+def import_job_key(deck_id: UUID, file_hash: str) -> str:
+    """Ключ кэша: id завершенного задания с этим файлом (до изменения карточек набора)"""
+    return f"import_job:{deck_id}:{file_hash}"
+
+
+def job_file_path(job_id: UUID, filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(settings.upload_dir, "import_jobs", f"{job_id}{extension}")
+
+
+async def store_upload(file: UploadFile, path: str) -> None:
+    """Сохранить загрузку для воркера (размер проверяется при чтении)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with await ImportService().spool_upload(file) as source, open(path, "wb") as target:
+        shutil.copyfileobj(source, target)
+
+
+async def run_import_job(
+    bind: AsyncEngine,
+    job_id: UUID,
+    stale_before: Optional[datetime] = None,
+) -> Optional[ImportJob]:
+    """
+    Выполнить или продолжить задание; None - его уже выполняет другой воркер
+
+    stale_before позволяет забрать выполняющееся задание, которое не обновлялось
+    с этого момента (его воркер упал). Если задание тем временем забрал другой
+    воркер, этот останавливается, не записав больше ни одной пачки.
+    """
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        job_repo = ImportJobRepository(session)
+        job = await job_repo.claim(job_id, stale_before)
+        if job is None:
+            return None
+
+        try:
+            with open(job.file_path, "rb") as source:
+                rows = ROW_PARSERS[job.source](source)
+                # Пары из закоммиченных пачек уже в БД - только пропускаем их
+                rows = islice(rows, job.rows_parsed, None)
+                while True:
+                    # Разбор занимает CPU - в потоке, чтобы не блокировать event loop
+                    chunk = await asyncio.to_thread(lambda: list(islice(rows, settings.db_batch_size)))
+                    if not chunk:
+                        break
+                    await job_repo.save_chunk(
+                        job, [Card.create(job.deck_id, front, back) for front, back in chunk]
+                    )
+            job.complete()
+        except ImportJobLostError:
+            return _lost(job)
+        except Exception as e:
+            logger.error(f"Import job {job.id} failed: {e}", exc_info=True)
+            await session.rollback()
+            job.fail(str(e))
+        try:
+            await job_repo.update(job)
+        except ImportJobLostError:
+            return _lost(job)
+
+        if job.status == ImportJobStatus.COMPLETED:
+            await _after_import(session, job)
+    return job
+
+
+def _lost(job: ImportJob) -> None:
+    logger.warning(f"Import job {job.id} was taken over by another worker, attempt {job.attempt} stops")
+    return None
+
+
+async def _after_import(session: AsyncSession, job: ImportJob) -> None:
+    """Убрать файл и устаревшие производные данные набора; запомнить задание для повторной загрузки"""
+    try:
+        os.remove(job.file_path)
+    except OSError:
+        pass
+
+    await cache_service.invalidate_tags(deck_tag(job.deck_id))
+    if job.file_hash:
+        await cache_service.set(
+            import_job_key(job.deck_id, job.file_hash),
+            str(job.id),
+            ttl=settings.import_result_ttl,
+            tags=(deck_tag(job.deck_id),),
+        )
+    if settings.due_queue_enabled and cache_service.redis is not None:
+        # Очередь перестроится из БД при следующем чтении
+        await DueQueue(cache_service.redis, CardRepository(session)).drop(job.deck_id)
+
+
+class ImportJobWorker:
+    """Пул asyncio-задач для заданий импорта в процессе приложения"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._slots = asyncio.Semaphore(max_workers or settings.import_workers)
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+
+    def submit(self, bind: AsyncEngine, job_id: UUID, stale_before: Optional[datetime] = None) -> None:
+        if job_id in self._tasks:
+            return
+
+        async def run():
+            try:
+                async with self._slots:
+                    job = await run_import_job(bind, job_id, stale_before)
+                if job is not None and job.status == ImportJobStatus.COMPLETED:
+                    # Индекс похожих ответов живет в памяти этого процесса
+                    schedule_distractor_index_build(bind, job.deck_id)
+            except Exception as e:
+                logger.error(f"Import job {job_id} was interrupted: {e}")
+            finally:
+                self._tasks.pop(job_id, None)
+
+        self._tasks[job_id] = asyncio.create_task(run())
+
+    async def resume(self, bind: AsyncEngine, started_at: datetime) -> int:
+        """
+        Продолжить задания, прерванные остановкой приложения
+
+        Выполняющиеся задания, не обновлявшиеся с started_at, остались от
+        предыдущего процесса; заберет их только один воркер.
+        """
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            jobs = await ImportJobRepository(session).get_unfinished()
+        for job in jobs:
+            self.submit(bind, job.id, started_at)
+        return len(jobs)
+
+
+import_job_worker = ImportJobWorker()
+
+celery_app = None
+if Celery is not None and settings.celery_broker_url:
+    celery_app = Celery("minddeck", broker=settings.celery_broker_url)
+
+    @celery_app.task(name="import_jobs.run", bind=True, acks_late=True, max_retries=None)
+    def run_import_job_task(task, job_id: str) -> None:
+        """Задание в воркере Celery; после падения воркера брокер доставит его снова"""
+        try:
+            claimed = asyncio.run(_run_with_own_engine(UUID(job_id)))
+        except ConnectionError as e:
+            raise task.retry(exc=e, countdown=settings.import_job_stale_seconds)
+        if not claimed:
+            # Задание выполняет другой воркер - позже проверим, не упал ли он
+            raise task.retry(countdown=settings.import_job_stale_seconds)
+
+
+async def _run_with_own_engine(job_id: UUID) -> bool:
+    """False - задание выполняет другой воркер"""
+    # У каждого asyncio.run свой event loop - пул соединений приложения и клиент Redis не подходят
+    engine = create_async_engine(settings.database_url)
+    await cache_service.connect()
+    try:
+        if settings.redis_url and cache_service.redis is None:
+            # Без Redis после импорта остались бы кэш и очередь повторений набора без новых карточек
+            raise ConnectionError("Redis is unavailable, import job is postponed")
+        async with AsyncSession(engine) as session:
+            job = await ImportJobRepository(session).get_by_id(job_id)
+        if job is None or job.is_finished:
+            return True
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.import_job_stale_seconds)
+        return await run_import_job(engine, job_id, stale_before) is not None
+    finally:
+        await cache_service.disconnect()
+        await engine.dispose()
+
+
+def dispatch_import_job(bind: AsyncEngine, job_id: UUID) -> None:
+    """Отправить задание в Celery, а без брокера - в пул этого процесса"""
+    if celery_app is not None:
+        run_import_job_task.delay(str(job_id))
+        return
+    import_job_worker.submit(bind, job_id)
@@ -1,21 +1,80 @@
-import io
-from typing import List, Tuple
+import hashlib
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator, List, Optional, Tuple
 from docx import Document
 from openpyxl import load_workbook
-from PIL import Image
-import pytesseract
 from fastapi import UploadFile
 
+from infrastructure.config import settings
+from infrastructure.services.ocr_service import OCRService, ocr_service
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Загрузки до этого размера остаются в памяти, большие уходят во временный файл
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Загруженный файл больше settings.max_upload_size"""
+
 
 class ImportService:
     """Сервис для импорта карточек из различных форматов"""
+
+    def __init__(self, ocr: Optional[OCRService] = None):
+        self._ocr = ocr or ocr_service
+
+    async def spool_upload(self, file: UploadFile, max_size: Optional[int] = None) -> SpooledTemporaryFile:
+        """
+        Скопировать загрузку кусками во временный файл, проверяя размер на лету
+
+        Память ограничена SPOOL_MAX_MEMORY независимо от размера файла; чтение
+        прекращается, как только превышен max_size (по умолчанию settings.max_upload_size).
+        """
+        if max_size is None:
+            max_size = settings.max_upload_size
+        if file.size is not None and file.size > max_size:
+            raise UploadTooLargeError(f"File is larger than {max_size} bytes")
+
+        spooled = SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        try:
+            size = 0
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(f"File is larger than {max_size} bytes")
+                spooled.write(chunk)
+        except BaseException:
+            spooled.close()
+            raise
+        spooled.seek(0)
+        return spooled
+
+    async def file_digest(self, *files: UploadFile) -> str:
+        """
+        sha256 содержимого загрузок - по нему узнается повторная загрузка того же файла
+
+        Читает кусками (с той же проверкой общего размера) и возвращает файлы в начало.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        for file in files:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.max_upload_size:
+                    raise UploadTooLargeError(f"File is larger than {settings.max_upload_size} bytes")
+                digest.update(chunk)
+            await file.seek(0)
+        return digest.hexdigest()
     
     async def import_from_word(self, file: UploadFile) -> List[Tuple[str, str]]:
         """Импортировать карточки из Word документа"""
-        content = await file.read()
-        doc = Document(io.BytesIO(content))
-        
-        cards = []
+        with await self.spool_upload(file) as source:
+            return list(self.iter_word_rows(source))
+
+    @staticmethod
+    def iter_word_rows(source: BinaryIO) -> Iterator[Tuple[str, str]]:
+        """Пары (термин, определение) из абзацев документа"""
+        doc = Document(source)
         current_front = None
         
         for paragraph in doc.paragraphs:
@@ -27,33 +86,64 @@ class ImportService:
             if current_front is None:
                 current_front = text
             else:
-                cards.append((current_front, text))
+                yield current_front, text
                 current_front = None
-        
-        return cards
     
-    async def import_from_excel(self, file: UploadFile) -> List[Tuple[str, str]]:
-        """Импортировать карточки из Excel файла"""
-        content = await file.read()
-        workbook = load_workbook(io.BytesIO(content))
-        sheet = workbook.active
-        
-        cards = []
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if len(row) >= 2 and row[0] and row[1]:
-                front = str(row[0]).strip()
-                back = str(row[1]).strip()
-                if front and back:
-                    cards.append((front, back))
-        
-        return cards
+    async def import_from_excel(self, file: UploadFile) -> Iterator[Tuple[str, str]]:
+        """
+        Импортировать карточки из Excel файла
+
+        Возвращает генератор: строки читаются по мере потребления (например,
+        пачками в bulk_create), временный файл закрывается после последней строки.
+        """
+        source = await self.spool_upload(file)
+        return self._iter_excel_file(source)
+
+    def _iter_excel_file(self, source: SpooledTemporaryFile) -> Iterator[Tuple[str, str]]:
+        with source:
+            yield from self.iter_excel_rows(source)
+
+    @staticmethod
+    def iter_excel_rows(source: BinaryIO) -> Iterator[Tuple[str, str]]:
+        """Пары (термин, определение) активного листа; в режиме read_only лист не загружается целиком"""
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            for row in sheet.iter_rows(min_row=2, max_col=2, values_only=True):
+                if len(row) >= 2 and row[0] and row[1]:
+                    front = str(row[0]).strip()
+                    back = str(row[1]).strip()
+                    if front and back:
+                        yield front, back
+        finally:
+            workbook.close()
     
     async def import_from_image(self, file: UploadFile) -> List[Tuple[str, str]]:
         """Импортировать карточки из изображения с помощью OCR"""
-        content = await file.read()
-        image = Image.open(io.BytesIO(content))
-        text = pytesseract.image_to_string(image, lang='rus+eng')
+        return await self.import_from_images([file])
+
+    async def import_from_images(self, files: List[UploadFile]) -> List[Tuple[str, str]]:
+        """
+        Импортировать карточки из нескольких изображений (и страниц TIFF) с помощью OCR
+
+        Общий размер файлов ограничен settings.max_upload_size; страницы
+        распознаются параллельно в пуле процессов, строки разбиваются на пары
+        термин/определение внутри каждой страницы.
+        """
+        images = []
+        remaining = settings.max_upload_size
+        for file in files:
+            with await self.spool_upload(file, max_size=remaining) as source:
+                images.append(source.read())
+            remaining -= len(images[-1])
+
+        cards = []
+        for text in await self._ocr.recognize(images):
+            cards.extend(self._pair_lines(text))
+        return cards
 
+    @staticmethod
+    def _pair_lines(text: str) -> List[Tuple[str, str]]:
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         
         cards = []
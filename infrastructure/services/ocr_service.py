@@ -0,0 +1,222 @@
+"""
+Распознавание текста (OCR) для импорта из изображений
+
+Распознавание занимает секунды CPU на страницу, поэтому выполняется в
+ограниченном пуле процессов, а не в event loop. Страницы многостраничных TIFF
+и несколько изображений распознаются параллельно; в процесс передается только
+своя страница. Перед распознаванием страница переводится в оттенки серого,
+уменьшается до OCR_TARGET_DPI и бинаризуется.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from infrastructure.config import settings
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+# Tesseract лучше всего работает около 300 DPI; больше - только дольше
+OCR_TARGET_DPI = 300
+# Для изображений без DPI (фото, скриншоты) ограничиваем длинную сторону
+OCR_MAX_SIDE = 3500
+
+OCRFunc = Callable[[Image.Image], str]
+
+
+class ImageReadError(ValueError):
+    """Файл не удалось прочитать как изображение"""
+
+
+class OCRUnavailableError(RuntimeError):
+    """OCR не установлен или пул OCR упал и после пересоздания"""
+
+
+# Ошибки разбора изображения: не изображение, битые или обрезанные данные, слишком много пикселей
+IMAGE_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, OSError)
+
+
+def tesseract_ocr(image: Image.Image) -> str:
+    """OCR по умолчанию - Tesseract"""
+    try:
+        return pytesseract.image_to_string(image, lang=settings.ocr_languages)
+    except pytesseract.TesseractNotFoundError as e:
+        raise OCRUnavailableError(str(e))
+
+
+def otsu_threshold(histogram: Sequence[int]) -> int:
+    """Порог бинаризации по Оцу для гистограммы 8-битного изображения"""
+    total = sum(histogram)
+    sum_all = sum(value * count for value, count in enumerate(histogram))
+    best, threshold = -1.0, 127
+    weight_background, sum_background = 0, 0
+    for value, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += value * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        between = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if between > best:
+            best, threshold = between, value
+    return threshold
+
+
+def preprocess(image: Image.Image) -> Image.Image:
+    """Оттенки серого, уменьшение до OCR_TARGET_DPI (или OCR_MAX_SIDE) и бинаризация"""
+    dpi = image.info.get("dpi", (0, 0))[0] or 0
+    gray = ImageOps.exif_transpose(image).convert("L")
+
+    scale = 1.0
+    if dpi > OCR_TARGET_DPI:
+        scale = OCR_TARGET_DPI / dpi
+    longest = max(gray.size)
+    if longest * scale > OCR_MAX_SIDE:
+        scale = OCR_MAX_SIDE / longest
+    if scale < 1:
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        gray = gray.resize(size, Image.Resampling.LANCZOS)
+
+    threshold = otsu_threshold(gray.histogram())
+    return gray.point([255 if value > threshold else 0 for value in range(256)])
+
+
+def _frame_bytes(data: bytes, frame: int) -> bytes:
+    """Одна страница многостраничного изображения отдельным TIFF (без сжатия - быстро)"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.seek(frame)
+            content = io.BytesIO()
+            dpi = image.info.get("dpi")
+            image.save(content, format="TIFF", **({"dpi": dpi} if dpi else {}))
+            return content.getvalue()
+    except IMAGE_ERRORS as e:
+        raise ImageReadError(f"Could not read image: {e}")
+
+
+def _ocr_page(ocr_func: OCRFunc, data: bytes) -> str:
+    """Выполняется в процессе пула: открыть страницу, подготовить и распознать"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Пиксели декодируются здесь: битые данные - ошибка файла, а не OCR
+            page = preprocess(image)
+    except IMAGE_ERRORS as e:
+        raise ImageReadError(f"Could not read image: {e}")
+    return ocr_func(page)
+
+
+class OCRService:
+    """
+    OCR в пуле процессов
+
+    ocr_func получает подготовленную страницу (PIL.Image) и возвращает текст;
+    в тестах ее можно подменить. Функция должна быть объявлена на уровне модуля,
+    чтобы ее можно было передать в процесс пула.
+    """
+
+    def __init__(
+        self,
+        ocr_func: Optional[OCRFunc] = None,
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self._ocr_func = ocr_func or tesseract_ocr
+        self._max_workers = max_workers or settings.ocr_workers
+        self._executor = executor
+        # Не больше двух страниц на процесс в очереди: данные страниц не копятся в пуле
+        self._pending = asyncio.Semaphore(self._max_workers * 2)
+
+    def available(self) -> bool:
+        return self._ocr_func is not tesseract_ocr or pytesseract is not None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._new_executor()
+        return self._executor
+
+    def _new_executor(self) -> Executor:
+        # spawn: fork процесса с event loop и потоками небезопасен
+        return ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _discard_executor(self, executor: Executor) -> None:
+        """Убрать сломанный пул; следующий вызов создаст новый"""
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def count_pages(data: bytes) -> int:
+        """Число страниц изображения (кадров TIFF); читается только заголовок"""
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return getattr(image, "n_frames", 1)
+        except IMAGE_ERRORS as e:
+            raise ImageReadError(f"Could not read image: {e}")
+
+    async def recognize(self, images: Sequence[bytes]) -> List[str]:
+        """
+        Текст всех страниц всех изображений по порядку; страницы распознаются параллельно
+
+        Если процесс пула упал (например, убит по OOM), пул пересоздается и
+        распознавание повторяется один раз; повторный сбой - OCRUnavailableError.
+        """
+        if not self.available():
+            raise OCRUnavailableError("pytesseract is not installed")
+
+        pages = []
+        for data in images:
+            count = self.count_pages(data)
+            pages.extend((data, frame, count) for frame in range(count))
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await self._recognize_pages(executor, pages)
+            except BrokenProcessPool as e:
+                logger.warning(f"OCR process pool is broken, recreating it: {e}")
+                self._discard_executor(executor)
+        raise OCRUnavailableError("OCR worker crashed")
+
+    async def _recognize_pages(self, executor: Executor, pages) -> List[str]:
+        loop = asyncio.get_running_loop()
+
+        async def run(data: bytes, frame: int, count: int) -> str:
+            async with self._pending:
+                if count > 1:
+                    # Страница выделяется перед отправкой: в процесс не копируется весь файл,
+                    # а в памяти одновременно не больше страниц, чем мест в очереди
+                    data = await asyncio.to_thread(_frame_bytes, data, frame)
+                return await loop.run_in_executor(executor, _ocr_page, self._ocr_func, data)
+
+        tasks = [asyncio.ensure_future(run(*page)) for page in pages]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ocr_service = OCRService()
@@ -0,0 +1,75 @@
+"""
+Кэш аутентифицированных пользователей
+Локальный LRU с коротким TTL, при наличии Redis - второй уровень через CacheService
+
+Хэш пароля в кэш не попадает: для аутентификации по токену он не нужен, а вход
+читает пользователя из БД.
+"""
+from dataclasses import replace
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from domain.entities.user import User
+from infrastructure.config import settings
+from infrastructure.services.cache_service import cache_service
+from infrastructure.services.lru_cache import LRUCache
+
+
+class UserCache:
+    """Кэш пользователей по id"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._ttl = ttl
+        self._local = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _key(user_id: UUID) -> str:
+        return f"user:{user_id}"
+
+    async def get(self, user_id: UUID) -> Optional[User]:
+        """Получить пользователя из кэша"""
+        user = self._local.get(user_id)
+        if user is not None:
+            return user
+
+        data = await cache_service.get(self._key(user_id))
+        if not data:
+            return None
+
+        user = User(
+            id=UUID(data["id"]),
+            email=data["email"],
+            username=data["username"],
+            hashed_password="",
+            created_at=datetime.fromisoformat(data["created_at"]),
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+            is_active=data["is_active"],
+        )
+        self._local.set(user_id, user)
+        return user
+
+    async def set(self, user: User) -> None:
+        """Сохранить пользователя в кэш (без хэша пароля)"""
+        user = replace(user, hashed_password="")
+        self._local.set(user.id, user)
+        await cache_service.set(
+            self._key(user.id),
+            {
+                "id": str(user.id),
+                "email": user.email,
+                "username": user.username,
+                "created_at": user.created_at.isoformat(),
+                "updated_at": user.updated_at.isoformat(),
+                "is_active": user.is_active,
+            },
+            ttl=self._ttl,
+        )
+
+    async def invalidate(self, user_id: UUID) -> None:
+        """Сбросить пользователя из кэша (после изменения или удаления)"""
+        self._local.delete(user_id)
+        await cache_service.delete(self._key(user_id))
+
+
+user_cache = UserCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl)
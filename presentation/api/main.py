@@ -1,8 +1,9 @@
 import logging
 import signal
 import sys
+from datetime import datetime
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.openapi.utils import get_openapi
@@ -23,12 +24,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Запас на границы и заголовки multipart поверх max_upload_size
+MULTIPART_OVERHEAD = 64 * 1024
+
 # Переменная для graceful shutdown
 shutdown_event = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Задания импорта, не обновлявшиеся с этого момента, остались от прошлого процесса
+    started_at = datetime.utcnow()
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Environment: {settings.environment}")
 
@@ -45,6 +51,16 @@ async def lifespan(app: FastAPI):
         logger.info("Redis cache connected")
     except Exception as e:
         logger.warning(f"Failed to connect to Redis: {e}")
+
+    try:
+        from infrastructure.database.database import engine
+        from infrastructure.services.import_jobs import celery_app, import_job_worker
+        if celery_app is None:
+            resumed = await import_job_worker.resume(engine, started_at)
+            if resumed:
+                logger.info(f"Resumed {resumed} import jobs")
+    except Exception as e:
+        logger.warning(f"Failed to resume import jobs: {e}")
     
     yield
 
@@ -57,6 +73,9 @@ async def lifespan(app: FastAPI):
     except Exception:
         pass
 
+    from infrastructure.services.ocr_service import ocr_service
+    ocr_service.shutdown()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -97,6 +116,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
     # Подключение роутеров
@@ -120,6 +140,20 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "healthy"}
 
+    @app.middleware("http")
+    async def limit_upload_size(request: Request, call_next):
+        # Заведомо слишком большие загрузки отклоняем до чтения тела;
+        # без Content-Length лимит проверяется при копировании файла
+        if request.url.path.startswith("/api/v1/import"):
+            content_length = request.headers.get("content-length")
+            if content_length and content_length.isdigit() and \
+                    int(content_length) > settings.max_upload_size + MULTIPART_OVERHEAD:
+                return JSONResponse(
+                    status_code=413,
+                    content={"detail": f"File is larger than {settings.max_upload_size} bytes"}
+                )
+        return await call_next(request)
+
     @app.exception_handler(Exception)
     async def global_exception_handler(request, exc):
         logger.error(f"Unhandled exception: {exc}", exc_info=True)
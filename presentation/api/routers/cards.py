@@ -1,14 +1,30 @@
-from typing import List, Optional
+import base64
+import csv
+import io
+from datetime import datetime
+from typing import List, Optional, Tuple
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from infrastructure.database.database import get_db
 from infrastructure.repositories.card_repository import CardRepository
 from infrastructure.repositories.deck_repository import DeckRepository
-from presentation.schemas.card_schemas import CardCreate, CardUpdate, CardResponse, ReviewCardRequest, FSRSStateResponse
+from infrastructure.services.cache_service import get_cache, CacheService, deck_tag
+from infrastructure.services.due_queue import DueQueue, get_due_queue
+from presentation.schemas.card_schemas import (
+    CardCreate,
+    CardUpdate,
+    CardResponse,
+    ReviewCardRequest,
+    FSRSStateResponse,
+    BatchReviewRequest,
+    BatchReviewResponse,
+)
 from presentation.api.routers.users import get_current_user_dependency
 from domain.entities.user import User
+from domain.repositories.card_repository import DuplicateCardError
 from application.use_cases.card_use_cases import (
     CreateCardUseCase,
     GetCardUseCase,
@@ -17,11 +33,35 @@ from application.use_cases.card_use_cases import (
     DeleteCardUseCase,
     GetDueCardsUseCase,
     ReviewCardUseCase,
+    ReviewCardsBatchUseCase,
 )
 from application.services.fsrs_service import FSRSService
+from application.services.distractor_service import distractor_service
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+CARD_PAGE_CACHE_TTL = 300
+DUE_CARDS_CACHE_TTL = 60
+EXPORT_ROWS_PER_CHUNK = 500
+
+CSV_EXPORT_FIELDS = [
+    "id",
+    "deck_id",
+    "front",
+    "back",
+    "audio_url",
+    "stability",
+    "difficulty",
+    "ease_factor",
+    "interval",
+    "review_count",
+    "last_review",
+    "due_date",
+    "created_at",
+    "updated_at",
+]
+
 
 @router.post("/deck/{deck_id}", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
 async def create_card(
@@ -29,6 +69,8 @@ async def create_card(
     card_data: CardCreate,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Создать новую карточку"""
     deck_repo = DeckRepository(db)
@@ -48,11 +90,21 @@ async def create_card(
     card_repo = CardRepository(db)
     use_case = CreateCardUseCase(card_repo, deck_repo)
     
-    card = await use_case.execute(
-        deck_id=deck_id,
-        front=card_data.front,
-        back=card_data.back,
-    )
+    try:
+        card = await use_case.execute(
+            deck_id=deck_id,
+            front=card_data.front,
+            back=card_data.back,
+        )
+    except DuplicateCardError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    await cache.invalidate_tags(deck_tag(deck_id))
+    if due_queue:
+        await due_queue.update_cards([card])
+    distractor_service.update_card(deck_id, card.id, card.back)
     
     return _card_to_response(card)
 
@@ -60,10 +112,31 @@ async def create_card(
 @router.get("/deck/{deck_id}", response_model=List[CardResponse])
 async def get_deck_cards(
     deck_id: UUID,
+    response: Response,
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
-    """Получить все карточки набора"""
+    """
+    Получить карточки набора
+    
+    Без limit и cursor возвращаются все карточки. С ними - страница по ключу
+    (created_at, id); курсор следующей страницы передается в заголовке X-Next-Cursor.
+    Страницы кэшируются до изменения карточек набора.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            after = _decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        limit = limit or DEFAULT_PAGE_SIZE
+
     deck_repo = DeckRepository(db)
     deck = await deck_repo.get_by_id(deck_id)
     if not deck:
@@ -78,12 +151,37 @@ async def get_deck_cards(
             detail="Access denied"
         )
     
-    card_repo = CardRepository(db)
-    use_case = GetDeckCardsUseCase(card_repo)
-    
-    cards = await use_case.execute(deck_id)
+    if limit is None:
+        use_case = GetDeckCardsUseCase(CardRepository(db))
+        cards = await use_case.execute(deck_id)
+        return [_card_to_response(card) for card in cards]
+
+    async def load_page():
+        # Собственная сессия: кэш может выполнить загрузку в фоне,
+        # когда сессия запроса уже закрыта
+        async with AsyncSession(db.bind, expire_on_commit=False) as session:
+            use_case = GetDeckCardsUseCase(CardRepository(session))
+            # Запрашиваем на одну карточку больше, чтобы понять, есть ли следующая страница
+            cards = await use_case.execute(deck_id, limit + 1, after)
+        next_cursor = None
+        if len(cards) > limit:
+            cards = cards[:limit]
+            next_cursor = _encode_cursor(cards[-1].created_at, cards[-1].id)
+        return {
+            "cards": [_card_to_response(card).model_dump(mode="json") for card in cards],
+            "next_cursor": next_cursor,
+        }
+
+    page = await cache.get_or_compute(
+        f"deck_cards:{deck_id}:{limit}:{cursor or ''}",
+        load_page,
+        ttl=CARD_PAGE_CACHE_TTL,
+        tags=[deck_tag(deck_id)],
+    )
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
     
-    return [_card_to_response(card) for card in cards]
+    return [CardResponse(**card) for card in page["cards"]]
 
 
 @router.get("/deck/{deck_id}/due", response_model=List[CardResponse])
@@ -92,8 +190,9 @@ async def get_due_cards(
     limit: Optional[int] = None,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
-    """Получить карточки для повторения"""
+    """Получить карточки для повторения (кэшируются на DUE_CARDS_CACHE_TTL секунд)"""
     deck_repo = DeckRepository(db)
     deck = await deck_repo.get_by_id(deck_id)
     if not deck:
@@ -108,12 +207,104 @@ async def get_due_cards(
             detail="Access denied"
         )
     
+    async def load_due_cards():
+        # Собственная сессия: кэш может выполнить загрузку в фоне,
+        # когда сессия запроса уже закрыта
+        async with AsyncSession(db.bind, expire_on_commit=False) as session:
+            use_case = GetDueCardsUseCase(CardRepository(session))
+            cards = await use_case.execute(deck_id, limit)
+        return [_card_to_response(card).model_dump(mode="json") for card in cards]
+
+    cards = await cache.get_or_compute(
+        f"due_cards:{deck_id}:{limit}",
+        load_due_cards,
+        ttl=DUE_CARDS_CACHE_TTL,
+        tags=[deck_tag(deck_id)],
+    )
+    
+    return [CardResponse(**card) for card in cards]
+
+
+@router.post("/review/batch", response_model=BatchReviewResponse)
+async def review_cards_batch(
+    batch_data: BatchReviewRequest,
+    current_user: User = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
+):
+    """Отметить пачку карточек как просмотренные (повторения, накопленные офлайн)"""
     card_repo = CardRepository(db)
-    use_case = GetDueCardsUseCase(card_repo)
+
+    card_ids = list({review.card_id for review in batch_data.reviews})
+    found = await card_repo.get_many_with_owner(card_ids)
+    if len(found) != len(card_ids):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
     
-    cards = await use_case.execute(deck_id, limit)
+    if any(owner_id != current_user.id for _, owner_id in found):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
     
-    return [_card_to_response(card) for card in cards]
+    use_case = ReviewCardsBatchUseCase(card_repo, FSRSService())
+    try:
+        reviewed_cards = await use_case.execute(
+            [card for card, _ in found],
+            [(review.card_id, review.quality, review.reviewed_at) for review in batch_data.reviews],
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    await cache.invalidate_tags(*{deck_tag(card.deck_id) for card, _ in found})
+    if due_queue:
+        await due_queue.update_cards(reviewed_cards)
+    
+    return BatchReviewResponse(
+        reviewed=len(batch_data.reviews),
+        cards=[_card_to_response(card) for card in reviewed_cards],
+    )
+
+
+@router.get("/deck/{deck_id}/export")
+async def export_deck_cards(
+    deck_id: UUID,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Выгрузить все карточки набора с состоянием FSRS (NDJSON или CSV)"""
+    deck_repo = DeckRepository(db)
+    deck = await deck_repo.get_by_id(deck_id)
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+    
+    if deck.user_id != current_user.id and not deck.is_public:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    card_repo = CardRepository(db)
+    cards = card_repo.stream_by_deck_id(deck_id)
+    if format == "csv":
+        body, media_type = _export_csv(cards), "text/csv"
+    else:
+        body, media_type = _export_ndjson(cards), "application/x-ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="deck-{deck_id}.{format}"'},
+    )
 
 
 @router.get("/{card_id}", response_model=CardResponse)
@@ -156,6 +347,7 @@ async def update_card(
     card_data: CardUpdate,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
     """Обновить карточку"""
     card_repo = CardRepository(db)
@@ -177,11 +369,20 @@ async def update_card(
         )
     
     update_use_case = UpdateCardUseCase(card_repo)
-    updated_card = await update_use_case.execute(
-        card_id=card_id,
-        front=card_data.front,
-        back=card_data.back,
-    )
+    try:
+        updated_card = await update_use_case.execute(
+            card_id=card_id,
+            front=card_data.front,
+            back=card_data.back,
+        )
+    except DuplicateCardError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    await cache.invalidate_tags(deck_tag(card.deck_id))
+    if card_data.back is not None:
+        distractor_service.update_card(card.deck_id, card_id, updated_card.back)
     
     return _card_to_response(updated_card)
 
@@ -191,6 +392,8 @@ async def delete_card(
     card_id: UUID,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Удалить карточку"""
     card_repo = CardRepository(db)
@@ -213,6 +416,10 @@ async def delete_card(
     
     delete_use_case = DeleteCardUseCase(card_repo)
     await delete_use_case.execute(card_id)
+    await cache.invalidate_tags(deck_tag(card.deck_id))
+    if due_queue:
+        await due_queue.remove_cards(card.deck_id, [card_id])
+    distractor_service.remove_card(card.deck_id, card_id)
 
 
 @router.post("/{card_id}/review", response_model=CardResponse)
@@ -221,20 +428,21 @@ async def review_card(
     review_data: ReviewCardRequest,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Отметить карточку как просмотренную"""
     card_repo = CardRepository(db)
 
-    card = await card_repo.get_by_id(card_id)
-    if not card:
+    found = await card_repo.get_with_owner(card_id)
+    if not found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Card not found"
         )
     
-    deck_repo = DeckRepository(db)
-    deck = await deck_repo.get_by_id(card.deck_id)
-    if deck.user_id != current_user.id:
+    card, owner_id = found
+    if owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
@@ -243,7 +451,10 @@ async def review_card(
     fsrs_service = FSRSService()
     use_case = ReviewCardUseCase(card_repo, fsrs_service)
     
-    reviewed_card = await use_case.execute(card_id, review_data.quality)
+    reviewed_card = await use_case.review(card, review_data.quality)
+    await cache.invalidate_tags(deck_tag(card.deck_id))
+    if due_queue:
+        await due_queue.update_cards([reviewed_card])
     
     return _card_to_response(reviewed_card)
 
@@ -268,3 +479,47 @@ def _card_to_response(card) -> CardResponse:
         created_at=card.created_at,
         updated_at=card.updated_at,
     )
+
+
+async def _export_ndjson(cards):
+    lines = []
+    async for card in cards:
+        lines.append(_card_to_response(card).model_dump_json())
+        if len(lines) >= EXPORT_ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def _export_csv(cards):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_EXPORT_FIELDS)
+    writer.writeheader()
+    rows = 0
+    async for card in cards:
+        data = _card_to_response(card).model_dump(mode="json")
+        data.update(data.pop("fsrs_state"))
+        writer.writerow(data)
+        rows += 1
+        if rows >= EXPORT_ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
+def _encode_cursor(created_at: datetime, card_id: UUID) -> str:
+    """Непрозрачный курсор постраничного вывода"""
+    raw = f"{created_at.isoformat()}|{card_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, card_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(card_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
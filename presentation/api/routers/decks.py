@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,7 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from infrastructure.database.database import get_db
 from infrastructure.repositories.deck_repository import DeckRepository
 from infrastructure.repositories.user_repository import UserRepository
-from infrastructure.services.cache_service import get_cache, CacheService
+from infrastructure.services.cache_service import get_cache, CacheService, deck_tag, user_tag
+from infrastructure.services.due_queue import DueQueue, get_due_queue
+from application.services.distractor_service import distractor_service
 from presentation.schemas.deck_schemas import DeckCreate, DeckUpdate, DeckResponse
 from presentation.api.routers.users import get_current_user_dependency
 from domain.entities.user import User
@@ -20,6 +22,9 @@ from application.use_cases.deck_use_cases import (
 
 router = APIRouter()
 
+DECKS_CACHE_TTL = 300
+DECKS_CACHE_STALE_TTL = 60
+
 
 @router.post("", response_model=DeckResponse, status_code=status.HTTP_201_CREATED)
 async def create_deck(
@@ -39,8 +44,7 @@ async def create_deck(
         description=deck_data.description,
     )
 
-    cache_key = f"user_decks:{current_user.id}"
-    await cache.delete(cache_key)
+    await cache.invalidate_tags(user_tag(current_user.id))
     
     return DeckResponse(
         id=deck.id,
@@ -61,32 +65,34 @@ async def get_user_decks(
 ):
     """Получить все наборы карточек пользователя"""
     cache_key = f"user_decks:{current_user.id}"
-    cached_decks = await cache.get(cache_key)
-    if cached_decks:
-        return [DeckResponse(**deck) for deck in cached_decks]
-    
-    # Получаем из БД
-    deck_repo = DeckRepository(db)
-    use_case = GetUserDecksUseCase(deck_repo)
-    
-    decks = await use_case.execute(current_user.id)
-    
-    result = [
-        DeckResponse(
-            id=deck.id,
-            user_id=deck.user_id,
-            title=deck.title,
-            description=deck.description,
-            is_public=deck.is_public,
-            created_at=deck.created_at,
-            updated_at=deck.updated_at,
-        )
-        for deck in decks
-    ]
 
-    await cache.set(cache_key, [deck.model_dump() for deck in result], ttl=300)
-    
-    return result
+    async def load_decks():
+        # Собственная сессия: при stale-while-revalidate загрузка идет в фоне,
+        # когда сессия запроса уже закрыта
+        async with AsyncSession(db.bind, expire_on_commit=False) as session:
+            use_case = GetUserDecksUseCase(DeckRepository(session))
+            decks = await use_case.execute(current_user.id)
+        return [
+            DeckResponse(
+                id=deck.id,
+                user_id=deck.user_id,
+                title=deck.title,
+                description=deck.description,
+                is_public=deck.is_public,
+                created_at=deck.created_at,
+                updated_at=deck.updated_at,
+            ).model_dump(mode="json")
+            for deck in decks
+        ]
+
+    decks = await cache.get_or_compute(
+        cache_key,
+        load_decks,
+        ttl=DECKS_CACHE_TTL,
+        stale_ttl=DECKS_CACHE_STALE_TTL,
+        tags=[user_tag(current_user.id)],
+    )
+    return [DeckResponse(**deck) for deck in decks]
 
 
 @router.get("/{deck_id}", response_model=DeckResponse)
@@ -129,6 +135,7 @@ async def update_deck(
     deck_data: DeckUpdate,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
     """Обновить набор карточек"""
     deck_repo = DeckRepository(db)
@@ -153,6 +160,7 @@ async def update_deck(
         title=deck_data.title,
         description=deck_data.description,
     )
+    await cache.invalidate_tags(user_tag(current_user.id), deck_tag(deck_id))
     
     return DeckResponse(
         id=updated_deck.id,
@@ -170,6 +178,8 @@ async def delete_deck(
     deck_id: UUID,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Удалить набор карточек"""
     deck_repo = DeckRepository(db)
@@ -190,3 +200,7 @@ async def delete_deck(
     
     delete_use_case = DeleteDeckUseCase(deck_repo)
     await delete_use_case.execute(deck_id)
+    await cache.invalidate_tags(user_tag(current_user.id), deck_tag(deck_id))
+    if due_queue:
+        await due_queue.drop(deck_id)
+    distractor_service.drop(deck_id)
@@ -1,26 +1,46 @@
-from typing import List
-from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import os
+from typing import List, Optional
+from uuid import UUID, uuid4
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infrastructure.config import settings
 from infrastructure.database.database import get_db
 from infrastructure.repositories.deck_repository import DeckRepository
 from infrastructure.repositories.card_repository import CardRepository
 from infrastructure.repositories.user_repository import UserRepository
+from infrastructure.repositories.import_job_repository import ImportJobRepository
 from presentation.api.routers.users import get_current_user_dependency
 from domain.entities.user import User
 from domain.entities.card import Card
-from infrastructure.services.import_service import ImportService
+from domain.entities.import_job import ImportJob, ImportJobStatus, ImportSource
+from infrastructure.services.import_service import ImportService, UploadTooLargeError
+from infrastructure.services.ocr_service import ImageReadError, OCRUnavailableError
+from infrastructure.services.cache_service import get_cache, CacheService, deck_tag
+from infrastructure.services.due_queue import DueQueue, get_due_queue
+from infrastructure.services.distractor_index import schedule_distractor_index_build
+from infrastructure.services.import_jobs import dispatch_import_job, import_job_key, job_file_path, store_upload
+from presentation.schemas.import_schemas import ImportJobResponse
 
 router = APIRouter()
 
+JOB_SOURCES = {
+    ".xls": ImportSource.EXCEL,
+    ".xlsx": ImportSource.EXCEL,
+    ".doc": ImportSource.WORD,
+    ".docx": ImportSource.WORD,
+}
+
 
 @router.post("/word/{deck_id}", status_code=status.HTTP_201_CREATED)
 async def import_from_word(
     deck_id: UUID,
+    response: Response,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Импортировать карточки из Word документа"""
     deck_repo = DeckRepository(db)
@@ -44,31 +64,40 @@ async def import_from_word(
         )
     
     import_service = ImportService()
-    cards_data = await import_service.import_from_word(file)
+    try:
+        file_hash = await import_service.file_digest(file)
+        remembered = await _remembered_import_result(cache, db, deck_id, file_hash)
+        if remembered is not None:
+            # Тот же файл уже импортирован в этот набор - повторная загрузка ничего не меняет
+            response.status_code = status.HTTP_200_OK
+            return remembered
+        cards_data = await import_service.import_from_word(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     
     card_repo = CardRepository(db)
     cards = [Card.create(deck_id, front, back) for front, back in cards_data]
     created_cards = await card_repo.bulk_create(cards)
+    await cache.invalidate_tags(deck_tag(deck_id))
+    if due_queue:
+        await due_queue.update_cards(created_cards)
+    schedule_distractor_index_build(db.bind, deck_id)
     
-    return {
-        "imported": len(created_cards),
-        "cards": [
-            {
-                "id": str(card.id),
-                "front": card.front,
-                "back": card.back,
-            }
-            for card in created_cards
-        ]
-    }
+    return await _remember_import_result(cache, deck_id, file_hash, created_cards)
 
 
 @router.post("/excel/{deck_id}", status_code=status.HTTP_201_CREATED)
 async def import_from_excel(
     deck_id: UUID,
+    response: Response,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Импортировать карточки из Excel файла"""
     deck_repo = DeckRepository(db)
@@ -92,31 +121,42 @@ async def import_from_excel(
         )
     
     import_service = ImportService()
-    cards_data = await import_service.import_from_excel(file)
+    try:
+        file_hash = await import_service.file_digest(file)
+        remembered = await _remembered_import_result(cache, db, deck_id, file_hash)
+        if remembered is not None:
+            # Тот же файл уже импортирован в этот набор - повторная загрузка ничего не меняет
+            response.status_code = status.HTTP_200_OK
+            return remembered
+        cards_data = await import_service.import_from_excel(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     
+    # Строки разбираются по мере вставки (в потоке): первые пачки уходят в БД до конца разбора
     card_repo = CardRepository(db)
-    cards = [Card.create(deck_id, front, back) for front, back in cards_data]
-    created_cards = await card_repo.bulk_create(cards)
+    created_cards = await card_repo.bulk_create(
+        Card.create(deck_id, front, back) for front, back in cards_data
+    )
+    await cache.invalidate_tags(deck_tag(deck_id))
+    if due_queue:
+        await due_queue.update_cards(created_cards)
+    schedule_distractor_index_build(db.bind, deck_id)
     
-    return {
-        "imported": len(created_cards),
-        "cards": [
-            {
-                "id": str(card.id),
-                "front": card.front,
-                "back": card.back,
-            }
-            for card in created_cards
-        ]
-    }
+    return await _remember_import_result(cache, deck_id, file_hash, created_cards)
 
 
 @router.post("/image/{deck_id}", status_code=status.HTTP_201_CREATED)
 async def import_from_image(
     deck_id: UUID,
+    response: Response,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Импортировать карточки из изображения с текстом (OCR)"""
     deck_repo = DeckRepository(db)
@@ -140,7 +180,29 @@ async def import_from_image(
         )
     
     import_service = ImportService()
-    cards_data = await import_service.import_from_image(file)
+    try:
+        file_hash = await import_service.file_digest(file)
+        remembered = await _remembered_import_result(cache, db, deck_id, file_hash)
+        if remembered is not None:
+            # Тот же файл уже импортирован в этот набор - повторная загрузка ничего не меняет
+            response.status_code = status.HTTP_200_OK
+            return remembered
+        cards_data = await import_service.import_from_image(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ImageReadError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except OCRUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     
     if not cards_data:
         raise HTTPException(
@@ -151,15 +213,239 @@ async def import_from_image(
     card_repo = CardRepository(db)
     cards = [Card.create(deck_id, front, back) for front, back in cards_data]
     created_cards = await card_repo.bulk_create(cards)
+    await cache.invalidate_tags(deck_tag(deck_id))
+    if due_queue:
+        await due_queue.update_cards(created_cards)
+    schedule_distractor_index_build(db.bind, deck_id)
     
+    return await _remember_import_result(cache, deck_id, file_hash, created_cards)
+
+
+@router.post("/images/{deck_id}", status_code=status.HTTP_201_CREATED)
+async def import_from_images(
+    deck_id: UUID,
+    response: Response,
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
+):
+    """Импортировать карточки из нескольких изображений или многостраничного TIFF (OCR)"""
+    deck_repo = DeckRepository(db)
+    deck = await deck_repo.get_by_id(deck_id)
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+    
+    if deck.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    if not all(file.content_type.startswith('image/') for file in files):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only image files are supported"
+        )
+    
+    import_service = ImportService()
+    try:
+        file_hash = await import_service.file_digest(*files)
+        remembered = await _remembered_import_result(cache, db, deck_id, file_hash)
+        if remembered is not None:
+            # Тот же файл уже импортирован в этот набор - повторная загрузка ничего не меняет
+            response.status_code = status.HTTP_200_OK
+            return remembered
+        cards_data = await import_service.import_from_images(files)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ImageReadError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except OCRUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    
+    if not cards_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not extract cards from images"
+        )
+    
+    card_repo = CardRepository(db)
+    cards = [Card.create(deck_id, front, back) for front, back in cards_data]
+    created_cards = await card_repo.bulk_create(cards)
+    await cache.invalidate_tags(deck_tag(deck_id))
+    if due_queue:
+        await due_queue.update_cards(created_cards)
+    schedule_distractor_index_build(db.bind, deck_id)
+    
+    return await _remember_import_result(cache, deck_id, file_hash, created_cards)
+
+
+def _import_result_key(deck_id: UUID, file_hash: str) -> str:
+    return f"import_result:{deck_id}:{file_hash}"
+
+
+def _import_result(cards: List[Card]) -> dict:
     return {
-        "imported": len(created_cards),
+        "imported": len(cards),
         "cards": [
             {
                 "id": str(card.id),
                 "front": card.front,
                 "back": card.back,
             }
-            for card in created_cards
+            for card in cards
         ]
     }
+
+
+async def _remembered_import_result(
+    cache: CacheService,
+    db: AsyncSession,
+    deck_id: UUID,
+    file_hash: str,
+) -> Optional[dict]:
+    """Ответ прежнего импорта того же файла в набор (None - не запомнен)"""
+    card_ids = await cache.get(_import_result_key(deck_id, file_hash))
+    if card_ids is None:
+        return None
+    # Запись сбрасывается при любом изменении карточек набора - они те же, что при импорте
+    cards = await CardRepository(db).get_by_ids([UUID(card_id) for card_id in card_ids])
+    return _import_result(cards)
+
+
+async def _remember_import_result(
+    cache: CacheService,
+    deck_id: UUID,
+    file_hash: str,
+    created_cards: List[Card],
+) -> dict:
+    """
+    Ответ импорта; запоминается до первого изменения карточек набора
+
+    В кэше хранятся только id карточек и только для импортов не больше
+    import_result_max_cards: локальный кэш ограничен числом записей, а не размером.
+    Крупный файл при повторной загрузке разбирается заново (дубликаты пропускаются).
+    """
+    if len(created_cards) <= settings.import_result_max_cards:
+        await cache.set(
+            _import_result_key(deck_id, file_hash),
+            [str(card.id) for card in created_cards],
+            ttl=settings.import_result_ttl,
+            tags=(deck_tag(deck_id),),
+        )
+    return _import_result(created_cards)
+
+
+@router.post("/jobs/{deck_id}", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_import_job(
+    deck_id: UUID,
+    response: Response,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    """Поставить импорт Excel или Word в фон; прогресс - GET /jobs/{job_id}"""
+    deck_repo = DeckRepository(db)
+    deck = await deck_repo.get_by_id(deck_id)
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+    
+    if deck.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    source = JOB_SOURCES.get(extension)
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only .xls, .xlsx, .doc and .docx files are supported"
+        )
+    
+    job_repo = ImportJobRepository(db)
+    job_id = uuid4()
+    file_path = job_file_path(job_id, file.filename)
+    try:
+        file_hash = await ImportService().file_digest(file)
+        # Тот же файл уже импортирован в этот набор, и карточки с тех пор не менялись -
+        # возвращаем прежнее задание
+        previous_id = await cache.get(import_job_key(deck_id, file_hash))
+        previous = await job_repo.get_by_id(UUID(previous_id)) if previous_id else None
+        if previous is not None and previous.status == ImportJobStatus.COMPLETED:
+            response.status_code = status.HTTP_200_OK
+            return _job_to_response(previous)
+        await store_upload(file, file_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    
+    job = await job_repo.create(
+        ImportJob.create(
+            current_user.id, deck_id, source, file.filename, file_path, job_id=job_id, file_hash=file_hash
+        )
+    )
+    dispatch_import_job(db.bind, job.id)
+    
+    return _job_to_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Статус задания импорта: сколько пар прочитано и сколько карточек вставлено"""
+    job_repo = ImportJobRepository(db)
+    job = await job_repo.get_by_id(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    
+    if job.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    return _job_to_response(job)
+
+
+def _job_to_response(job: ImportJob) -> ImportJobResponse:
+    return ImportJobResponse(
+        id=job.id,
+        deck_id=job.deck_id,
+        source=job.source.value,
+        filename=job.filename,
+        status=job.status.value,
+        rows_parsed=job.rows_parsed,
+        rows_inserted=job.rows_inserted,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        finished_at=job.finished_at,
+    )
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,11 +7,16 @@ from infrastructure.database.database import get_db
 from infrastructure.repositories.card_repository import CardRepository
 from infrastructure.repositories.deck_repository import DeckRepository
 from infrastructure.repositories.study_session_repository import StudySessionRepository
+from infrastructure.services.cache_service import get_cache, CacheService, deck_tag
+from infrastructure.services.due_queue import DueQueue, get_due_queue
+from infrastructure.services.distractor_index import schedule_distractor_index_build
 from presentation.schemas.study_schemas import (
     StudySessionCreate,
     StudySessionResponse,
     StudyFlashcardsResponse,
     StudyMultipleChoiceResponse,
+    MultipleChoiceQuestion,
+    StudyMultipleChoiceSessionResponse,
     StudyWriteRequest,
     StudyWriteResponse,
     StudyMatchResponse,
@@ -30,6 +35,7 @@ from application.use_cases.study_use_cases import (
 )
 from application.use_cases.card_use_cases import ReviewCardUseCase
 from application.services.fsrs_service import FSRSService
+from application.services.distractor_service import distractor_service
 
 router = APIRouter()
 
@@ -94,6 +100,7 @@ async def study_flashcards(
     limit: int = Query(default=20, ge=1, le=100),
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Получить карточки для режима флэшкарт"""
     deck_repo = DeckRepository(db)
@@ -113,7 +120,7 @@ async def study_flashcards(
         )
     
     review_card_use_case = ReviewCardUseCase(card_repo, FSRSService())
-    use_case = StudyFlashcardsUseCase(card_repo, deck_repo, review_card_use_case)
+    use_case = StudyFlashcardsUseCase(card_repo, deck_repo, review_card_use_case, due_queue)
     
     cards = await use_case.execute(deck_id, limit)
     
@@ -142,6 +149,51 @@ async def study_flashcards(
     )
 
 
+@router.get("/multiple-choice/{deck_id}", response_model=StudyMultipleChoiceSessionResponse)
+async def study_multiple_choice_session(
+    deck_id: UUID,
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: User = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db),
+):
+    """Получить сразу весь тест множественного выбора: limit вопросов с вариантами"""
+    deck_repo = DeckRepository(db)
+    card_repo = CardRepository(db)
+    
+    deck = await deck_repo.get_by_id(deck_id)
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+    
+    if deck.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    review_card_use_case = ReviewCardUseCase(card_repo, FSRSService())
+    use_case = StudyMultipleChoiceUseCase(card_repo, deck_repo, review_card_use_case, distractor_service)
+    
+    session = await use_case.build_session(deck_id, limit)
+    if not distractor_service.has_index(deck_id):
+        schedule_distractor_index_build(db.bind, deck_id)
+    
+    return StudyMultipleChoiceSessionResponse(
+        deck_id=deck_id,
+        questions=[
+            MultipleChoiceQuestion(
+                card_id=card.id,
+                front=card.front,
+                options=options,
+                correct_index=options.index(card.back),
+            )
+            for card, options in session
+        ],
+    )
+
+
 @router.get("/multiple-choice/{deck_id}/{card_id}", response_model=StudyMultipleChoiceResponse)
 async def study_multiple_choice(
     deck_id: UUID,
@@ -167,9 +219,12 @@ async def study_multiple_choice(
         )
     
     review_card_use_case = ReviewCardUseCase(card_repo, FSRSService())
-    use_case = StudyMultipleChoiceUseCase(card_repo, deck_repo, review_card_use_case)
+    use_case = StudyMultipleChoiceUseCase(card_repo, deck_repo, review_card_use_case, distractor_service)
     
     card, options = await use_case.execute(deck_id, card_id)
+    if not distractor_service.has_index(deck_id):
+        # Пока индекс строится, варианты выбираются случайно
+        schedule_distractor_index_build(db.bind, deck_id)
 
     correct_index = options.index(card.back)
     
@@ -202,20 +257,21 @@ async def study_write_check(
     write_data: StudyWriteRequest,
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    due_queue: Optional[DueQueue] = Depends(get_due_queue),
 ):
     """Проверить ответ в режиме письма"""
     card_repo = CardRepository(db)
     
-    card = await card_repo.get_by_id(write_data.card_id)
-    if not card:
+    found = await card_repo.get_with_owner(write_data.card_id)
+    if not found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Card not found"
         )
 
-    deck_repo = DeckRepository(db)
-    deck = await deck_repo.get_by_id(card.deck_id)
-    if deck.user_id != current_user.id:
+    card, owner_id = found
+    if owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
@@ -224,9 +280,10 @@ async def study_write_check(
     review_card_use_case = ReviewCardUseCase(card_repo, FSRSService())
     use_case = StudyWriteUseCase(card_repo, review_card_use_case)
     
-    is_correct, quality = await use_case.check_answer(write_data.card_id, write_data.answer)
-
-    await review_card_use_case.execute(write_data.card_id, quality)
+    is_correct, quality, reviewed_card = await use_case.submit(card, write_data.answer)
+    await cache.invalidate_tags(deck_tag(card.deck_id))
+    if due_queue:
+        await due_queue.update_cards([reviewed_card])
     
     return StudyWriteResponse(
         is_correct=is_correct,
@@ -7,6 +7,7 @@ from infrastructure.repositories.card_repository import CardRepository
 from presentation.api.routers.users import get_current_user_dependency
 from domain.entities.user import User
 from infrastructure.services.tts_service import TTSService
+from infrastructure.services.cache_service import get_cache, CacheService, deck_tag
 
 router = APIRouter()
 
@@ -18,6 +19,7 @@ async def generate_card_audio(
     side: str = Query(default="front", description="Which side to generate audio for: 'front' or 'back'"),
     current_user: User = Depends(get_current_user_dependency),
     db: AsyncSession = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
     """Сгенерировать аудио для карточки с помощью Text-to-Speech"""
     card_repo = CardRepository(db)
@@ -54,6 +56,7 @@ async def generate_card_audio(
         card.audio_url = audio_url
     
     updated_card = await card_repo.update(card)
+    await cache.invalidate_tags(deck_tag(card.deck_id))
     
     return {
         "card_id": str(card_id),
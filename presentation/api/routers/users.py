@@ -8,7 +8,13 @@ from infrastructure.database.database import get_db
 from infrastructure.repositories.user_repository import UserRepository
 from domain.entities.user import User
 from presentation.schemas.user_schemas import UserCreate, UserResponse, UserLogin, TokenResponse
-from infrastructure.security import verify_password, get_password_hash, create_access_token, decode_token
+from infrastructure.security import (
+    verify_password_async,
+    get_password_hash_async,
+    create_access_token,
+    decode_token,
+)
+from infrastructure.services.user_cache import user_cache
 
 router = APIRouter()
 
@@ -43,10 +49,19 @@ async def get_current_user_dependency(
     except Exception:
         raise credentials_exception
     
-    user_repo = UserRepository(db)
-    user = await user_repo.get_by_id(UUID(user_id))
-    if user is None:
+    try:
+        user_uuid = UUID(user_id)
+    except ValueError:
         raise credentials_exception
+
+    # Пользователь кэшируется, чтобы аутентификация не ходила в БД на каждый запрос
+    user = await user_cache.get(user_uuid)
+    if user is None:
+        user_repo = UserRepository(db)
+        user = await user_repo.get_by_id(user_uuid)
+        if user is None:
+            raise credentials_exception
+        await user_cache.set(user)
     
     return user
 
@@ -70,7 +85,7 @@ async def register(
         )
     
     # Создаем нового пользователя
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     user = User.create(
         email=user_data.email,
         username=user_data.username,
@@ -95,7 +110,7 @@ async def login(
 ):
     """Вход в систему"""
     user = await user_repo.get_by_email(credentials.email)
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await verify_password_async(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -1,7 +1,8 @@
 from .user_schemas import UserCreate, UserResponse, UserLogin
 from .deck_schemas import DeckCreate, DeckUpdate, DeckResponse
-from .card_schemas import CardCreate, CardUpdate, CardResponse, ReviewCardRequest
-from .study_schemas import StudySessionResponse, StudySessionCreate, StudyFlashcardsResponse, StudyMultipleChoiceResponse, StudyWriteRequest, StudyMatchResponse
+from .card_schemas import CardCreate, CardUpdate, CardResponse, ReviewCardRequest, ReviewItem, BatchReviewRequest, BatchReviewResponse
+from .study_schemas import StudySessionResponse, StudySessionCreate, StudyFlashcardsResponse, StudyMultipleChoiceResponse, MultipleChoiceQuestion, StudyMultipleChoiceSessionResponse, StudyWriteRequest, StudyMatchResponse
+from .import_schemas import ImportJobResponse
 
 __all__ = [
     "UserCreate",
@@ -14,10 +15,16 @@ __all__ = [
     "CardUpdate",
     "CardResponse",
     "ReviewCardRequest",
+    "ReviewItem",
+    "BatchReviewRequest",
+    "BatchReviewResponse",
     "StudySessionResponse",
     "StudySessionCreate",
     "StudyFlashcardsResponse",
     "StudyMultipleChoiceResponse",
+    "MultipleChoiceQuestion",
+    "StudyMultipleChoiceSessionResponse",
     "StudyWriteRequest",
     "StudyMatchResponse",
+    "ImportJobResponse",
 ]
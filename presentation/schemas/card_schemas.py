@@ -1,7 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 class CardCreate(BaseModel):
@@ -40,3 +40,26 @@ class CardResponse(BaseModel):
 
 class ReviewCardRequest(BaseModel):
     quality: int  # 0-5
+
+
+class ReviewItem(BaseModel):
+    card_id: UUID
+    quality: int  # 0-5
+    reviewed_at: Optional[datetime] = None
+
+    @field_validator("reviewed_at")
+    @classmethod
+    def _to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # В БД время хранится в UTC без часового пояса
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class BatchReviewRequest(BaseModel):
+    reviews: List[ReviewItem] = Field(..., min_length=1, max_length=1000)
+
+
+class BatchReviewResponse(BaseModel):
+    reviewed: int
+    cards: List[CardResponse]
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+
+
+class ImportJobResponse(BaseModel):
+    id: UUID
+    deck_id: UUID
+    source: str
+    filename: str
+    status: str
+    rows_parsed: int
+    rows_inserted: int
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
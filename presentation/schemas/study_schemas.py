@@ -37,6 +37,18 @@ class StudyMultipleChoiceResponse(BaseModel):
     correct_index: int
 
 
+class MultipleChoiceQuestion(BaseModel):
+    card_id: UUID
+    front: str
+    options: List[str]
+    correct_index: int
+
+
+class StudyMultipleChoiceSessionResponse(BaseModel):
+    deck_id: UUID
+    questions: List[MultipleChoiceQuestion]
+
+
 class StudyWriteRequest(BaseModel):
     card_id: UUID
     answer: str
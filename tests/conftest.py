@@ -1,9 +1,13 @@
+import asyncio
+
 import pytest
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from application.services.distractor_service import distractor_service
 from infrastructure.database.base import Base
 from infrastructure.database.database import get_db
+from infrastructure.services.import_jobs import import_job_worker
 from presentation.api.main import app
 
 
@@ -23,6 +27,10 @@ async def db_session():
     
     async with async_session() as session:
         yield session
+
+    # Фоновые задания импорта и построения индекса похожих ответов читают ту же БД
+    await asyncio.gather(*import_job_worker._tasks.values(), return_exceptions=True)
+    await asyncio.gather(*distractor_service._builds.values(), return_exceptions=True)
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -41,3 +49,183 @@ async def client(db_session):
         yield client
     
     app.dependency_overrides.clear()
+
+
+class FakePubSub:
+    """Минимальная замена redis PubSub для тестов"""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._queue = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self._redis.subscribers.setdefault(channel, []).append(self._queue)
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def close(self):
+        for queues in self._redis.subscribers.values():
+            if self._queue in queues:
+                queues.remove(self._queue)
+
+
+class FakePipeline:
+    """Буферизует команды и выполняет их одним вызовом execute"""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self._redis.round_trips += 1
+        return [
+            await getattr(self._redis, name)(*args, _pipelined=True, **kwargs)
+            for name, args, kwargs in self._commands
+        ]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._commands.clear()
+
+
+class FakeRedis:
+    """Минимальная in-memory замена redis.asyncio.Redis для тестов
+
+    Ключи не истекают, но их TTL запоминается и возвращается PTTL.
+    round_trips считает обращения к серверу (пайплайн - одно обращение)
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.subscribers = {}
+        self.round_trips = 0
+
+    def _call(self, pipelined):
+        if not pipelined:
+            self.round_trips += 1
+
+    async def get(self, key, _pipelined=False):
+        self._call(_pipelined)
+        return self.data.get(key)
+
+    async def mget(self, keys, _pipelined=False):
+        self._call(_pipelined)
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, nx=False, px=None, ex=None, _pipelined=False):
+        self._call(_pipelined)
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        if px is not None or ex is not None:
+            self.ttls[key] = px if px is not None else ex * 1000
+        else:
+            self.ttls.pop(key, None)
+        return True
+
+    async def setex(self, key, ttl, value, _pipelined=False):
+        self._call(_pipelined)
+        self.data[key] = value
+        self.ttls[key] = ttl * 1000
+        return True
+
+    async def delete(self, *keys, _pipelined=False):
+        self._call(_pipelined)
+        for key in keys:
+            self.ttls.pop(key, None)
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def pttl(self, key, _pipelined=False):
+        self._call(_pipelined)
+        if key not in self.data:
+            return -2
+        return self.ttls.get(key, -1)
+
+    async def eval(self, script, numkeys, *args, _pipelined=False):
+        """Из скриптов поддерживается только снятие лока (удалить ключ, если значение совпадает)"""
+        self._call(_pipelined)
+        key, token = args
+        if self.data.get(key) != token:
+            return 0
+        return await self.delete(key, _pipelined=True)
+
+    async def exists(self, *keys, _pipelined=False):
+        self._call(_pipelined)
+        return sum(key in self.data for key in keys)
+
+    async def sadd(self, key, *members, _pipelined=False):
+        self._call(_pipelined)
+        values = self.data.setdefault(key, set())
+        added = len(set(members) - values)
+        values.update(members)
+        return added
+
+    async def smembers(self, key, _pipelined=False):
+        self._call(_pipelined)
+        return set(self.data.get(key, set()))
+
+    async def expire(self, key, ttl, _pipelined=False):
+        self._call(_pipelined)
+        return key in self.data
+
+    async def zadd(self, key, mapping, _pipelined=False):
+        self._call(_pipelined)
+        values = self.data.setdefault(key, {})
+        added = len(set(mapping) - set(values))
+        values.update({str(member): float(score) for member, score in mapping.items()})
+        return added
+
+    async def zrem(self, key, *members, _pipelined=False):
+        self._call(_pipelined)
+        values = self.data.get(key, {})
+        return sum(values.pop(member, None) is not None for member in members)
+
+    def _zsorted(self, key):
+        return sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+    async def zrange(self, key, start, end, withscores=False, _pipelined=False):
+        self._call(_pipelined)
+        items = self._zsorted(key)[start:None if end == -1 else end + 1]
+        return [(m.encode(), s) for m, s in items] if withscores else [m.encode() for m, _ in items]
+
+    async def zrangebyscore(self, key, min, max, start=None, num=None, _pipelined=False):
+        self._call(_pipelined)
+        low = float(min)
+        members = [m.encode() for m, score in self._zsorted(key) if low <= score <= float(max)]
+        if start is not None:
+            members = members[start:start + num]
+        return members
+
+    async def publish(self, channel, message, _pipelined=False):
+        self._call(_pipelined)
+        queues = self.subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(queues)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_redis():
+    """In-memory Redis для тестов кэша"""
+    return FakeRedis()
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from application.services.answer_grader import banded_levenshtein, grade_answer, normalize_answer
+
+
+def edit_distance(a, b):
+    """Полная DP с перестановкой соседних символов"""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def test_banded_levenshtein_matches_full_dp():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = "".join(rng.choice("абв ") for _ in range(rng.randint(0, 12)))
+        b = "".join(rng.choice("абв ") for _ in range(rng.randint(0, 12)))
+        max_distance = rng.randint(0, 6)
+        expected = edit_distance(a, b)
+        assert banded_levenshtein(a, b, max_distance) == min(expected, max_distance + 1)
+
+
+def test_normalize_answer():
+    assert normalize_answer("  Ёлка, ЗЕЛЁНАЯ!  ") == "елка зеленая"
+    assert normalize_answer("ｆｕｌｌ－width") == "full width"
+    assert normalize_answer("«C++», C#!") == "c++ c#"
+    assert normalize_answer("−5 (3.14)") == "-5 3.14"
+
+
+@pytest.mark.parametrize(
+    "answer, correct, expected",
+    [
+        ("ёжик", "Ежик", (True, 4)),
+        ("red apple", "apple, red", (True, 4)),
+        ("definitoin", "definition", (True, 3)),
+        ("восприятие", "восприятия", (True, 3)),
+        ("apple", "apples and pears", (False, 2)),
+        ("cat", "dog", (False, 0)),
+        ("", "dog", (False, 0)),
+        ("+", "+", (True, 4)),
+        ("?", "?", (True, 4)),
+        ("c++", "C++", (True, 4)),
+        ("C", "C++", (False, 0)),
+        ("C", "C#", (False, 1)),
+        ("5", "-5", (False, 1)),
+        ("100", "100%", (False, 2)),
+    ],
+)
+def test_grade_answer(answer, correct, expected):
+    assert grade_answer(answer, correct) == expected
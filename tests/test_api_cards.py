@@ -1,11 +1,20 @@
+import csv
+import io
+import json
+
 import pytest
+from datetime import datetime
+from uuid import uuid4
 
 from domain.entities.user import User
 from domain.entities.deck import Deck
+from domain.entities.card import Card
 from infrastructure.repositories.user_repository import UserRepository
 from infrastructure.repositories.deck_repository import DeckRepository
 from infrastructure.repositories.card_repository import CardRepository
 from infrastructure.security import create_access_token
+from infrastructure.services.cache_service import CacheService, get_cache
+from presentation.api.main import app
 
 
 @pytest.mark.asyncio
@@ -39,3 +48,184 @@ async def test_create_and_get_card_via_api(client, db_session):
     assert resp2.status_code == 200
     cards = resp2.json()
     assert any(c["front"] == "Term API" for c in cards)
+
+    # Та же карточка с точностью до регистра и пробелов - конфликт
+    resp3 = await client.post(
+        f"/api/v1/cards/deck/{created_deck.id}",
+        json={"front": "term  api", "back": "DEFINITION API"},
+        headers=headers,
+    )
+    assert resp3.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_review_card_via_api(client, db_session):
+    user = User.create(email="reviewer@example.com", username="reviewer", hashed_password="hashed")
+    user_repo = UserRepository(db_session)
+    created_user = await user_repo.create(user)
+    stranger = await user_repo.create(
+        User.create(email="stranger@example.com", username="stranger", hashed_password="hashed")
+    )
+
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Review Deck"))
+    card_repo = CardRepository(db_session)
+    created_card = await card_repo.create(Card.create(created_deck.id, "Q", "A"))
+
+    token = create_access_token({"sub": str(created_user.id), "email": created_user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = await client.post(f"/api/v1/cards/{created_card.id}/review", json={"quality": 4}, headers=headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["fsrs_state"]["review_count"] == 1
+    assert body["fsrs_state"]["due_date"] is not None
+
+    stored = await card_repo.get_by_id(created_card.id)
+    assert stored.fsrs_state.review_count == 1
+
+    stranger_token = create_access_token({"sub": str(stranger.id), "email": stranger.email})
+    resp2 = await client.post(
+        f"/api/v1/cards/{created_card.id}/review",
+        json={"quality": 4},
+        headers={"Authorization": f"Bearer {stranger_token}"},
+    )
+    assert resp2.status_code == 403
+
+    resp3 = await client.post(f"/api/v1/cards/{uuid4()}/review", json={"quality": 4}, headers=headers)
+    assert resp3.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_review_cards_batch_via_api(client, db_session):
+    user = User.create(email="batch@example.com", username="batch", hashed_password="hashed")
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Batch Deck"))
+    card_repo = CardRepository(db_session)
+    first = await card_repo.create(Card.create(created_deck.id, "Q1", "A1"))
+    second = await card_repo.create(Card.create(created_deck.id, "Q2", "A2"))
+
+    token = create_access_token({"sub": str(created_user.id), "email": created_user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Повторения пришли не по порядку: применяются по reviewed_at
+    resp = await client.post(
+        "/api/v1/cards/review/batch",
+        json={"reviews": [
+            {"card_id": str(first.id), "quality": 5, "reviewed_at": "2024-01-03T10:00:00Z"},
+            {"card_id": str(first.id), "quality": 4, "reviewed_at": "2024-01-01T10:00:00Z"},
+            {"card_id": str(second.id), "quality": 1, "reviewed_at": "2024-01-02T10:00:00"},
+        ]},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert resp.json()["reviewed"] == 3
+
+    stored_first = await card_repo.get_by_id(first.id)
+    assert stored_first.fsrs_state.review_count == 2
+    assert stored_first.fsrs_state.last_review == datetime(2024, 1, 3, 10, 0, 0)
+    stored_second = await card_repo.get_by_id(second.id)
+    assert stored_second.fsrs_state.review_count == 1
+    assert stored_second.fsrs_state.interval == 1
+
+    resp2 = await client.post(
+        "/api/v1/cards/review/batch",
+        json={"reviews": [{"card_id": str(uuid4()), "quality": 3}]},
+        headers=headers,
+    )
+    assert resp2.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_deck_cards_paginated_via_api(client, db_session):
+    user = User.create(email="pager@example.com", username="pager", hashed_password="hashed")
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Paged Deck"))
+    await CardRepository(db_session).bulk_create(
+        [Card.create(created_deck.id, f"Q{i}", f"A{i}") for i in range(7)]
+    )
+
+    token = create_access_token({"sub": str(created_user.id), "email": created_user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        resp = await client.get(f"/api/v1/cards/deck/{created_deck.id}", params=params, headers=headers)
+        assert resp.status_code == 200
+        seen.extend(card["id"] for card in resp.json())
+        pages += 1
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 7
+
+    resp2 = await client.get(
+        f"/api/v1/cards/deck/{created_deck.id}", params={"cursor": "not-a-cursor"}, headers=headers
+    )
+    assert resp2.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_card_mutations_invalidate_cached_deck_lists(client, db_session, fake_redis):
+    cache = CacheService()
+    cache._redis = fake_redis
+    await cache._on_connected()
+    app.dependency_overrides[get_cache] = lambda: cache
+
+    user = User.create(email="tagged@example.com", username="tagged", hashed_password="hashed")
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Tagged Deck"))
+    token = create_access_token({"sub": str(created_user.id), "email": created_user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+    due_url = f"/api/v1/cards/deck/{created_deck.id}/due"
+
+    assert (await client.get(due_url, headers=headers)).json() == []
+    assert f"due_cards:{created_deck.id}:None" in fake_redis.data
+
+    resp = await client.post(
+        f"/api/v1/cards/deck/{created_deck.id}",
+        json={"front": "Q", "back": "A"},
+        headers=headers,
+    )
+    card_id = resp.json()["id"]
+    assert [card["id"] for card in (await client.get(due_url, headers=headers)).json()] == [card_id]
+
+    resp = await client.post(f"/api/v1/cards/{card_id}/review", json={"quality": 5}, headers=headers)
+    assert resp.status_code == 200
+    assert (await client.get(due_url, headers=headers)).json() == []
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_export_deck_cards_via_api(client, db_session):
+    user = User.create(email="export@example.com", username="export", hashed_password="hashed")
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Export Deck"))
+    await CardRepository(db_session).bulk_create(
+        [Card.create(created_deck.id, f"Q{i}", f"A, {i}") for i in range(3)]
+    )
+
+    token = create_access_token({"sub": str(created_user.id), "email": created_user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = await client.get(f"/api/v1/cards/deck/{created_deck.id}/export", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert sorted(line["front"] for line in lines) == ["Q0", "Q1", "Q2"]
+    assert lines[0]["fsrs_state"]["review_count"] == 0
+
+    resp2 = await client.get(
+        f"/api/v1/cards/deck/{created_deck.id}/export", params={"format": "csv"}, headers=headers
+    )
+    assert resp2.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(resp2.text)))
+    assert sorted(row["back"] for row in rows) == ["A, 0", "A, 1", "A, 2"]
+    assert rows[0]["review_count"] == "0"
@@ -1,10 +1,19 @@
+import io
+
 import pytest
+from fastapi import UploadFile
+from openpyxl import Workbook
+
 from domain.entities.user import User
 from domain.entities.deck import Deck
 from infrastructure.repositories.user_repository import UserRepository
 from infrastructure.repositories.deck_repository import DeckRepository
 from infrastructure.security import create_access_token
-from infrastructure.services.import_service import ImportService
+from infrastructure.config import settings
+from infrastructure.services.import_service import ImportService, UploadTooLargeError
+from infrastructure.services.cache_service import CacheService, get_cache
+from infrastructure.repositories.card_repository import CardRepository
+from presentation.api.main import app
 
 
 @pytest.mark.asyncio
@@ -49,3 +58,120 @@ async def test_import_word_and_excel_and_image(client, db_session, monkeypatch):
     files3 = {"file": ("img.png", b"dummy", "image/png")}
     resp3 = await client.post(f"/api/v1/import/image/{created_deck.id}", files=files3, headers=headers)
     assert resp3.status_code == 201
+
+
+
+async def _create_deck(db_session, email):
+    user = await UserRepository(db_session).create(User.create(email=email, username=email.split("@")[0], hashed_password="h"))
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "Import Deck"))
+    token = create_access_token({"sub": str(user.id), "email": user.email})
+    return deck, {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.asyncio
+async def test_import_excel_from_spooled_upload(client, db_session):
+    deck, headers = await _create_deck(db_session, "i2@example.com")
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Term", "Definition"])
+    for i in range(50):
+        sheet.append([f"term {i}", f"definition {i}"])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    files = {"file": ("cards.xlsx", content.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    resp = await client.post(f"/api/v1/import/excel/{deck.id}", files=files, headers=headers)
+    assert resp.status_code == 201
+    assert resp.json()["imported"] == 50
+
+
+@pytest.mark.asyncio
+async def test_reimport_of_same_file_returns_earlier_result(client, db_session, fake_redis, monkeypatch):
+    cache = CacheService()
+    cache._redis = fake_redis
+    await cache._on_connected()
+    app.dependency_overrides[get_cache] = lambda: cache
+    deck, headers = await _create_deck(db_session, "i4@example.com")
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Term", "Definition"])
+    for i in range(10):
+        sheet.append([f"term {i}", f"definition {i}"])
+    content = io.BytesIO()
+    workbook.save(content)
+    files = {"file": ("cards.xlsx", content.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+
+    resp = await client.post(f"/api/v1/import/excel/{deck.id}", files=files, headers=headers)
+    assert resp.status_code == 201
+    resp2 = await client.post(f"/api/v1/import/excel/{deck.id}", files=files, headers=headers)
+    assert resp2.status_code == 200
+    assert resp2.json() == resp.json()
+    # В кэше только id карточек, а не весь ответ
+    assert not any(b"definition" in value for value in fake_redis.data.values() if isinstance(value, bytes))
+
+    # После изменения набора файл импортируется заново, но уже имеющиеся карточки пропускаются
+    await cache.invalidate_tags(f"deck:{deck.id}")
+    resp3 = await client.post(f"/api/v1/import/excel/{deck.id}", files=files, headers=headers)
+    assert resp3.status_code == 201
+    assert resp3.json()["imported"] == 0
+    assert len(await CardRepository(db_session).get_by_deck_id(deck.id)) == 10
+
+    # Результат крупного импорта не запоминается - файл разбирается заново
+    monkeypatch.setattr(settings, "import_result_max_cards", 5)
+    other_deck, other_headers = await _create_deck(db_session, "i5@example.com")
+    resp4 = await client.post(f"/api/v1/import/excel/{other_deck.id}", files=files, headers=other_headers)
+    assert resp4.json()["imported"] == 10
+    resp5 = await client.post(f"/api/v1/import/excel/{other_deck.id}", files=files, headers=other_headers)
+    assert resp5.status_code == 201
+    assert resp5.json()["imported"] == 0
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_oversized_upload(client, db_session, monkeypatch):
+    deck, headers = await _create_deck(db_session, "i3@example.com")
+    monkeypatch.setattr(settings, "max_upload_size", 1024)
+
+    files = {"file": ("cards.xlsx", b"x" * 200_000, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    resp = await client.post(f"/api/v1/import/excel/{deck.id}", files=files, headers=headers)
+    assert resp.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_stops_reading_at_limit():
+    class CountingStream(io.BytesIO):
+        reads = 0
+
+        def read(self, size=-1):
+            self.reads += 1
+            return super().read(size)
+
+    stream = CountingStream(b"x" * (10 * 1024 * 1024))
+    upload = UploadFile(stream, filename="big.xlsx")
+
+    with pytest.raises(UploadTooLargeError):
+        await ImportService().spool_upload(upload, max_size=2 * 1024 * 1024)
+    assert stream.reads <= 3
+
+    small = UploadFile(io.BytesIO(b"abc"), filename="small.xlsx")
+    with await ImportService().spool_upload(small, max_size=10) as spooled:
+        assert spooled.read() == b"abc"
+
+
+def test_iter_excel_rows_streams_valid_pairs():
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Term", "Definition"])
+    sheet.append([" дом ", "house"])
+    sheet.append(["пусто", None])
+    sheet.append([42, "forty-two"])
+    content = io.BytesIO()
+    workbook.save(content)
+    content.seek(0)
+
+    rows = ImportService.iter_excel_rows(content)
+    assert next(rows) == ("дом", "house")
+    assert list(rows) == [("42", "forty-two")]
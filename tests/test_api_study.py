@@ -1,4 +1,6 @@
 import pytest
+from sqlalchemy import event
+
 from domain.entities.user import User
 from domain.entities.deck import Deck
 from domain.entities.card import Card
@@ -7,6 +9,7 @@ from infrastructure.repositories.deck_repository import DeckRepository
 from infrastructure.repositories.card_repository import CardRepository
 from infrastructure.security import create_access_token
 from domain.entities.study_session import StudyMode
+from application.services.distractor_service import distractor_service
 
 
 @pytest.mark.asyncio
@@ -40,3 +43,86 @@ async def test_start_and_finish_study_session(client, db_session):
     assert resp2.status_code == 200
     finished = resp2.json()
     assert finished["finished_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_multiple_choice_options_are_distinct(client, db_session):
+    user = await UserRepository(db_session).create(User.create(email="mc@example.com", username="mc", hashed_password="h"))
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "Choice Deck"))
+    cards = await CardRepository(db_session).bulk_create(
+        [Card.create(deck.id, f"Q{i}", f"answer {i}") for i in range(6)]
+    )
+
+    token = create_access_token({"sub": str(user.id), "email": user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = await client.get(f"/api/v1/study/multiple-choice/{deck.id}/{cards[0].id}", headers=headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body["options"]) == len(set(body["options"])) == 4
+    assert body["options"][body["correct_index"]] == "answer 0"
+
+    # Первый вопрос запускает построение индекса похожих ответов в фоне
+    await distractor_service._builds[deck.id]
+    assert distractor_service.has_index(deck.id)
+
+
+@pytest.mark.asyncio
+async def test_multiple_choice_session_in_one_request(client, db_session):
+    user = await UserRepository(db_session).create(User.create(email="quiz@example.com", username="quiz", hashed_password="h"))
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "Quiz Deck"))
+    await CardRepository(db_session).bulk_create(
+        [Card.create(deck.id, f"Q{i}", f"answer {i}") for i in range(30)]
+    )
+
+    token = create_access_token({"sub": str(user.id), "email": user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = await client.get(f"/api/v1/study/multiple-choice/{deck.id}", params={"limit": 20}, headers=headers)
+    assert resp.status_code == 200
+    questions = resp.json()["questions"]
+    assert len(questions) == 20
+    assert len({question["card_id"] for question in questions}) == 20
+    for question in questions:
+        options = question["options"]
+        assert len(options) == len(set(options)) == 4
+        assert options[question["correct_index"]] == "answer " + question["front"][1:]
+
+
+@pytest.mark.asyncio
+async def test_write_check_uses_two_statements(client, db_session):
+    user = await UserRepository(db_session).create(User.create(email="wr@example.com", username="wr", hashed_password="h"))
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "Write Deck"))
+    card = await CardRepository(db_session).create(Card.create(deck.id, "дом", "house"))
+
+    token = create_access_token({"sub": str(user.id), "email": user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+    # Прогрев кэша текущего пользователя
+    await client.get("/api/v1/users/me", headers=headers)
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        resp = await client.post(
+            "/api/v1/study/write/check",
+            json={"card_id": str(card.id), "answer": "Hous"},
+            headers=headers,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["correct_answer"] == "house"
+    assert body["quality"] == 2
+    # SELECT карточки с владельцем (JOIN) и UPDATE ... RETURNING
+    assert len(statements) == 2
+    assert "JOIN" in statements[0] and statements[1].lstrip().upper().startswith("UPDATE")
+
+    reviewed = await CardRepository(db_session).get_by_id(card.id)
+    assert reviewed.fsrs_state.review_count == 1
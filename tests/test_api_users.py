@@ -1,4 +1,13 @@
+import sys
+
 import pytest
+from sqlalchemy import event
+
+from domain.entities.user import User
+from infrastructure.repositories.user_repository import UserRepository
+from infrastructure.security import create_access_token
+from infrastructure.services.cache_service import CacheService
+from infrastructure.services.user_cache import UserCache
 
 
 @pytest.mark.asyncio
@@ -27,3 +36,57 @@ async def test_register_login_and_get_me(client):
     assert resp3.status_code == 200
     me = resp3.json()
     assert me["email"] == "u1@example.com"
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_and_invalidated(client, db_session):
+    user_repo = UserRepository(db_session)
+    user = await user_repo.create(User.create(email="cached@example.com", username="cached", hashed_password="h"))
+
+    token = create_access_token({"sub": str(user.id), "email": user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = await client.get("/api/v1/users/me", headers=headers)
+    assert resp.status_code == 200
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        resp2 = await client.get("/api/v1/users/me", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert resp2.status_code == 200
+    assert statements == []
+
+    # Изменение пользователя сбрасывает кэш
+    user.username = "renamed"
+    await user_repo.update(user)
+    resp3 = await client.get("/api/v1/users/me", headers=headers)
+    assert resp3.json()["username"] == "renamed"
+
+    await user_repo.delete(user.id)
+    resp4 = await client.get("/api/v1/users/me", headers=headers)
+    assert resp4.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_cached_user_has_no_password_hash(fake_redis, monkeypatch):
+    cache = CacheService()
+    cache._redis = fake_redis
+    # Имя модуля в пакете занято синглтоном user_cache
+    monkeypatch.setattr(sys.modules[UserCache.__module__], "cache_service", cache)
+    users = UserCache(maxsize=10, ttl=60)
+    user = User.create(email="secret@example.com", username="secret", hashed_password="bcrypt-hash")
+
+    await users.set(user)
+
+    assert all(b"bcrypt-hash" not in value for value in fake_redis.data.values() if isinstance(value, bytes))
+    users._local.clear()
+    cached = await users.get(user.id)
+    assert cached.email == user.email
+    assert cached.hashed_password == ""
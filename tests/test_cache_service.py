@@ -0,0 +1,260 @@
+import asyncio
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from infrastructure.services.cache_codecs import get_codec
+from infrastructure.services.cache_service import CacheService, deck_tag, user_tag
+
+
+async def connected_cache(redis):
+    cache = CacheService()
+    cache._redis = redis
+    await cache._on_connected()
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_local_layer_serves_repeated_gets(fake_redis):
+    cache = await connected_cache(fake_redis)
+
+    assert await cache.set("user_decks:1", [{"title": "Deck"}], ttl=60)
+    fake_redis.data.clear()  # L1 отвечает, не обращаясь к Redis
+
+    assert await cache.get("user_decks:1") == [{"title": "Deck"}]
+    stats = cache.get_stats()
+    assert stats["local_hits"] == 1
+    assert stats["redis_hits"] == 0
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_delete_evicts_local_layer_in_other_workers(fake_redis):
+    first = await connected_cache(fake_redis)
+    second = await connected_cache(fake_redis)
+
+    await first.set("user_decks:1", ["old"], ttl=60)
+    assert await second.get("user_decks:1") == ["old"]  # промах L1, попадание в Redis
+    assert second.get_stats()["redis_hits"] == 1
+
+    await first.delete("user_decks:1")
+    await asyncio.sleep(0)  # даем слушателю pub/sub обработать сообщение
+
+    assert await second.get("user_decks:1") is None
+    assert second.get_stats()["redis_misses"] == 1
+
+    await first.disconnect()
+    await second.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_local_layer_does_not_outlive_redis_ttl(fake_redis):
+    first = await connected_cache(fake_redis)
+    second = await connected_cache(fake_redis)
+
+    await first.set("user_decks:1", ["deck"], ttl=60)
+    fake_redis.ttls["user_decks:1"] = 500  # в Redis осталось полсекунды
+    assert await second.get("user_decks:1") == ["deck"]
+    expires_at, _ = second._local._data["user_decks:1"]
+    assert expires_at - time.monotonic() <= 0.5
+
+    await first.set("user_decks:2", ["gone"], ttl=60)
+    fake_redis.ttls["user_decks:2"] = 0
+    assert await second.get_many(["user_decks:2"]) == [["gone"]]
+    assert "user_decks:2" not in second._local
+
+    await first.disconnect()
+    await second.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_cache_is_disabled_without_redis():
+    cache = CacheService()
+
+    assert await cache.set("key", "value") is False
+    assert await cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_runs_concurrent_misses_once(fake_redis):
+    cache = await connected_cache(fake_redis)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["deck"]
+
+    results = await asyncio.gather(*(
+        cache.get_or_compute("user_decks:1", compute, ttl=60) for _ in range(20)
+    ))
+
+    assert results == [["deck"]] * 20
+    assert calls == 1
+    assert "lock:user_decks:1" not in fake_redis.data
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_survives_cancelled_leader(fake_redis):
+    cache = await connected_cache(fake_redis)
+    started = asyncio.Event()
+
+    async def compute():
+        started.set()
+        await asyncio.sleep(0.05)
+        return ["deck"]
+
+    leader = asyncio.create_task(cache.get_or_compute("user_decks:1", compute, ttl=60))
+    await started.wait()
+    follower = asyncio.create_task(cache.get_or_compute("user_decks:1", compute, ttl=60))
+    await asyncio.sleep(0)
+    # Клиент первого запроса отключился
+    leader.cancel()
+
+    assert await follower == ["deck"]
+    assert leader.cancelled()
+    assert "lock:user_decks:1" not in fake_redis.data
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_unlock_keeps_lock_taken_by_other_worker(fake_redis):
+    cache = await connected_cache(fake_redis)
+    await fake_redis.set("lock:key", b"other")
+
+    await cache._unlock("lock:key", b"mine")
+    assert fake_redis.data["lock:key"] == b"other"
+    await cache._unlock("lock:key", b"other")
+    assert "lock:key" not in fake_redis.data
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_waits_for_other_worker(fake_redis):
+    first = await connected_cache(fake_redis)
+    second = await connected_cache(fake_redis)
+    started = asyncio.Event()
+
+    async def slow_compute():
+        started.set()
+        await asyncio.sleep(0.1)
+        return ["first"]
+
+    async def must_not_run():
+        raise AssertionError("value is computed by the lock holder")
+
+    first_task = asyncio.create_task(first.get_or_compute("key", slow_compute, ttl=60))
+    await started.wait()
+
+    assert await second.get_or_compute("key", must_not_run, ttl=60) == ["first"]
+    assert await first_task == ["first"]
+
+    await first.disconnect()
+    await second.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_serves_stale_and_refreshes_in_background(fake_redis):
+    cache = await connected_cache(fake_redis)
+    versions = iter(["v1", "v2"])
+
+    async def compute():
+        return next(versions)
+
+    # ttl=0: значение сразу устаревает, но живет еще stale_ttl секунд
+    assert await cache.get_or_compute("key", compute, ttl=0, stale_ttl=60) == "v1"
+    assert await cache.get_or_compute("key", compute, ttl=0, stale_ttl=60) == "v1"
+
+    await asyncio.gather(*cache._background)
+    assert (await cache.get("key"))["value"] == "v2"
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_recomputes_expired_and_foreign_entries(fake_redis):
+    cache = await connected_cache(fake_redis)
+    versions = iter(["v1", "v2", "v3"])
+
+    async def compute():
+        return next(versions)
+
+    # Без stale_ttl устаревшее значение (например, из L1) - промах, а не фоновое обновление
+    assert await cache.get_or_compute("key", compute, ttl=0) == "v1"
+    assert await cache.get_or_compute("key", compute, ttl=0) == "v2"
+    assert not cache._background
+
+    # Значение в старом формате под тем же ключом - тоже промах
+    await cache.set("user_decks:1", [{"title": "Deck"}], ttl=60)
+    assert await cache.get_or_compute("user_decks:1", compute, ttl=60) == "v3"
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_get_many_and_set_many_use_single_round_trip(fake_redis):
+    writer = await connected_cache(fake_redis)
+    reader = await connected_cache(fake_redis)
+
+    fake_redis.round_trips = 0
+    assert await writer.set_many({"a": 1, "b": [2]}, ttl=60)
+    assert fake_redis.round_trips == 1
+
+    fake_redis.round_trips = 0
+    assert await reader.get_many(["a", "missing", "b"]) == [1, None, [2]]
+    assert fake_redis.round_trips == 1
+
+    # Повторное чтение обслуживает L1
+    fake_redis.round_trips = 0
+    assert await reader.get_many(["a", "b"]) == [1, [2]]
+    assert fake_redis.round_trips == 0
+
+    await writer.disconnect()
+    await reader.disconnect()
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+def test_codecs_round_trip_payloads(name):
+    codec = get_codec(name)
+    deck_id = uuid4()
+    created_at = datetime(2024, 1, 2, 3, 4, 5)
+    payload = {"id": deck_id, "created_at": created_at, "tags": ["a"], "count": 3}
+
+    decoded = codec.decode(codec.encode(payload))
+
+    assert decoded["tags"] == ["a"] and decoded["count"] == 3
+    if name == "msgpack":
+        assert decoded["id"] == deck_id
+        assert decoded["created_at"] == created_at
+    else:
+        assert decoded["id"] == str(deck_id)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_removes_tagged_keys_in_all_workers(fake_redis):
+    first = await connected_cache(fake_redis)
+    second = await connected_cache(fake_redis)
+
+    await first.set("deck_cards:1", ["card"], ttl=60, tags=[deck_tag(1)])
+    await first.set("user_decks:7", ["deck"], ttl=60, tags=[user_tag(7), deck_tag(1)])
+    await first.set("deck_cards:2", ["other"], ttl=60, tags=[deck_tag(2)])
+    assert await second.get("deck_cards:1") == ["card"]  # прогреваем L1 второго воркера
+
+    assert await first.invalidate_tags(deck_tag(1)) == 2
+    await asyncio.sleep(0)
+
+    assert await second.get("deck_cards:1") is None
+    assert await first.get("user_decks:7") is None
+    assert await first.get("deck_cards:2") == ["other"]
+    assert "tag:deck:1" not in fake_redis.data
+
+    await first.disconnect()
+    await second.disconnect()
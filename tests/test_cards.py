@@ -1,11 +1,19 @@
+import threading
+
 import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
 from domain.entities.user import User
 from domain.entities.deck import Deck
 from domain.entities.card import Card
+from domain.repositories.card_repository import DuplicateCardError
 from infrastructure.repositories.user_repository import UserRepository
 from infrastructure.repositories.deck_repository import DeckRepository
-from infrastructure.repositories.card_repository import CardRepository
+from infrastructure.repositories.card_repository import CardRepository, insert_new_cards
+from infrastructure.config import settings
 from application.use_cases.card_use_cases import CreateCardUseCase, GetCardUseCase
+from application.services.fsrs_service import FSRSService
 
 
 @pytest.mark.asyncio
@@ -70,3 +78,242 @@ async def test_get_card(db_session):
     assert retrieved_card.id == created_card.id
     assert retrieved_card.front == "Term"
     assert retrieved_card.back == "Definition"
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_fsrs(db_session):
+    """Тест массовой записи состояний FSRS"""
+    user = User.create(
+        email="test@example.com",
+        username="testuser",
+        hashed_password="hashed_password",
+    )
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Test Deck"))
+
+    card_repo = CardRepository(db_session)
+    cards = await card_repo.bulk_create(
+        [Card.create(created_deck.id, f"Term {i}", f"Definition {i}") for i in range(5)]
+    )
+
+    now = datetime(2024, 1, 1)
+    batch = FSRSService().review_batch(
+        stability=[c.fsrs_state.stability for c in cards],
+        difficulty=[c.fsrs_state.difficulty for c in cards],
+        ease_factor=[c.fsrs_state.ease_factor for c in cards],
+        review_count=[c.fsrs_state.review_count for c in cards],
+        quality=[4] * len(cards),
+        now=now,
+    )
+    updated = await card_repo.bulk_update_fsrs([c.id for c in cards], batch.to_columns())
+
+    assert updated == len(cards)
+    for card in cards:
+        stored = await card_repo.get_by_id(card.id)
+        assert stored.fsrs_state.review_count == 1
+        assert stored.fsrs_state.last_review == now
+        assert stored.fsrs_state.due_date == now + timedelta(days=stored.fsrs_state.interval)
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_in_chunks(db_session):
+    """Тест пакетной вставки карточек из генератора"""
+    user = User.create(
+        email="test@example.com",
+        username="testuser",
+        hashed_password="hashed_password",
+    )
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Test Deck"))
+
+    card_repo = CardRepository(db_session)
+    threads = set()
+
+    def parse():
+        # Разбор файла в генераторе не должен выполняться в потоке event loop
+        for i in range(25):
+            threads.add(threading.get_ident())
+            yield Card.create(created_deck.id, f"Term {i}", f"Definition {i}")
+
+    created = await card_repo.bulk_create(parse(), chunk_size=10)
+
+    assert threading.get_ident() not in threads
+    assert len(created) == 25
+    assert [c.front for c in created] == [f"Term {i}" for i in range(25)]
+    assert all(c.fsrs_state.review_count == 0 for c in created)
+    assert len(await card_repo.get_by_deck_id(created_deck.id)) == 25
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_above_copy_threshold_falls_back_on_sqlite(db_session, monkeypatch):
+    """Тест: на SQLite крупный импорт идет через пакетный INSERT вместо COPY"""
+    user = User.create(
+        email="test@example.com",
+        username="testuser",
+        hashed_password="hashed_password",
+    )
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Test Deck"))
+
+    monkeypatch.setattr(settings, "import_copy_threshold", 3)
+    card_repo = CardRepository(db_session)
+    created = await card_repo.bulk_create(
+        [Card.create(created_deck.id, f"Term {i}", f"Definition {i}") for i in range(5)]
+    )
+
+    assert len(created) == 5
+    assert len(await card_repo.get_by_deck_id(created_deck.id)) == 5
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_switches_streamed_input_to_copy(db_session, monkeypatch):
+    """Тест: поток карточек, переросший порог, продолжает вставку пачками через COPY"""
+    user = User.create(
+        email="test@example.com",
+        username="testuser",
+        hashed_password="hashed_password",
+    )
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Test Deck"))
+
+    monkeypatch.setattr(settings, "import_copy_threshold", 20)
+    card_repo = CardRepository(db_session)
+    copied = []
+
+    async def fake_copy(cards):
+        # На SQLite COPY нет - записываем пачку и вставляем ее обычным INSERT
+        copied.append(len(cards))
+        return await insert_new_cards(db_session, cards)
+
+    monkeypatch.setattr(card_repo, "_supports_copy", lambda: True)
+    monkeypatch.setattr(card_repo, "_copy_create", fake_copy)
+    created = await card_repo.bulk_create(
+        (Card.create(created_deck.id, f"Term {i}", f"Definition {i}") for i in range(45)),
+        chunk_size=10,
+    )
+
+    assert len(created) == 45
+    assert copied == [10, 10, 10, 5]
+    assert len(await card_repo.get_by_deck_id(created_deck.id)) == 45
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_skips_duplicates(db_session):
+    """Тест: карточки с тем же содержимым (с точностью до регистра и пробелов) не дублируются"""
+    user = User.create(
+        email="test@example.com",
+        username="testuser",
+        hashed_password="hashed_password",
+    )
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Test Deck"))
+    other_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Other Deck"))
+
+    card_repo = CardRepository(db_session)
+    await card_repo.bulk_create([Card.create(created_deck.id, "Cat", "Кошка")])
+
+    created = await card_repo.bulk_create([
+        Card.create(created_deck.id, "  cat ", "КОШКА"),
+        Card.create(created_deck.id, "Dog", "Собака"),
+        Card.create(created_deck.id, "dog", "собака "),
+        Card.create(other_deck.id, "Cat", "Кошка"),
+    ])
+
+    assert [(c.deck_id, c.front) for c in created] == [(created_deck.id, "Dog"), (other_deck.id, "Cat")]
+    assert sorted(c.front for c in await card_repo.get_by_deck_id(created_deck.id)) == ["Cat", "Dog"]
+
+
+@pytest.mark.asyncio
+async def test_create_maps_only_content_conflicts_to_duplicate_error(db_session):
+    """Тест: DuplicateCardError - только при совпадении содержимого, прочие нарушения как есть"""
+    user = User.create(
+        email="test@example.com",
+        username="testuser",
+        hashed_password="hashed_password",
+    )
+    created_user = await UserRepository(db_session).create(user)
+    created_deck = await DeckRepository(db_session).create(Deck.create(created_user.id, "Test Deck"))
+
+    card_repo = CardRepository(db_session)
+    await card_repo.create(Card.create(created_deck.id, "Cat", "Кошка"))
+    with pytest.raises(DuplicateCardError):
+        await card_repo.create(Card.create(created_deck.id, "cat", "кошка"))
+
+    broken = Card.create(created_deck.id, "Dog", "Собака")
+    broken.front = None
+    with pytest.raises(IntegrityError):
+        await card_repo.create(broken)
+
+
+@pytest.mark.asyncio
+async def test_get_due_cards_uses_indexes(db_session):
+    """Тест: выборка карточек к повторению идет по индексам без сортировки и полного скана"""
+    user = User.create(
+        email="test@example.com",
+        username="testuser",
+        hashed_password="hashed_password",
+    )
+    created_user = await UserRepository(db_session).create(user)
+    deck_repo = DeckRepository(db_session)
+    decks = [await deck_repo.create(Deck.create(created_user.id, f"Deck {i}")) for i in range(3)]
+
+    now = datetime.utcnow()
+    cards = []
+    for deck in decks:
+        for i in range(2000):
+            card = Card.create(deck.id, f"Term {i}", f"Definition {i}")
+            if i % 3:
+                card.fsrs_state.due_date = now + timedelta(hours=i - 1000)
+            cards.append(card)
+    card_repo = CardRepository(db_session)
+    await card_repo.bulk_create(cards)
+    await db_session.execute(text("ANALYZE"))
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        due = await card_repo.get_due_cards(decks[0].id, limit=50)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # Сначала новые карточки, затем по возрастанию due_date
+    assert len(due) == 50
+    due_dates = [card.fsrs_state.due_date for card in due]
+    new_count = due_dates.count(None)
+    assert all(d is None for d in due_dates[:new_count])
+    assert due_dates[new_count:] == sorted(due_dates[new_count:])
+    assert all(card.deck_id == decks[0].id for card in due)
+
+    statement, parameters = statements[-1]
+    connection = await db_session.connection()
+    plan = (await connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)).all()
+    details = [row[-1] for row in plan]
+
+    assert any("USING INDEX ix_cards_deck_id_due_date" in d or "USING INDEX ix_cards_deck_id_new" in d for d in details)
+    assert not any(d.startswith("SCAN cards") for d in details)
+    assert not any("TEMP B-TREE" in d for d in details)
+
+
+@pytest.mark.asyncio
+async def test_sample_backs_excludes_correct_answer(db_session):
+    user = await UserRepository(db_session).create(
+        User.create(email="sample@example.com", username="sample", hashed_password="h")
+    )
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "Sample Deck"))
+    card_repo = CardRepository(db_session)
+    await card_repo.bulk_create(
+        [Card.create(deck.id, f"Q{i}", f"A{i % 5}") for i in range(20)]
+    )
+
+    backs = await card_repo.sample_backs(deck.id, 3, exclude_back="A0")
+
+    assert len(backs) == 3
+    assert len(set(backs)) == 3
+    assert "A0" not in backs
+    assert set(backs) <= {"A1", "A2", "A3", "A4"}
+    assert len(await card_repo.sample_backs(deck.id, 10, exclude_back="A0")) == 4
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from application.services.distractor_service import DistractorIndex, DistractorService
+
+BACKS = ["apple", "apples", "applet", "banana", "bandana", "cabana", "orange", "range", "arrange"]
+
+
+def make_cards(backs):
+    return [(uuid4(), back) for back in backs]
+
+
+def test_index_returns_most_similar_backs():
+    cards = make_cards(BACKS)
+    index = DistractorIndex.build(cards, top_k=3)
+
+    assert sorted(index.get(cards[0][0], 2)) == ["apples", "applet"]
+    assert sorted(index.get(cards[3][0], 2)) == ["bandana", "cabana"]
+    assert index.get(uuid4(), 2) is None
+
+
+def test_index_skips_identical_and_removed_backs():
+    cards = make_cards(["range", "range", "orange", "arrange"])
+    index = DistractorIndex.build(cards, top_k=3)
+
+    assert sorted(index.get(cards[0][0], 3)) == ["arrange", "orange"]
+
+    index.remove(cards[2][0])
+    assert index.get(cards[0][0], 3) == ["arrange"]
+
+
+def test_incremental_update_matches_rebuild_for_new_card():
+    cards = make_cards(BACKS)
+    index = DistractorIndex.build(cards, top_k=3)
+
+    new_card = (uuid4(), "grapple")
+    index.update(*new_card)
+    rebuilt = DistractorIndex.build(cards + [new_card], top_k=3)
+
+    # При равной похожести порядок соседей может отличаться, сравниваем оценки
+    assert np.allclose(index.scores, rebuilt.scores)
+    assert "grapple" in index.get(cards[0][0], 3)
+
+
+def test_incremental_updates_merge_pending_rows(monkeypatch):
+    monkeypatch.setattr(sys.modules[DistractorIndex.__module__], "PENDING_ROWS", 2)
+    cards = make_cards(BACKS[:3])
+    index = DistractorIndex.build(cards, top_k=3)
+
+    added = make_cards(["grapple", "banana", "bandana", "orange", "range"])
+    for card in added:
+        index.update(*card)
+    cards[1] = (cards[1][0], "cabana")
+    index.update(*cards[1])
+    rebuilt = DistractorIndex.build(cards + added, top_k=3)
+
+    assert index.matrix.shape[0] + len(index._pending) >= len(index.backs)
+    assert np.allclose(index.scores, rebuilt.scores)
+
+
+def test_frequent_grams_are_stored_as_column_ids():
+    cards = make_cards([f"the word {i}" for i in range(60)])
+    index = DistractorIndex.build(cards, top_k=3)
+
+    assert index.dropped.dtype == np.int32
+    assert 0 < len(index.dropped) < 100
+    assert np.all(np.diff(index.dropped) > 0)
+
+
+@pytest.mark.asyncio
+async def test_service_builds_in_background_and_serves_distractors():
+    service = DistractorService(max_decks=1)
+    deck_id = uuid4()
+    cards = make_cards(BACKS)
+
+    async def load():
+        return cards
+
+    service.schedule_build(deck_id, load)
+    assert service.get_distractors(deck_id, cards[0][0], 2) is None
+    await asyncio.gather(*service._builds.values())
+
+    assert sorted(service.get_distractors(deck_id, cards[0][0], 2)) == ["apples", "applet"]
+
+    service.update_card(deck_id, cards[0][0], "cabanas")
+    assert "cabana" in service.get_distractors(deck_id, cards[0][0], 3)
+
+    await service.build(uuid4(), load)  # вытесняет единственный набор
+    assert not service.has_index(deck_id)
+
+
+@pytest.mark.asyncio
+async def test_drop_cancels_running_build():
+    service = DistractorService()
+    deck_id = uuid4()
+    loading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def load():
+        loading.set()
+        await release.wait()
+        return make_cards(BACKS)
+
+    service.schedule_build(deck_id, load)
+    await loading.wait()
+    service.update_card(deck_id, uuid4(), "grape")
+    build = service._builds[deck_id]
+
+    # Набор удален, пока индекс строился
+    service.drop(deck_id)
+    release.set()
+    await asyncio.gather(build, return_exceptions=True)
+
+    assert not service.has_index(deck_id)
+    assert deck_id not in service._builds
+    assert deck_id not in service._dirty
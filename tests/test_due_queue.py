@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime, timedelta
+
+from domain.entities.user import User
+from domain.entities.deck import Deck
+from domain.entities.card import Card
+from infrastructure.repositories.user_repository import UserRepository
+from infrastructure.repositories.deck_repository import DeckRepository
+from infrastructure.repositories.card_repository import CardRepository
+from infrastructure.services.due_queue import DueQueue
+
+
+async def create_deck_with_cards(db_session):
+    user = await UserRepository(db_session).create(
+        User.create(email="queue@example.com", username="queue", hashed_password="h")
+    )
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "Queue Deck"))
+
+    now = datetime.utcnow()
+    cards = [Card.create(deck.id, f"Q{i}", f"A{i}") for i in range(4)]
+    cards[1].fsrs_state.due_date = now - timedelta(days=2)
+    cards[2].fsrs_state.due_date = now - timedelta(days=1)
+    cards[3].fsrs_state.due_date = now + timedelta(days=3)  # еще не пора
+    return deck, await CardRepository(db_session).bulk_create(cards)
+
+
+@pytest.mark.asyncio
+async def test_due_queue_rebuilds_lazily_and_returns_due_order(db_session, fake_redis):
+    deck, cards = await create_deck_with_cards(db_session)
+    queue = DueQueue(fake_redis, CardRepository(db_session))
+
+    due = await queue.get_due_cards(deck.id, limit=10)
+
+    assert [card.id for card in due] == [cards[0].id, cards[1].id, cards[2].id]
+    assert await fake_redis.exists(f"due_queue:{deck.id}:ready")
+    assert [card.id for card in await queue.get_due_cards(deck.id, limit=2)] == [cards[0].id, cards[1].id]
+
+
+@pytest.mark.asyncio
+async def test_due_queue_tracks_reviews_and_deletes(db_session, fake_redis):
+    deck, cards = await create_deck_with_cards(db_session)
+    repo = CardRepository(db_session)
+    queue = DueQueue(fake_redis, repo)
+    await queue.get_due_cards(deck.id)
+
+    cards[0].fsrs_state.due_date = datetime.utcnow() + timedelta(days=1)
+    await queue.update_cards([cards[0]])
+    await repo.delete(cards[1].id)  # удалена в обход очереди
+
+    assert [card.id for card in await queue.get_due_cards(deck.id)] == [cards[2].id]
+    assert str(cards[1].id) not in fake_redis.data[f"due_queue:{deck.id}"]
+
+
+@pytest.mark.asyncio
+async def test_due_queue_reconcile_fixes_drift(db_session, fake_redis):
+    deck, cards = await create_deck_with_cards(db_session)
+    queue = DueQueue(fake_redis, CardRepository(db_session))
+    await queue.rebuild(deck.id)
+
+    zset = fake_redis.data[f"due_queue:{deck.id}"]
+    del zset[str(cards[0].id)]
+    zset[str(cards[1].id)] = 12345.0
+    zset["00000000-0000-0000-0000-000000000000"] = 0.0
+
+    assert await queue.reconcile(deck.id) == {"missing": 1, "extra": 1, "stale": 1}
+    assert await queue.reconcile(deck.id) == {"missing": 0, "extra": 0, "stale": 0}
@@ -46,3 +46,45 @@ def test_poor_review():
     assert state.review_count == 1
     assert state.stability < 1.0  # Стабильность должна быть низкой
     assert state.interval == 1  # Интервал должен быть 1 день
+
+
+def test_review_batch_matches_scalar():
+    """Тест совпадения пакетного пересчета с поэлементным"""
+    service = FSRSService()
+    now = datetime(2024, 1, 1, 12, 0, 0)
+
+    states = []
+    qualities = []
+    for review_count in (0, 1, 2, 7):
+        for stability in (0.1, 0.4, 3.3, 364.0):
+            for difficulty in (0.1, 0.55, 1.0):
+                for ease_factor in (1.3, 2.1, 2.5):
+                    for quality in range(6):
+                        states.append(FSRSState(
+                            stability=stability,
+                            difficulty=difficulty,
+                            ease_factor=ease_factor,
+                            review_count=review_count,
+                        ))
+                        qualities.append(quality)
+
+    batch = service.review_batch(
+        stability=[s.stability for s in states],
+        difficulty=[s.difficulty for s in states],
+        ease_factor=[s.ease_factor for s in states],
+        review_count=[s.review_count for s in states],
+        quality=qualities,
+        now=now,
+    )
+    columns = batch.to_columns()
+
+    assert len(batch) == len(states)
+    for i, (state, quality) in enumerate(zip(states, qualities)):
+        expected = service.review_card(state, quality, now=now)
+        assert columns["stability"][i] == expected.stability
+        assert columns["difficulty"][i] == expected.difficulty
+        assert columns["ease_factor"][i] == expected.ease_factor
+        assert columns["interval"][i] == expected.interval
+        assert columns["review_count"][i] == expected.review_count
+        assert columns["last_review"][i] == expected.last_review
+        assert columns["due_date"][i] == expected.due_date
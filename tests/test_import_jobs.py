@@ -0,0 +1,215 @@
+import asyncio
+import io
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from openpyxl import Workbook
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from domain.entities.card import Card
+from domain.entities.deck import Deck
+from domain.entities.import_job import ImportJob, ImportJobStatus, ImportSource
+from domain.entities.user import User
+from domain.repositories.import_job_repository import ImportJobLostError
+from infrastructure.config import settings
+from infrastructure.database.base import Base
+from infrastructure.repositories.card_repository import CardRepository
+from infrastructure.repositories.deck_repository import DeckRepository
+from infrastructure.repositories.import_job_repository import ImportJobRepository
+from infrastructure.repositories.user_repository import UserRepository
+from infrastructure.security import create_access_token
+from infrastructure.services import import_jobs as import_jobs_module
+from infrastructure.services.cache_service import CacheService, deck_tag, get_cache
+from infrastructure.services.import_jobs import (
+    _run_with_own_engine,
+    import_job_key,
+    import_job_worker,
+    run_import_job,
+)
+from presentation.api.main import app
+
+
+def make_workbook(count):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Term", "Definition"])
+    for i in range(count):
+        sheet.append([f"term {i}", f"definition {i}"])
+    content = io.BytesIO()
+    workbook.save(content)
+    return content.getvalue()
+
+
+async def create_deck(db_session, email):
+    user = await UserRepository(db_session).create(User.create(email=email, username=email.split("@")[0], hashed_password="h"))
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "Job Deck"))
+    return user, deck
+
+
+@pytest.mark.asyncio
+async def test_import_job_runs_in_background_and_reports_progress(client, db_session, tmp_path, monkeypatch, fake_redis):
+    cache = CacheService()
+    cache._redis = fake_redis
+    await cache._on_connected()
+    app.dependency_overrides[get_cache] = lambda: cache
+    monkeypatch.setattr(import_jobs_module, "cache_service", cache)
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "db_batch_size", 100)
+    user, deck = await create_deck(db_session, "job@example.com")
+    token = create_access_token({"sub": str(user.id), "email": user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    files = {"file": ("cards.xlsx", make_workbook(250), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    resp = await client.post(f"/api/v1/import/jobs/{deck.id}", files=files, headers=headers)
+    assert resp.status_code == 202
+    job_id = resp.json()["id"]
+    assert resp.json()["status"] == "pending"
+
+    await asyncio.gather(*import_job_worker._tasks.values())
+
+    resp2 = await client.get(f"/api/v1/import/jobs/{job_id}", headers=headers)
+    assert resp2.status_code == 200
+    body = resp2.json()
+    assert body["status"] == "completed"
+    assert body["rows_parsed"] == body["rows_inserted"] == 250
+    assert len(await CardRepository(db_session).get_by_deck_id(deck.id)) == 250
+    # Файл загрузки удаляется после завершения
+    assert not list((tmp_path / "import_jobs").iterdir())
+
+    # Повторная загрузка того же файла возвращает прежнее задание
+    resp_again = await client.post(f"/api/v1/import/jobs/{deck.id}", files=files, headers=headers)
+    assert resp_again.status_code == 200
+    assert resp_again.json()["id"] == job_id
+    assert not import_job_worker._tasks
+
+    # После удаления карточек тот же файл импортируется заново
+    card_repo = CardRepository(db_session)
+    for card in (await card_repo.get_by_deck_id(deck.id))[:10]:
+        resp_delete = await client.delete(f"/api/v1/cards/{card.id}", headers=headers)
+        assert resp_delete.status_code == 204
+    resp_restore = await client.post(f"/api/v1/import/jobs/{deck.id}", files=files, headers=headers)
+    assert resp_restore.status_code == 202
+    await asyncio.gather(*import_job_worker._tasks.values())
+    restored = (await client.get(f"/api/v1/import/jobs/{resp_restore.json()['id']}", headers=headers)).json()
+    assert restored["rows_parsed"] == 250
+    assert restored["rows_inserted"] == 10
+    assert len(await card_repo.get_by_deck_id(deck.id)) == 250
+
+    other = await UserRepository(db_session).create(User.create(email="other@example.com", username="other", hashed_password="h"))
+    other_token = create_access_token({"sub": str(other.id), "email": other.email})
+    resp3 = await client.get(f"/api/v1/import/jobs/{job_id}", headers={"Authorization": f"Bearer {other_token}"})
+    assert resp3.status_code == 403
+
+    await cache.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_import_job_resumes_after_last_committed_chunk(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "db_batch_size", 100)
+    user, deck = await create_deck(db_session, "resume@example.com")
+    path = tmp_path / "cards.xlsx"
+    path.write_bytes(make_workbook(250))
+
+    # Процесс упал после первой закоммиченной пачки
+    job_repo = ImportJobRepository(db_session)
+    job = ImportJob.create(user.id, deck.id, ImportSource.EXCEL, "cards.xlsx", str(path))
+    job.status = ImportJobStatus.RUNNING
+    job.updated_at = datetime.utcnow() - timedelta(minutes=5)
+    job = await job_repo.create(job)
+    await job_repo.save_chunk(job, [Card.create(deck.id, f"term {i}", f"definition {i}") for i in range(100)])
+
+    # Свежее выполняющееся задание другого воркера не забирается
+    assert await run_import_job(db_session.bind, job.id, datetime.utcnow() - timedelta(minutes=1)) is None
+
+    finished = await run_import_job(db_session.bind, job.id, datetime.utcnow())
+    assert finished.status == ImportJobStatus.COMPLETED
+    assert finished.rows_inserted == 250
+
+    fronts = [card.front for card in await CardRepository(db_session).get_by_deck_id(deck.id)]
+    assert sorted(fronts) == sorted(f"term {i}" for i in range(250))
+
+
+@pytest.mark.asyncio
+async def test_import_job_taken_over_by_another_worker_stops_writing(db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "db_batch_size", 100)
+    user, deck = await create_deck(db_session, "takeover@example.com")
+    path = tmp_path / "cards.xlsx"
+    path.write_bytes(make_workbook(250))
+
+    job_repo = ImportJobRepository(db_session)
+    job = await job_repo.create(ImportJob.create(user.id, deck.id, ImportSource.EXCEL, "cards.xlsx", str(path)))
+    first = await job_repo.claim(job.id)
+    await job_repo.save_chunk(first, [Card.create(deck.id, f"term {i}", f"definition {i}") for i in range(100)])
+
+    # Первый воркер завис, второй счел задание брошенным и забрал его
+    second = await job_repo.claim(job.id, datetime.utcnow() + timedelta(seconds=1))
+    assert second.attempt == first.attempt + 1
+
+    with pytest.raises(ImportJobLostError):
+        await job_repo.save_chunk(first, [Card.create(deck.id, "stale", "write")])
+    first.complete()
+    with pytest.raises(ImportJobLostError):
+        await job_repo.update(first)
+
+    finished = await run_import_job(db_session.bind, job.id, datetime.utcnow() + timedelta(seconds=1))
+    assert finished.status == ImportJobStatus.COMPLETED
+    assert finished.rows_parsed == finished.rows_inserted == 250
+    fronts = [card.front for card in await CardRepository(db_session).get_by_deck_id(deck.id)]
+    assert sorted(fronts) == sorted(f"term {i}" for i in range(250))
+
+
+@pytest.mark.asyncio
+async def test_celery_job_invalidates_deck_data_in_redis(tmp_path, monkeypatch, fake_redis):
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}"
+    monkeypatch.setattr(settings, "database_url", database_url)
+    monkeypatch.setattr(settings, "db_batch_size", 100)
+    monkeypatch.setattr(settings, "due_queue_enabled", True)
+    monkeypatch.setattr(settings, "redis_url", "redis://worker")
+
+    async def from_url(url):
+        return fake_redis
+
+    monkeypatch.setattr(sys.modules[CacheService.__module__], "redis", SimpleNamespace(from_url=from_url))
+    path = tmp_path / "cards.xlsx"
+    path.write_bytes(make_workbook(150))
+
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user, deck = await create_deck(session, "celery@example.com")
+        job = ImportJob.create(user.id, deck.id, ImportSource.EXCEL, "cards.xlsx", str(path))
+        job.file_hash = "f" * 64
+        job = await ImportJobRepository(session).create(job)
+
+    # API успел закэшировать карточки набора и построить очередь повторений
+    api_cache = CacheService()
+    api_cache._redis = fake_redis
+    await api_cache.set(f"deck_cards:{deck.id}", [], tags=(deck_tag(deck.id),))
+    await fake_redis.set(f"due_queue:{deck.id}:ready", 1)
+
+    assert await _run_with_own_engine(job.id)
+
+    assert await fake_redis.get(f"deck_cards:{deck.id}") is None
+    assert not await fake_redis.exists(f"due_queue:{deck.id}:ready")
+    assert await api_cache.get(import_job_key(deck.id, job.file_hash)) == str(job.id)
+    assert import_jobs_module.cache_service.redis is None
+    async with AsyncSession(engine) as session:
+        assert len(await CardRepository(session).get_by_deck_id(deck.id)) == 150
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_celery_job_waits_for_redis(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    monkeypatch.setattr(settings, "redis_url", "redis://worker")
+
+    async def from_url(url):
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(sys.modules[CacheService.__module__], "redis", SimpleNamespace(from_url=from_url))
+    with pytest.raises(ConnectionError):
+        await _run_with_own_engine(uuid4())
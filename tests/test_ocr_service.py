@@ -0,0 +1,154 @@
+import functools
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from domain.entities.deck import Deck
+from domain.entities.user import User
+from infrastructure.repositories.deck_repository import DeckRepository
+from infrastructure.repositories.user_repository import UserRepository
+from infrastructure.security import create_access_token
+from infrastructure.services import import_service as import_service_module
+from infrastructure.services.ocr_service import ImageReadError, OCRService, OCRUnavailableError, preprocess
+
+
+def fake_ocr(image):
+    # Страницы различаются шириной; функция на уровне модуля - ее можно передать в процесс
+    return f"front {image.width}\nback {image.height}"
+
+
+def crashing_ocr(image):
+    # Процесс пула падает, как при OOM
+    os._exit(1)
+
+
+def crash_once_ocr(marker, image):
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        crashing_ocr(image)
+    return fake_ocr(image)
+
+
+def make_image(width, height, dpi=None, format="PNG"):
+    image = Image.new("RGB", (width, height), "white")
+    image.paste((20, 20, 20), (width // 4, height // 4, width // 2, height // 2))
+    content = io.BytesIO()
+    image.save(content, format=format, **({"dpi": (dpi, dpi)} if dpi else {}))
+    return content.getvalue()
+
+
+def make_tiff(widths):
+    pages = [Image.new("L", (width, 50), 255) for width in widths]
+    content = io.BytesIO()
+    pages[0].save(content, format="TIFF", save_all=True, append_images=pages[1:])
+    return content.getvalue()
+
+
+def test_preprocess_grayscale_downscale_and_binarize():
+    image = Image.open(io.BytesIO(make_image(1200, 800, dpi=600)))
+
+    prepared = preprocess(image)
+
+    assert prepared.mode == "L"
+    assert prepared.size == (600, 400)
+    assert set(prepared.getdata()) <= {0, 255}
+
+
+@pytest.mark.asyncio
+async def test_recognize_pages_in_process_pool():
+    # fork вместо spawn по умолчанию: процессам не нужно заново импортировать приложение
+    executor = ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("fork"))
+    ocr = OCRService(ocr_func=fake_ocr, executor=executor)
+    try:
+        texts = await ocr.recognize([make_tiff([100, 110, 120]), make_image(130, 40)])
+    finally:
+        ocr.shutdown()
+
+    assert texts == ["front 100\nback 50", "front 110\nback 50", "front 120\nback 50", "front 130\nback 40"]
+
+
+@pytest.mark.asyncio
+async def test_recognize_recreates_broken_pool(tmp_path, monkeypatch):
+    fork = multiprocessing.get_context("fork")
+    ocr = OCRService(ocr_func=functools.partial(crash_once_ocr, str(tmp_path / "crashed")), max_workers=1)
+    monkeypatch.setattr(ocr, "_new_executor", lambda: ProcessPoolExecutor(1, mp_context=fork))
+    try:
+        assert await ocr.recognize([make_tiff([100, 110])]) == ["front 100\nback 50", "front 110\nback 50"]
+    finally:
+        ocr.shutdown()
+
+    always_crashing = OCRService(ocr_func=crashing_ocr, max_workers=1)
+    monkeypatch.setattr(always_crashing, "_new_executor", lambda: ProcessPoolExecutor(1, mp_context=fork))
+    with pytest.raises(OCRUnavailableError):
+        await always_crashing.recognize([make_image(100, 40)])
+    always_crashing.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_recognize_rejects_non_images():
+    ocr = OCRService(ocr_func=fake_ocr, executor=ThreadPoolExecutor(1))
+    with pytest.raises(ImageReadError):
+        await ocr.recognize([b"not an image"])
+
+
+@pytest.mark.asyncio
+async def test_recognize_rejects_broken_and_oversized_images(monkeypatch):
+    ocr = OCRService(ocr_func=fake_ocr, executor=ThreadPoolExecutor(1))
+    png = make_image(300, 300)
+    # Заголовок читается, а данные страницы обрезаны - ошибка возникает уже в пуле
+    with pytest.raises(ImageReadError):
+        await ocr.recognize([png[:len(png) // 2]])
+
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    with pytest.raises(ImageReadError):
+        OCRService.count_pages(png)
+    ocr.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_recognize_without_pytesseract_is_unavailable(monkeypatch):
+    monkeypatch.setattr(sys.modules[OCRService.__module__], "pytesseract", None)
+    with pytest.raises(OCRUnavailableError):
+        await OCRService().recognize([make_image(100, 40)])
+
+
+@pytest.mark.asyncio
+async def test_import_from_images_endpoint(client, db_session, monkeypatch):
+    user = await UserRepository(db_session).create(User.create(email="ocr@example.com", username="ocr", hashed_password="h"))
+    deck = await DeckRepository(db_session).create(Deck.create(user.id, "OCR Deck"))
+    token = create_access_token({"sub": str(user.id), "email": user.email})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    ocr = OCRService(ocr_func=fake_ocr, executor=ThreadPoolExecutor(2))
+    monkeypatch.setattr(import_service_module, "ocr_service", ocr)
+
+    files = [
+        ("files", ("pages.tiff", make_tiff([100, 110]), "image/tiff")),
+        ("files", ("photo.png", make_image(130, 40), "image/png")),
+    ]
+    resp = await client.post(f"/api/v1/import/images/{deck.id}", files=files, headers=headers)
+    assert resp.status_code == 201
+    body = resp.json()
+    assert body["imported"] == 3
+    assert [card["front"] for card in body["cards"]] == ["front 100", "front 110", "front 130"]
+
+    resp2 = await client.post(
+        f"/api/v1/import/image/{deck.id}",
+        files={"file": ("broken.png", b"not an image", "image/png")},
+        headers=headers,
+    )
+    assert resp2.status_code == 400
+
+    monkeypatch.setattr(sys.modules[OCRService.__module__], "pytesseract", None)
+    monkeypatch.setattr(import_service_module, "ocr_service", OCRService())
+    resp3 = await client.post(
+        f"/api/v1/import/image/{deck.id}",
+        files={"file": ("photo.png", make_image(140, 40), "image/png")},
+        headers=headers,
+    )
+    assert resp3.status_code == 503